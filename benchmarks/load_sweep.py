@@ -0,0 +1,61 @@
+"""Run the load test against datasets of increasing size.
+
+Results of all sizes are merged into a single result (benchmarks are named "<operation>@<rows>"),
+which can be compared with a previous run using `demo-app bench compare`.
+
+Usage:
+
+    python benchmarks/load_sweep.py --sizes 1000,10000,100000 --data-dir .bench -o sweep.json
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import typing
+
+from demo_app.bench.load import LoadTestConfig, run_load_test
+from demo_app.bench.report import environment, write_result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--mode", choices=["asgi", "loopback"], default="asgi")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument(
+        "--data-dir", default=None, help="Directory where generated datasets are cached"
+    )
+    parser.add_argument("--output", "-o", default=None, help="Write result as JSON")
+    args = parser.parse_args()
+
+    config = LoadTestConfig(
+        mode=args.mode,
+        clients=args.clients,
+        duration=args.duration,
+        warmup=args.warmup,
+        data_dir=args.data_dir,
+    )
+    sizes = [int(value) for value in args.sizes.split(",")]
+    results: typing.Dict[str, typing.Any] = {}
+    for rows in sizes:
+        result = run_load_test(dataclasses.replace(config, rows=rows))
+        for name, metrics in result["results"].items():
+            results[f"{name}@{rows}"] = metrics
+
+    print(
+        write_result(
+            {
+                "benchmark": "load-sweep",
+                "config": {**dataclasses.asdict(config), "rows": sizes},
+                "environment": environment(),
+                "results": results,
+            },
+            args.output,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Measure the overhead of traces at several sampling ratios.
+
+Spans are exported using OTLP over HTTP to a local stand-in collector, which only counts received spans.
+Each configuration is driven in-process through ASGI, and compared with a run where traces are disabled.
+
+Usage:
+
+    python benchmarks/tracing_overhead.py --requests 2000 --ratios 0,0.01,0.1,1
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import http.server
+import json
+import statistics
+import threading
+import time
+import typing
+
+from demo_app.bench import ASGIClient
+from demo_app.entrypoint import create_container
+from demo_app.settings import AppSettings
+
+
+class Collector(http.server.ThreadingHTTPServer):
+    """A stand-in for an OTLP collector which counts received spans"""
+
+    spans = 0
+    requests = 0
+    received_bytes = 0
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), CollectorHandler)
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/traces"
+
+    def record(self, body: bytes) -> None:
+        from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+            ExportTraceServiceRequest,
+        )
+
+        request = ExportTraceServiceRequest()
+        request.ParseFromString(body)
+        spans = sum(
+            len(scope_spans.spans)
+            for resource_spans in request.resource_spans
+            for scope_spans in resource_spans.instrumentation_library_spans
+        )
+        with self._lock:
+            self.requests += 1
+            self.received_bytes += len(body)
+            self.spans += spans
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans = self.requests = self.received_bytes = 0
+
+
+class CollectorHandler(http.server.BaseHTTPRequestHandler):
+    server: Collector
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("content-length", 0)))
+        self.server.record(body)
+        self.send_response(200)
+        self.send_header("content-length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        pass
+
+
+async def measure(
+    settings: AppSettings, requests: int, path: str
+) -> typing.Dict[str, float]:
+    container = create_container(settings)
+    latencies: typing.List[float] = []
+    async with ASGIClient(container.app) as client:
+        # Warm up application before measuring
+        for _ in range(min(requests // 10, 100)):
+            await client.get(path)
+        start = time.perf_counter()
+        for _ in range(requests):
+            request_start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - request_start)
+            assert response.status_code == 200, response.body
+        duration = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput": requests / duration,
+        "mean": statistics.fmean(latencies),
+        "p50": latencies[int(len(latencies) * 0.50)],
+        "p99": latencies[int(len(latencies) * 0.99)],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--ratios", default="0,0.01,0.1,0.5,1")
+    parser.add_argument("--path", default="/employees/")
+    parser.add_argument("--db", default=None, help="Path to JSON database file")
+    parser.add_argument(
+        "--always-sample-errors",
+        action="store_true",
+        help="Record unsampled requests to export errors",
+    )
+    parser.add_argument("--output", "-o", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    collector = Collector()
+    threading.Thread(target=collector.serve_forever, daemon=True).start()
+
+    base: typing.Dict[str, typing.Any] = {
+        "logging": {"level": "warning", "access_log": False},
+        "telemetry": {"metrics_enabled": False},
+    }
+    if args.db:
+        base["database"] = {"path": args.db}
+
+    results: typing.Dict[str, typing.Any] = {}
+    baseline = asyncio.run(
+        measure(
+            AppSettings.parse_obj(
+                {**base, "telemetry": {"metrics_enabled": False}},
+            ),
+            args.requests,
+            args.path,
+        )
+    )
+    results["disabled"] = baseline
+    for ratio in [float(value) for value in args.ratios.split(",")]:
+        collector.reset()
+        settings = AppSettings.parse_obj(
+            {
+                **base,
+                "telemetry": {
+                    "metrics_enabled": False,
+                    "traces_enabled": True,
+                    "traces_exporter": "otlp",
+                    "traces_sample_ratio": ratio,
+                    "traces_always_sample_errors": args.always_sample_errors,
+                    "traces_schedule_delay_millis": 100,
+                },
+                "otlp": {"endpoint": collector.endpoint},
+            }
+        )
+        result = asyncio.run(measure(settings, args.requests, args.path))
+        result["overhead"] = result["mean"] / baseline["mean"] - 1
+        result["spans_exported"] = collector.spans
+        result["export_requests"] = collector.requests
+        result["exported_bytes"] = collector.received_bytes
+        results[f"ratio={ratio}"] = result
+    collector.shutdown()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""This module contains tools used to benchmark the application"""
+from ..lib.asgi import ASGIClient, ASGIResponse
+
+__all__ = ["ASGIClient", "ASGIResponse"]
@@ -0,0 +1,148 @@
+"""Generate synthetic employee dumps used by benchmarks.
+
+Names and teams follow skewed distributions (a few values are very common, most values are rare),
+so that lookups by lastname return a realistic number of matches.
+
+Records are written one at a time, so generating large dumps (E.G, 1M rows) does not require holding them in memory.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import pathlib
+import random
+import re
+import typing
+import uuid
+
+FIRSTNAMES = (
+    "James Mary John Patricia Robert Jennifer Michael Linda William Elizabeth David Barbara Richard Susan "
+    "Joseph Jessica Thomas Sarah Charles Karen Christopher Nancy Daniel Lisa Matthew Betty Anthony Margaret "
+    "Mark Sandra Donald Ashley Steven Kimberly Paul Emily Andrew Donna Joshua Michelle Kenneth Dorothy Kevin "
+    "Carol Brian Amanda George Melissa Timothy Deborah Ronald Stephanie Edward Rebecca Jason Sharon Jeffrey "
+    "Laura Ryan Cynthia Jacob Kathleen Gary Amy Nicholas Angela Eric Shirley Jonathan Anna Stephen Brenda "
+    "Larry Pamela Justin Emma Scott Nicole Brandon Helen Benjamin Samantha Samuel Katherine Gregory Christine "
+    "Alexander Debra Frank Rachel Patrick Carolyn Raymond Janet Jack Catherine Dennis Maria Jerry Heather"
+).split()
+LASTNAMES = (
+    "Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Hernandez Lopez Gonzalez "
+    "Wilson Anderson Thomas Taylor Moore Jackson Martin Lee Perez Thompson White Harris Sanchez Clark "
+    "Ramirez Lewis Robinson Walker Young Allen King Wright Scott Torres Nguyen Hill Flores Green Adams "
+    "Nelson Baker Hall Rivera Campbell Mitchell Carter Roberts Gomez Phillips Evans Turner Diaz Parker "
+    "Cruz Edwards Collins Reyes Stewart Morris Morales Murphy Cook Rogers Gutierrez Ortiz Morgan Cooper "
+    "Peterson Bailey Reed Kelly Howard Ramos Kim Cox Ward Richardson Watson Brooks Chavez Wood James "
+    "Bennett Gray Mendoza Ruiz Hughes Price Alvarez Castillo Sanders Patel Myers Long Ross Foster Jimenez"
+).split()
+TEAMS = (
+    "engineering sales support marketing operations finance legal security data design "
+    "product research hr procurement facilities"
+).split()
+ANIMALS = "cat dog rabbit horse parrot turtle fox owl dolphin panda".split()
+HOBBIES = "reading running cooking chess climbing gaming music painting photography cycling".split()
+
+
+def zipf_weights(count: int, exponent: float = 1.1) -> typing.List[float]:
+    """Weights of a Zipf distribution: the n-th most common value has a weight proportional to 1 / n^exponent"""
+    return [1 / (rank**exponent) for rank in range(1, count + 1)]
+
+
+class EmployeeGenerator:
+    """Generate random employee records. Output is deterministic for a given seed.
+
+    Arguments:
+        seed: Seed of the random number generator.
+        lastname_variants: Number of distinct lastnames. Suffixes are appended to base lastnames
+            so that the number of distinct lastnames grows with dataset size.
+    """
+
+    def __init__(self, seed: int = 0, lastname_variants: int = 10000) -> None:
+        self.random = random.Random(seed)
+        self.lastnames = [
+            name if variant == 0 else f"{name}-{variant}"
+            for variant in range(max(lastname_variants // len(LASTNAMES), 1))
+            for name in LASTNAMES
+        ]
+        # Cumulative weights are computed once, else each draw would be linear in the number of values
+        self.lastname_weights = list(
+            itertools.accumulate(zipf_weights(len(self.lastnames)))
+        )
+        self.firstname_weights = list(
+            itertools.accumulate(zipf_weights(len(FIRSTNAMES), 0.8))
+        )
+        self.team_weights = list(itertools.accumulate(zipf_weights(len(TEAMS), 0.7)))
+
+    def record(self) -> typing.Dict[str, typing.Any]:
+        """Generate a single record, using field aliases (I.E, "_id" instead of "id")"""
+        rng = self.random
+        record: typing.Dict[str, typing.Any] = {
+            "_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "lastname": rng.choices(self.lastnames, cum_weights=self.lastname_weights)[
+                0
+            ],
+            "firstname": rng.choices(FIRSTNAMES, cum_weights=self.firstname_weights)[0],
+            "team": rng.choices(TEAMS, cum_weights=self.team_weights)[0],
+        }
+        # Optional fields are not always set
+        if rng.random() < 0.9:
+            record["age"] = min(max(int(rng.gauss(40, 10)), 18), 70)
+        if rng.random() < 0.5:
+            record["favorite_animal"] = rng.choice(ANIMALS)
+        if rng.random() < 0.5:
+            record["hobby"] = rng.choice(HOBBIES)
+        return record
+
+    def records(self, count: int) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+        for _ in range(count):
+            yield self.record()
+
+
+def generate_dump(
+    path: typing.Union[str, pathlib.Path], rows: int, seed: int = 0
+) -> pathlib.Path:
+    """Write a synthetic employee dump holding given number of rows. Return path to the dump."""
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    generator = EmployeeGenerator(
+        seed, lastname_variants=max(rows // 20, len(LASTNAMES))
+    )
+    with open(path, "w", encoding="utf-8") as dump:
+        dump.write("[")
+        for idx, record in enumerate(generator.records(rows)):
+            if idx:
+                dump.write(",")
+            dump.write(json.dumps(record, separators=(",", ":")))
+        dump.write("]")
+    return path
+
+
+def sample_values(
+    path: typing.Union[str, pathlib.Path], size: int = 1000, seed: int = 0
+) -> typing.Tuple[typing.List[str], typing.List[str]]:
+    """Return a random sample of ids and a random sample of lastnames found in a dump, used to build requests.
+
+    Dump is scanned using regular expressions instead of being parsed, so that large dumps can be sampled cheaply.
+    """
+    raw = pathlib.Path(path).read_bytes()
+    rng = random.Random(seed)
+    return (
+        _reservoir(_ID_PATTERN.finditer(raw), size, rng),
+        _reservoir(_LASTNAME_PATTERN.finditer(raw), size, rng),
+    )
+
+
+_ID_PATTERN = re.compile(rb'"_id":\s*"([^"]+)"')
+_LASTNAME_PATTERN = re.compile(rb'"lastname":\s*"([^"]+)"')
+
+
+def _reservoir(
+    matches: typing.Iterator[typing.Match[bytes]], size: int, rng: random.Random
+) -> typing.List[str]:
+    sample: typing.List[str] = []
+    for idx, match in enumerate(matches):
+        if idx < size:
+            sample.append(match.group(1).decode("utf-8"))
+            continue
+        position = rng.randint(0, idx)
+        if position < size:
+            sample[position] = match.group(1).decode("utf-8")
+    return sample
@@ -0,0 +1,129 @@
+"""A minimal HTTP/1.1 client used to drive a server over loopback.
+
+Each client holds a single keep-alive connection, so that benchmarks measure the server rather than connection setup.
+It exposes the same interface as `demo_app.lib.asgi.ASGIClient`.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import types
+import typing
+
+from ..lib.asgi import ASGIResponse
+
+
+class HTTPClient:
+    """Send requests over a single keep-alive TCP connection.
+
+    Requests must not be sent concurrently using the same client.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._reader: typing.Optional[asyncio.StreamReader] = None
+        self._writer: typing.Optional[asyncio.StreamWriter] = None
+
+    async def connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        self._reader = self._writer = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        query_string: str = "",
+        json_body: typing.Any = None,
+        headers: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> ASGIResponse:
+        """Send a request and wait for the complete response. Connection is opened again if server closed it."""
+        if self._writer is None or self._writer.is_closing():
+            await self.connect()
+        try:
+            return await self._request(method, path, query_string, json_body, headers)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            raise
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        query_string: str,
+        json_body: typing.Any,
+        headers: typing.Optional[typing.Dict[str, str]],
+    ) -> ASGIResponse:
+        assert self._reader is not None and self._writer is not None
+        body = b"" if json_body is None else json.dumps(json_body).encode("utf-8")
+        target = f"{path}?{query_string}" if query_string else path
+        lines = [
+            f"{method.upper()} {target} HTTP/1.1",
+            f"host: {self.host}:{self.port}",
+            f"content-length: {len(body)}",
+        ]
+        if json_body is not None:
+            lines.append("content-type: application/json")
+        for key, value in (headers or {}).items():
+            lines.append(f"{key}: {value}")
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self._writer.drain()
+        # Read status line and headers
+        status_line = await self._reader.readuntil(b"\r\n")
+        status_code = int(status_line.split(b" ", 2)[1])
+        response_headers: typing.List[typing.Tuple[bytes, bytes]] = []
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, header_value = line.partition(b":")
+            response_headers.append((name.strip().lower(), header_value.strip()))
+        headers_dict = dict(response_headers)
+        # Read body
+        if headers_dict.get(b"transfer-encoding") == b"chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).strip(), 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            response_body = b"".join(chunks)
+        else:
+            length = int(headers_dict.get(b"content-length", b"0"))
+            response_body = await self._reader.readexactly(length)
+        if headers_dict.get(b"connection") == b"close":
+            await self.close()
+        return ASGIResponse(status_code, response_headers, response_body)
+
+    async def get(self, path: str, **kwargs: typing.Any) -> ASGIResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: typing.Any) -> ASGIResponse:
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path: str, **kwargs: typing.Any) -> ASGIResponse:
+        return await self.request("PUT", path, **kwargs)
+
+    async def delete(self, path: str, **kwargs: typing.Any) -> ASGIResponse:
+        return await self.request("DELETE", path, **kwargs)
+
+    async def __aenter__(self) -> HTTPClient:
+        await self.connect()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: typing.Optional[typing.Type[BaseException]] = None,
+        exc: typing.Optional[BaseException] = None,
+        tb: typing.Optional[types.TracebackType] = None,
+    ) -> None:
+        await self.close()
@@ -0,0 +1,373 @@
+"""Load test driving the application with concurrent clients.
+
+The application is either driven in-process through ASGI (no network involved, client and server share the event loop),
+or over loopback against a server spawned in a subprocess. In loopback mode, time until the server accepts
+connections is reported as "startup".
+
+Each client sends requests one after the other, picking operations according to a weighted mix:
+
+- "read": list all employees (GET /employees/)
+- "lookup": find an employee by lastname (GET /employees/lastnames/{lastname})
+- "write": update an existing employee (PUT /employees/{id})
+- "create": create a new employee (POST /employees/)
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import itertools
+import pathlib
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+from demo_app.lib.server import select_http, select_loop
+
+from ..lib.asgi import ASGIClient, ASGIResponse
+from .dataset import ANIMALS, FIRSTNAMES, HOBBIES, TEAMS, generate_dump, sample_values
+from .http import HTTPClient
+from .report import environment, summarize
+
+OPERATIONS = ("read", "lookup", "write", "create")
+DEFAULT_MIX = {"read": 0.1, "lookup": 0.8, "write": 0.1}
+# Implementations compared by `run_server_comparison`
+LOOPS = ("asyncio", "uvloop")
+HTTP_PARSERS = ("h11", "httptools")
+
+
+class Client(typing.Protocol):
+    async def request(
+        self,
+        method: str,
+        path: str,
+        query_string: str = "",
+        json_body: typing.Any = None,
+        headers: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> ASGIResponse:
+        ...
+
+
+@dataclasses.dataclass
+class LoadTestConfig:
+    """Configuration of a load test"""
+
+    # Number of rows of the generated dataset (ignored when db is provided)
+    rows: int = 10000
+    # Use an existing dump instead of generating one. Dump is copied before the test.
+    db: typing.Optional[str] = None
+    # Directory where generated datasets are cached. A temporary directory is used by default.
+    data_dir: typing.Optional[str] = None
+    # "asgi" drives the application in-process, "loopback" spawns a server
+    mode: typing.Literal["asgi", "loopback"] = "asgi"
+    # Number of concurrent clients
+    clients: int = 16
+    # Duration of the measurement (in seconds), excluding warmup
+    duration: float = 10.0
+    # Duration of the warmup (in seconds). Requests sent during warmup are not measured.
+    warmup: float = 2.0
+    # Relative weights of operations
+    mix: typing.Dict[str, float] = dataclasses.field(
+        default_factory=lambda: dict(DEFAULT_MIX)
+    )
+    # Seed used to generate dataset and pick operations
+    seed: int = 0
+    # Extra command line arguments given to spawned server (loopback mode only)
+    server_args: typing.List[str] = dataclasses.field(default_factory=list)
+    # Maximum time (in seconds) to wait for spawned server to accept connections
+    startup_timeout: float = 120.0
+
+
+class Recorder:
+    """Collect latencies per operation"""
+
+    def __init__(self) -> None:
+        self.latencies: typing.Dict[str, typing.List[float]] = {
+            op: [] for op in OPERATIONS
+        }
+        self.errors: typing.Dict[str, int] = {op: 0 for op in OPERATIONS}
+
+    def record(self, operation: str, latency: float, ok: bool) -> None:
+        if ok:
+            self.latencies[operation].append(latency)
+        else:
+            self.errors[operation] += 1
+
+    def results(self, duration: float) -> typing.Dict[str, typing.Dict[str, float]]:
+        results = {
+            "total": summarize(
+                list(itertools.chain(*self.latencies.values())),
+                duration,
+                sum(self.errors.values()),
+            )
+        }
+        for op in OPERATIONS:
+            if self.latencies[op] or self.errors[op]:
+                results[op] = summarize(self.latencies[op], duration, self.errors[op])
+        return results
+
+
+class Workload:
+    """Build requests for each operation out of values sampled from the dataset"""
+
+    def __init__(
+        self, ids: typing.List[str], lastnames: typing.List[str], seed: int = 0
+    ) -> None:
+        if not ids or not lastnames:
+            raise ValueError("Dataset must not be empty")
+        self.ids = ids
+        self.lastnames = lastnames
+        self.random = random.Random(seed)
+
+    def request(
+        self, operation: str
+    ) -> typing.Tuple[str, str, typing.Dict[str, typing.Any]]:
+        """Return method, path and keyword arguments of a request"""
+        rng = self.random
+        if operation == "read":
+            return "GET", "/employees/", {}
+        if operation == "lookup":
+            return "GET", f"/employees/lastnames/{rng.choice(self.lastnames)}", {}
+        if operation == "write":
+            # Fields are updated with values of the same size, so that dataset size does not drift
+            field, values = rng.choice(
+                [("hobby", HOBBIES), ("favorite_animal", ANIMALS), ("team", TEAMS)]
+            )
+            return (
+                "PUT",
+                f"/employees/{rng.choice(self.ids)}",
+                {"json_body": {field: rng.choice(values)}},
+            )
+        if operation == "create":
+            return (
+                "POST",
+                "/employees/",
+                {
+                    "json_body": {
+                        "lastname": rng.choice(self.lastnames),
+                        "firstname": rng.choice(FIRSTNAMES),
+                        "team": rng.choice(TEAMS),
+                    }
+                },
+            )
+        raise ValueError(f"Unknown operation: {operation}")
+
+
+async def run_client(
+    client: Client,
+    workload: Workload,
+    mix: typing.Dict[str, float],
+    recorder: Recorder,
+    warmup_end: float,
+    deadline: float,
+) -> None:
+    operations = list(mix)
+    cum_weights = list(itertools.accumulate(mix.values()))
+    while True:
+        operation = workload.random.choices(operations, cum_weights=cum_weights)[0]
+        method, path, kwargs = workload.request(operation)
+        start = time.perf_counter()
+        if start >= deadline:
+            return
+        try:
+            response = await client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except (ConnectionError, asyncio.IncompleteReadError):
+            ok = False
+        if start >= warmup_end:
+            recorder.record(operation, time.perf_counter() - start, ok)
+
+
+def prepare_dataset(config: LoadTestConfig, workdir: pathlib.Path) -> pathlib.Path:
+    """Return path to a copy of the dataset, which can be modified by the load test"""
+    if config.db is not None:
+        source = pathlib.Path(config.db)
+    else:
+        data_dir = pathlib.Path(config.data_dir) if config.data_dir else workdir
+        source = data_dir / f"employees-{config.rows}-{config.seed}.json"
+        if not source.exists():
+            generate_dump(source, config.rows, config.seed)
+    target = workdir / "employees.json"
+    shutil.copyfile(source, target)
+    return target
+
+
+def run_load_test(config: LoadTestConfig) -> typing.Dict[str, typing.Any]:
+    """Run a load test and return its result"""
+    unknown = set(config.mix) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"Unknown operations: {', '.join(sorted(unknown))}")
+    with tempfile.TemporaryDirectory(prefix="demo-app-bench-") as tmp:
+        db = prepare_dataset(config, pathlib.Path(tmp))
+        ids, lastnames = sample_values(db, seed=config.seed)
+        workload = Workload(ids, lastnames, config.seed)
+        if config.mode == "asgi":
+            results = asyncio.run(_run_asgi(config, db, workload))
+        else:
+            results = asyncio.run(_run_loopback(config, db, workload))
+    return {
+        "benchmark": "load",
+        "config": dataclasses.asdict(config),
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def run_server_comparison(
+    config: LoadTestConfig,
+    loops: typing.Sequence[str] = LOOPS,
+    parsers: typing.Sequence[str] = HTTP_PARSERS,
+) -> typing.Dict[str, typing.Any]:
+    """Run the load test against a spawned server using each combination of event loop and HTTP parser.
+
+    Benchmarks are named "<operation>@<loop>+<http>". Combinations using an implementation which is not installed
+    are skipped and listed in result config.
+    """
+    results: typing.Dict[str, typing.Any] = {}
+    skipped: typing.List[str] = []
+    with tempfile.TemporaryDirectory(prefix="demo-app-bench-") as tmp:
+        # Dataset is generated once for all combinations
+        config = dataclasses.replace(
+            config, mode="loopback", data_dir=config.data_dir or tmp
+        )
+        for loop, http in itertools.product(loops, parsers):
+            combination = f"{loop}+{http}"
+            if select_loop(loop) != loop or select_http(http) != http:  # type: ignore[arg-type]
+                skipped.append(combination)
+                continue
+            result = run_load_test(
+                dataclasses.replace(
+                    config,
+                    server_args=[*config.server_args, "--loop", loop, "--http", http],
+                )
+            )
+            for name, metrics in result["results"].items():
+                results[f"{name}@{combination}"] = metrics
+    return {
+        "benchmark": "servers",
+        "config": {
+            **dataclasses.asdict(config),
+            "loops": list(loops),
+            "http": list(parsers),
+            "skipped": skipped,
+        },
+        "environment": environment(),
+        "results": results,
+    }
+
+
+async def _drive(
+    clients: typing.Sequence[Client], config: LoadTestConfig, workload: Workload
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    recorder = Recorder()
+    start = time.perf_counter()
+    warmup_end = start + config.warmup
+    deadline = warmup_end + config.duration
+    await asyncio.gather(
+        *(
+            run_client(client, workload, config.mix, recorder, warmup_end, deadline)
+            for client in clients
+        )
+    )
+    return recorder.results(config.duration)
+
+
+async def _run_asgi(
+    config: LoadTestConfig, db: pathlib.Path, workload: Workload
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    from demo_app.entrypoint import create_container
+    from demo_app.settings import AppSettings
+
+    container = create_container(
+        AppSettings.parse_obj(
+            {
+                "database": {"path": db},
+                "logging": {"level": "warning", "access_log": False},
+            }
+        )
+    )
+    # A single client handles application lifespan, all clients share the application
+    async with ASGIClient(container.app):
+        clients = [
+            ASGIClient(container.app, client=("bench", idx))
+            for idx in range(config.clients)
+        ]
+        return await _drive(clients, config, workload)
+
+
+async def _run_loopback(
+    config: LoadTestConfig, db: pathlib.Path, workload: Workload
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    port = _free_port()
+    started = time.perf_counter()
+    with _spawn_server(config, db, port):
+        await _wait_for_server(port, config.startup_timeout)
+        # Time until server accepts connections, including interpreter startup and database load
+        startup = time.perf_counter() - started
+        clients = [HTTPClient("127.0.0.1", port) for _ in range(config.clients)]
+        try:
+            results = await _drive(clients, config, workload)
+        finally:
+            for client in clients:
+                await client.close()
+    results["startup"] = {"startup_ms": startup * 1000}
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]  # type: ignore[no-any-return]
+
+
+@contextlib.contextmanager
+def _spawn_server(
+    config: LoadTestConfig, db: pathlib.Path, port: int
+) -> typing.Iterator[subprocess.Popen[bytes]]:
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "demo_app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--db",
+            db.as_posix(),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+            *config.server_args,
+        ]
+    )
+    try:
+        yield process
+    finally:
+        # Let the server shutdown gracefully, but do not wait forever
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+async def _wait_for_server(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Server did not start within {timeout} seconds")
+            await asyncio.sleep(0.1)
+        else:
+            writer.close()
+            return
@@ -0,0 +1,247 @@
+"""Microbenchmarks of library code found on the hot path of the application.
+
+Each benchmark times a single operation many times (at least `min_rounds` times, and during at least `min_time` seconds).
+Preparation and cleanup of each round (E.G, removing the employee created by the previous round) are not timed.
+
+Database benchmarks run against synthetic dumps of several sizes, and are named "<operation>@<rows>".
+Results share the layout of load test results, so they can be compared using `demo-app bench compare`.
+"""
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import fnmatch
+import json
+import os
+import pathlib
+import random
+import shutil
+import tempfile
+import time
+import typing
+
+from demo_app.lib.database import EmployeeDatabase
+from demo_app.lib.models import EmployeeFormCreate, EmployeeFormUpdate
+
+from .dataset import FIRSTNAMES, HOBBIES, TEAMS, generate_dump, sample_values
+from .report import environment, summarize
+
+DEFAULT_SIZES = (1000, 10000)
+
+
+@dataclasses.dataclass
+class MicroBenchmarkConfig:
+    """Configuration of microbenchmarks"""
+
+    # Number of rows of the dumps used by database benchmarks
+    sizes: typing.List[int] = dataclasses.field(
+        default_factory=lambda: list(DEFAULT_SIZES)
+    )
+    # Minimum time (in seconds) spent measuring each benchmark
+    min_time: float = 0.5
+    # Minimum number of measurements of each benchmark
+    min_rounds: int = 5
+    # Maximum number of measurements of each benchmark
+    max_rounds: int = 100000
+    # Only run benchmarks whose name match one of those glob patterns (E.G, "database.find_one.*")
+    select: typing.List[str] = dataclasses.field(default_factory=list)
+    # Seed used to generate datasets and pick values
+    seed: int = 0
+    # Directory where generated datasets are cached. A temporary directory is used by default.
+    data_dir: typing.Optional[str] = None
+
+
+@dataclasses.dataclass
+class MicroBenchmark:
+    """A timed operation, with optional untimed preparation and cleanup.
+
+    Value returned by `setup` is given to `func`, and value returned by `func` is given to `teardown`.
+    """
+
+    name: str
+    func: typing.Callable[[typing.Any], typing.Any]
+    setup: typing.Callable[[], typing.Any] = lambda: None
+    teardown: typing.Callable[[typing.Any], None] = lambda _: None
+
+
+def measure(
+    benchmark: MicroBenchmark,
+    min_time: float = 0.5,
+    min_rounds: int = 5,
+    max_rounds: int = 100000,
+) -> typing.Dict[str, float]:
+    """Time a benchmark repeatedly. Throughput is the number of operations per second spent within operation."""
+    # A first untimed round warms up caches
+    benchmark.teardown(benchmark.func(benchmark.setup()))
+    latencies: typing.List[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(latencies) < max_rounds:
+        value = benchmark.setup()
+        start = time.perf_counter()
+        result = benchmark.func(value)
+        end = time.perf_counter()
+        latencies.append(end - start)
+        benchmark.teardown(result)
+        if len(latencies) >= min_rounds and end >= deadline:
+            break
+    return summarize(latencies, sum(latencies))
+
+
+def database_benchmarks(
+    path: pathlib.Path, rows: int, seed: int = 0
+) -> typing.Iterator[MicroBenchmark]:
+    """Benchmarks of EmployeeDatabase operations, using a copy of the dump found at given path"""
+    db = EmployeeDatabase(path)
+    ids, lastnames = sample_values(path, seed=seed)
+    rng = random.Random(seed)
+
+    def random_id() -> str:
+        return rng.choice(ids)
+
+    def random_lastname() -> str:
+        return rng.choice(lastnames)
+
+    def new_employee() -> EmployeeFormCreate:
+        return EmployeeFormCreate(
+            firstname=rng.choice(FIRSTNAMES),
+            lastname=rng.choice(lastnames),
+            team=rng.choice(TEAMS),
+        )
+
+    def remove_employee(employee: typing.Any) -> None:
+        db.employees.pop(employee.id)
+
+    update = EmployeeFormUpdate(hobby=rng.choice(HOBBIES))
+
+    yield MicroBenchmark(f"database.init@{rows}", lambda _: EmployeeDatabase(path))
+    yield MicroBenchmark(f"database.refresh@{rows}", lambda _: db.refresh())
+    yield MicroBenchmark(
+        f"database.find_one.id@{rows}",
+        lambda _id: db.find_one(id=_id),
+        setup=random_id,
+    )
+    yield MicroBenchmark(
+        f"database.find_one.lastname@{rows}",
+        lambda lastname: db.find_one(lastname=lastname),
+        setup=random_lastname,
+    )
+    yield MicroBenchmark(
+        f"database.filter.id@{rows}",
+        lambda _id: list(db.filter(id=_id)),
+        setup=random_id,
+    )
+    yield MicroBenchmark(
+        f"database.filter.lastname@{rows}",
+        lambda lastname: list(db.filter(lastname=lastname)),
+        setup=random_lastname,
+    )
+    # Created employees are removed, so that database size does not drift
+    yield MicroBenchmark(
+        f"database.create_one@{rows}",
+        lambda employee: db.create_one(employee, save=False),
+        setup=new_employee,
+        teardown=remove_employee,
+    )
+    yield MicroBenchmark(
+        f"database.create_one.save@{rows}",
+        lambda employee: db.create_one(employee, save=True),
+        setup=new_employee,
+        teardown=remove_employee,
+    )
+    yield MicroBenchmark(
+        f"database.update_one@{rows}",
+        lambda _id: db.update_one({"id": _id}, update, save=False),
+        setup=random_id,
+    )
+    yield MicroBenchmark(
+        f"database.update_one.save@{rows}",
+        lambda _id: db.update_one({"id": _id}, update, save=True),
+        setup=random_id,
+    )
+    yield MicroBenchmark(f"database.json@{rows}", lambda _: db.json())
+
+
+def settings_benchmarks(workdir: pathlib.Path) -> typing.Iterator[MicroBenchmark]:
+    """Benchmarks of settings parsing and container construction"""
+    from demo_app.entrypoint import create_container
+    from demo_app.settings import AppSettings
+
+    config_file = workdir / "config.json"
+    config_file.write_text(
+        json.dumps(
+            {
+                "server": {"host": "127.0.0.1", "port": 8080},
+                "logging": {"level": "warning", "access_log": False},
+                "telemetry": {"metrics_enabled": False, "traces_enabled": False},
+            }
+        )
+    )
+    environ = {"SERVER_DEBUG": "false", "LOG_RENDERER": "json"}
+
+    def from_config_file(_: None) -> AppSettings:
+        with _environ(environ):
+            return AppSettings.from_config_file(config_file=config_file)
+
+    yield MicroBenchmark("settings.from_config_file", from_config_file)
+    yield MicroBenchmark(
+        "container.create",
+        lambda settings: create_container(settings),
+        setup=lambda: AppSettings.parse_obj(
+            {
+                "logging": {"level": "warning", "access_log": False},
+                "telemetry": {"metrics_enabled": False, "traces_enabled": False},
+            }
+        ),
+    )
+
+
+def run_microbenchmarks(config: MicroBenchmarkConfig) -> typing.Dict[str, typing.Any]:
+    """Run microbenchmarks and return their result"""
+    results: typing.Dict[str, typing.Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="demo-app-micro-") as tmp:
+        workdir = pathlib.Path(tmp)
+        for benchmark in _benchmarks(config, workdir):
+            if config.select and not any(
+                fnmatch.fnmatchcase(benchmark.name, pattern)
+                for pattern in config.select
+            ):
+                continue
+            results[benchmark.name] = measure(
+                benchmark, config.min_time, config.min_rounds, config.max_rounds
+            )
+    return {
+        "benchmark": "micro",
+        "config": dataclasses.asdict(config),
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def _benchmarks(
+    config: MicroBenchmarkConfig, workdir: pathlib.Path
+) -> typing.Iterator[MicroBenchmark]:
+    data_dir = pathlib.Path(config.data_dir) if config.data_dir else workdir
+    for rows in config.sizes:
+        source = data_dir / f"employees-{rows}-{config.seed}.json"
+        if not source.exists():
+            generate_dump(source, rows, config.seed)
+        # Benchmarks which save database modify the dump
+        path = workdir / f"micro-{rows}.json"
+        shutil.copyfile(source, path)
+        yield from database_benchmarks(path, rows, config.seed)
+    yield from settings_benchmarks(workdir)
+
+
+@contextlib.contextmanager
+def _environ(values: typing.Dict[str, str]) -> typing.Iterator[None]:
+    """Temporarily set environment variables"""
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
@@ -0,0 +1,172 @@
+"""Summarize benchmark measurements and compare benchmark results.
+
+All benchmarks produce JSON results sharing the same layout:
+
+    {
+        "benchmark": "<kind of benchmark>",
+        "config": {...},
+        "environment": {...},
+        "results": {
+            "<name>": {"throughput": ..., "p50_ms": ..., "p95_ms": ..., "p99_ms": ..., ...},
+            ...
+        }
+    }
+
+so that any two results of the same benchmark can be compared.
+"""
+from __future__ import annotations
+
+import dataclasses
+import json
+import math
+import os
+import pathlib
+import platform
+import sys
+import typing
+
+from demo_app.settings import AppMeta
+
+# Metrics which are compared, and whether a higher value is better
+COMPARED_METRICS = {
+    "throughput": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "startup_ms": False,
+}
+
+
+def percentile(values: typing.Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return math.nan
+    return values[min(max(math.ceil(q * len(values)) - 1, 0), len(values) - 1)]
+
+
+def summarize(
+    latencies: typing.List[float], duration: float, errors: int = 0
+) -> typing.Dict[str, float]:
+    """Summarize latencies (in seconds) measured during given duration (in seconds)"""
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput": count / duration if duration else math.nan,
+        "mean_ms": sum(latencies) / count * 1000 if count else math.nan,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if count else math.nan,
+    }
+
+
+def environment() -> typing.Dict[str, typing.Any]:
+    """Describe the environment in which a benchmark ran"""
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "demo_app": AppMeta().version,
+    }
+
+
+def write_result(
+    result: typing.Dict[str, typing.Any],
+    path: typing.Union[str, pathlib.Path, None] = None,
+) -> str:
+    """Serialize a result as JSON, and write it to a file when a path is provided"""
+    output = json.dumps(result, indent=2, sort_keys=True)
+    if path is not None:
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(output + "\n")
+    return output
+
+
+def read_result(path: typing.Union[str, pathlib.Path]) -> typing.Dict[str, typing.Any]:
+    return json.loads(pathlib.Path(path).read_text())  # type: ignore[no-any-return]
+
+
+@dataclasses.dataclass
+class Comparison:
+    """Comparison of a single metric between a baseline and a candidate result"""
+
+    name: str
+    metric: str
+    baseline: float
+    candidate: float
+    higher_is_better: bool
+    tolerance: float
+
+    @property
+    def change(self) -> float:
+        """Relative change from baseline to candidate"""
+        if not self.baseline:
+            return 0.0
+        return (self.candidate - self.baseline) / self.baseline
+
+    @property
+    def regression(self) -> bool:
+        if self.higher_is_better:
+            return self.change < -self.tolerance
+        return self.change > self.tolerance
+
+
+def compare(
+    baseline: typing.Dict[str, typing.Any],
+    candidate: typing.Dict[str, typing.Any],
+    tolerance: float = 0.1,
+) -> typing.List[Comparison]:
+    """Compare metrics of benchmarks found in both results.
+
+    Raises:
+        ValueError: When results do not come from the same kind of benchmark
+    """
+    if baseline.get("benchmark") != candidate.get("benchmark"):
+        raise ValueError(
+            f"Cannot compare results of different benchmarks: {baseline.get('benchmark')} and {candidate.get('benchmark')}"
+        )
+    comparisons: typing.List[Comparison] = []
+    for name, baseline_metrics in baseline["results"].items():
+        candidate_metrics = candidate["results"].get(name)
+        if candidate_metrics is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in baseline_metrics or metric not in candidate_metrics:
+                continue
+            comparisons.append(
+                Comparison(
+                    name,
+                    metric,
+                    baseline_metrics[metric],
+                    candidate_metrics[metric],
+                    higher_is_better,
+                    tolerance,
+                )
+            )
+    return comparisons
+
+
+def format_comparisons(comparisons: typing.List[Comparison]) -> str:
+    """Format comparisons as a text table"""
+    rows = [("benchmark", "metric", "baseline", "candidate", "change", "")]
+    for comparison in comparisons:
+        rows.append(
+            (
+                comparison.name,
+                comparison.metric,
+                f"{comparison.baseline:.3f}",
+                f"{comparison.candidate:.3f}",
+                f"{comparison.change:+.1%}",
+                "REGRESSION" if comparison.regression else "",
+            )
+        )
+    widths = [max(len(row[idx]) for row in rows) for idx in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
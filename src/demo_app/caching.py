@@ -0,0 +1,135 @@
+"""This module lets routes cache their responses in the container response cache.
+
+Routes opt in using the `cache_response` decorator:
+
+    @router.get("/lastnames/{lastname}", response_model=EmployeeInDB)
+    @cache_response(ttl=60, tags=["employees:lastname:{lastname}"])
+    async def get_employee_by_lastname(lastname: str, ...) -> EmployeeInDB:
+        ...
+
+Tags are formatted using path parameters. Only successful GET responses are cached, keyed by path and query string.
+Routes must use `demo_app.routing.AppRoute` as route class.
+
+Endpoints can also access the cache directly using the `response_cache` dependency, E.G, to invalidate tags.
+"""
+from __future__ import annotations
+
+import dataclasses
+import typing
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .container import AppContainer
+from .lib.cache import ResponseCache
+from .providers.tenancy import scope_tenant
+
+F = typing.TypeVar("F", bound=typing.Callable[..., typing.Any])
+Handler = typing.Callable[[Request], typing.Coroutine[typing.Any, typing.Any, Response]]
+
+# Estimated memory used by a cached response besides its body and headers
+ENTRY_OVERHEAD = 256
+
+
+@dataclasses.dataclass(frozen=True)
+class CachePolicy:
+    """How responses of a route are cached"""
+
+    # Time to live (in seconds). Cache default time to live is used when None.
+    ttl: typing.Optional[float] = None
+    # Tags templates, formatted using path parameters
+    tags: typing.Tuple[str, ...] = ()
+
+
+class StoredResponse:
+    """Status code, headers and body of a rendered response"""
+
+    __slots__ = ("status_code", "raw_headers", "body")
+
+    def __init__(self, response: Response) -> None:
+        self.status_code = response.status_code
+        # Middlewares may modify headers of the original response once it is returned
+        self.raw_headers = list(response.raw_headers)
+        self.body: bytes = response.body
+
+    @property
+    def size(self) -> int:
+        return (
+            len(self.body)
+            + sum(len(name) + len(value) for name, value in self.raw_headers)
+            + ENTRY_OVERHEAD
+        )
+
+    def response(self) -> Response:
+        """Create a new response out of stored response"""
+        response = Response(self.body, status_code=self.status_code)
+        response.raw_headers = list(self.raw_headers)
+        return response
+
+
+def tenant_tags(
+    tenant: typing.Optional[str], tags: typing.Iterable[str]
+) -> typing.List[str]:
+    """Scope tags to a tenant, so that modifying a tenant does not invalidate responses of other tenants"""
+    if tenant is None:
+        return list(tags)
+    return [f"tenant:{tenant}:{tag}" for tag in tags]
+
+
+def cache_response(
+    ttl: typing.Optional[float] = None, tags: typing.Iterable[str] = ()
+) -> typing.Callable[[F], F]:
+    """Decorate an endpoint function to cache its responses"""
+    policy = CachePolicy(ttl, tuple(tags))
+
+    def decorator(endpoint: F) -> F:
+        endpoint.cache_policy = policy  # type: ignore[attr-defined]
+        return endpoint
+
+    return decorator
+
+
+def cache_policy(endpoint: typing.Any) -> typing.Optional[CachePolicy]:
+    """Get the cache policy of an endpoint function, if any"""
+    return getattr(endpoint, "cache_policy", None)
+
+
+def response_cache(request: Request) -> ResponseCache[StoredResponse]:
+    """Access the response cache from a Starlette/FastAPI request"""
+    return AppContainer.provider(request).cache
+
+
+async def cached_response(
+    cache: ResponseCache[StoredResponse],
+    policy: CachePolicy,
+    route: str,
+    request: Request,
+    handler: Handler,
+) -> Response:
+    """Return a cached response, or process request using handler and cache its response"""
+    tenant = scope_tenant(request.scope)
+    key = (tenant, request.scope["path"], request.scope["query_string"])
+    stored = cache.get(key)
+    if stored is not None:
+        cache.hits.labels(route).inc()
+        return stored.response()
+    cache.misses.labels(route).inc()
+    generation = cache.generation
+    response = await handler(request)
+    # Data may have been modified while response was computed
+    if (
+        response.status_code == 200
+        and cache.generation == generation
+        and hasattr(response, "body")
+    ):
+        stored = StoredResponse(response)
+        cache.set(
+            key,
+            stored,
+            stored.size,
+            ttl=policy.ttl,
+            tags=tenant_tags(
+                tenant, [tag.format(**request.path_params) for tag in policy.tags]
+            ),
+        )
+    return response
@@ -5,6 +5,7 @@
 from __future__ import annotations
 
 import argparse
+import sys
 import typing
 from collections import defaultdict
 
@@ -12,8 +13,19 @@
 
 from ..entrypoint import create_container
 from ..settings import AppSettings
+from .bench import run as run_bench
+from .db import run as run_db
 
-main_parser = argparse.ArgumentParser(add_help=True)
+# Subcommands are parsed by their own parser
+COMMANDS: typing.Dict[str, typing.Callable[..., None]] = {
+    "bench": run_bench,
+    "db": run_db,
+}
+
+main_parser = argparse.ArgumentParser(
+    add_help=True,
+    epilog="Subcommands: bench, db (run `demo-app <subcommand> --help` for details)",
+)
 
 
 main_parser.add_argument(
@@ -32,6 +44,34 @@
     help="Root path used to serve the application",
     default=None,
 )
+main_parser.add_argument(
+    "--loop",
+    help="Event loop implementation. Possible choices: [auto | asyncio | uvloop]",
+    default=None,
+)
+main_parser.add_argument(
+    "--http",
+    help="HTTP parser implementation. Possible choices: [auto | h11 | httptools]",
+    default=None,
+)
+main_parser.add_argument(
+    "--backlog",
+    help="Maximum number of connections waiting to be accepted",
+    type=int,
+    default=None,
+)
+main_parser.add_argument(
+    "--timeout-keep-alive",
+    help="Close idle keep-alive connections after this duration in seconds",
+    type=int,
+    default=None,
+)
+main_parser.add_argument(
+    "--h11-max-incomplete-event-size",
+    help="Maximum size in bytes of request line and headers parsed by h11",
+    type=int,
+    default=None,
+)
 main_parser.add_argument(
     "--debug",
     "-d",
@@ -59,6 +99,10 @@
     "-l",
     help="Logging level",
 )
+main_parser.add_argument(
+    "--log-renderer",
+    help="Select log renderer to use. Possible choices: [console | json]",
+)
 main_parser.add_argument("--access-log", help="Enable access log", action="store_true")
 main_parser.add_argument(
     "--no-access-log", help="Disable access log", action="store_false"
@@ -93,6 +137,10 @@
     help="Disable metrics",
     action="store_false",
 )
+main_parser.add_argument(
+    "--metrics-provider",
+    help="Select metrics provider to use. Possible choices: [native | prometheus]",
+)
 main_parser.add_argument(
     "--traces-exporter",
     help="Select traces exporter to use. Possible choices: [console | otlp]",
@@ -112,10 +160,13 @@
 
 
 def run(*args: str) -> None:
-    if args:
-        ns = main_parser.parse_args(args)
-    else:
-        ns = main_parser.parse_args()
+    if not args:
+        args = tuple(sys.argv[1:])
+    # Subcommands are dispatched before parsing server options
+    if args and args[0] in COMMANDS:
+        COMMANDS[args[0]](*args[1:])
+        return
+    ns = main_parser.parse_args(args)
     # Initialize raw application settings to be parsed
     raw_settings: typing.Dict[str, typing.Any] = defaultdict(dict)
     # Only settings explicitely provided by user should be considered
@@ -125,6 +176,18 @@ def run(*args: str) -> None:
         raw_settings["server"]["port"] = ns.port
     if ns.root_path:
         raw_settings["server"]["root_path"] = ns.root_path
+    if ns.loop:
+        raw_settings["server"]["loop"] = ns.loop.lower()
+    if ns.http:
+        raw_settings["server"]["http"] = ns.http.lower()
+    if ns.backlog:
+        raw_settings["server"]["backlog"] = ns.backlog
+    if ns.timeout_keep_alive is not None:
+        raw_settings["server"]["timeout_keep_alive"] = ns.timeout_keep_alive
+    if ns.h11_max_incomplete_event_size:
+        raw_settings["server"][
+            "h11_max_incomplete_event_size"
+        ] = ns.h11_max_incomplete_event_size
     if ns.debug is not None:
         raw_settings["server"]["debug"] = ns.debug
     if ns.no_debug is not None:
@@ -143,12 +206,16 @@ def run(*args: str) -> None:
         raw_settings["telemetry"]["traces_enabled"] = ns.traces
     if ns.no_traces is not None:
         raw_settings["telemetry"]["traces_enabled"] = ns.no_traces
+    if ns.metrics_provider is not None:
+        raw_settings["telemetry"]["metrics_provider"] = ns.metrics_provider.lower()
     if ns.traces_exporter is not None:
         raw_settings["telemetry"]["traces_exporter"] = ns.traces_exporter.lower()
     if ns.db:
         raw_settings["database"]["path"] = ns.db
     if ns.log_level:
         raw_settings["logging"]["level"] = ns.log_level.lower()
+    if ns.log_renderer:
+        raw_settings["logging"]["renderer"] = ns.log_renderer.lower()
     if ns.access_log is not None:
         raw_settings["logging"]["access_log"] = ns.debug
     if ns.no_access_log is not None:
@@ -0,0 +1,227 @@
+"""Command Line Interface used to benchmark the application.
+
+Usage:
+
+    demo-app bench generate --rows 100000 -o employees.json
+    demo-app bench run --rows 100000 --clients 16 --duration 10 -o result.json
+    demo-app bench servers --rows 10000 --loops asyncio,uvloop --http h11,httptools -o servers.json
+    demo-app bench micro --sizes 1000,10000 -o micro.json
+    demo-app bench compare baseline.json result.json --tolerance 0.1
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import typing
+
+from ..bench.dataset import generate_dump
+from ..bench.load import (
+    DEFAULT_MIX,
+    HTTP_PARSERS,
+    LOOPS,
+    OPERATIONS,
+    LoadTestConfig,
+    run_load_test,
+    run_server_comparison,
+)
+from ..bench.micro import DEFAULT_SIZES, MicroBenchmarkConfig, run_microbenchmarks
+from ..bench.report import compare, format_comparisons, read_result, write_result
+
+bench_parser = argparse.ArgumentParser(
+    prog="demo-app bench", description="Benchmark the application"
+)
+commands = bench_parser.add_subparsers(dest="command", required=True)
+
+generate_parser = commands.add_parser(
+    "generate", help="Generate a synthetic employee dump"
+)
+generate_parser.add_argument(
+    "--rows", type=int, default=10000, help="Number of employees"
+)
+generate_parser.add_argument("--seed", type=int, default=0, help="Random seed")
+generate_parser.add_argument(
+    "--output", "-o", required=True, help="Path of the generated dump"
+)
+
+run_parser = commands.add_parser("run", help="Run a load test")
+run_parser.add_argument(
+    "--rows", type=int, default=10000, help="Number of employees in generated dataset"
+)
+run_parser.add_argument(
+    "--db", default=None, help="Use an existing dump instead of generating one"
+)
+run_parser.add_argument(
+    "--data-dir", default=None, help="Directory where generated datasets are cached"
+)
+run_parser.add_argument(
+    "--mode",
+    choices=["asgi", "loopback"],
+    default="asgi",
+    help="Drive application in-process (asgi) or spawn a server (loopback)",
+)
+run_parser.add_argument(
+    "--clients", type=int, default=16, help="Number of concurrent clients"
+)
+run_parser.add_argument(
+    "--duration", type=float, default=10, help="Measurement duration in seconds"
+)
+run_parser.add_argument(
+    "--warmup", type=float, default=2, help="Warmup duration in seconds"
+)
+run_parser.add_argument(
+    "--mix",
+    default=",".join(f"{op}={weight}" for op, weight in DEFAULT_MIX.items()),
+    help=f"Weights of operations. Possible operations: [{' | '.join(OPERATIONS)}]",
+)
+run_parser.add_argument("--seed", type=int, default=0, help="Random seed")
+run_parser.add_argument(
+    "--server-arg",
+    action="append",
+    default=[],
+    help="Extra argument given to spawned server (loopback mode only). Can be repeated.",
+)
+run_parser.add_argument("--output", "-o", default=None, help="Write result to file")
+
+servers_parser = commands.add_parser(
+    "servers",
+    help="Run a load test against spawned servers using each event loop and HTTP parser",
+)
+servers_parser.add_argument(
+    "--rows", type=int, default=10000, help="Number of employees in generated dataset"
+)
+servers_parser.add_argument(
+    "--db", default=None, help="Use an existing dump instead of generating one"
+)
+servers_parser.add_argument(
+    "--data-dir", default=None, help="Directory where generated datasets are cached"
+)
+servers_parser.add_argument(
+    "--loops",
+    default=",".join(LOOPS),
+    help="Comma separated event loops. Loops which are not installed are skipped.",
+)
+servers_parser.add_argument(
+    "--http",
+    default=",".join(HTTP_PARSERS),
+    help="Comma separated HTTP parsers. Parsers which are not installed are skipped.",
+)
+servers_parser.add_argument(
+    "--clients", type=int, default=16, help="Number of concurrent clients"
+)
+servers_parser.add_argument(
+    "--duration", type=float, default=10, help="Measurement duration in seconds"
+)
+servers_parser.add_argument(
+    "--warmup", type=float, default=2, help="Warmup duration in seconds"
+)
+servers_parser.add_argument(
+    "--mix",
+    default=",".join(f"{op}={weight}" for op, weight in DEFAULT_MIX.items()),
+    help=f"Weights of operations. Possible operations: [{' | '.join(OPERATIONS)}]",
+)
+servers_parser.add_argument("--seed", type=int, default=0, help="Random seed")
+servers_parser.add_argument("--output", "-o", default=None, help="Write result to file")
+
+micro_parser = commands.add_parser(
+    "micro", help="Run microbenchmarks of database, settings and container"
+)
+micro_parser.add_argument(
+    "--sizes",
+    default=",".join(str(size) for size in DEFAULT_SIZES),
+    help="Comma separated numbers of employees of databases used by benchmarks",
+)
+micro_parser.add_argument(
+    "--min-time",
+    type=float,
+    default=0.5,
+    help="Minimum time spent measuring each benchmark, in seconds",
+)
+micro_parser.add_argument(
+    "--select",
+    action="append",
+    default=[],
+    help="Only run benchmarks matching glob pattern (E.G, 'database.find_one.*'). Can be repeated.",
+)
+micro_parser.add_argument(
+    "--data-dir", default=None, help="Directory where generated datasets are cached"
+)
+micro_parser.add_argument("--seed", type=int, default=0, help="Random seed")
+micro_parser.add_argument("--output", "-o", default=None, help="Write result to file")
+
+compare_parser = commands.add_parser(
+    "compare", help="Compare two results and fail on regressions"
+)
+compare_parser.add_argument("baseline", help="Baseline result file")
+compare_parser.add_argument("candidate", help="Candidate result file")
+compare_parser.add_argument(
+    "--tolerance",
+    type=float,
+    default=0.1,
+    help="Maximum relative degradation allowed (0.1 means 10%%)",
+)
+
+
+def parse_mix(value: str) -> typing.Dict[str, float]:
+    """Parse operations weights (E.G, "read=1,lookup=8,write=1")"""
+    mix: typing.Dict[str, float] = {}
+    for item in value.split(","):
+        operation, _, weight = item.partition("=")
+        mix[operation.strip()] = float(weight) if weight else 1.0
+    return mix
+
+
+def run(*args: str) -> None:
+    ns = bench_parser.parse_args(args)
+    if ns.command == "generate":
+        path = generate_dump(ns.output, ns.rows, ns.seed)
+        print(f"Generated {ns.rows} employees in {path.as_posix()}")
+    elif ns.command == "run":
+        config = LoadTestConfig(
+            rows=ns.rows,
+            db=ns.db,
+            data_dir=ns.data_dir,
+            mode=ns.mode,
+            clients=ns.clients,
+            duration=ns.duration,
+            warmup=ns.warmup,
+            mix=parse_mix(ns.mix),
+            seed=ns.seed,
+            server_args=ns.server_arg,
+        )
+        print(write_result(run_load_test(config), ns.output))
+    elif ns.command == "servers":
+        servers_config = LoadTestConfig(
+            rows=ns.rows,
+            db=ns.db,
+            data_dir=ns.data_dir,
+            mode="loopback",
+            clients=ns.clients,
+            duration=ns.duration,
+            warmup=ns.warmup,
+            mix=parse_mix(ns.mix),
+            seed=ns.seed,
+        )
+        print(
+            write_result(
+                run_server_comparison(
+                    servers_config, ns.loops.split(","), ns.http.split(",")
+                ),
+                ns.output,
+            )
+        )
+    elif ns.command == "micro":
+        micro_config = MicroBenchmarkConfig(
+            sizes=[int(size) for size in ns.sizes.split(",")],
+            min_time=ns.min_time,
+            select=ns.select,
+            data_dir=ns.data_dir,
+            seed=ns.seed,
+        )
+        print(write_result(run_microbenchmarks(micro_config), ns.output))
+    elif ns.command == "compare":
+        comparisons = compare(
+            read_result(ns.baseline), read_result(ns.candidate), ns.tolerance
+        )
+        print(format_comparisons(comparisons))
+        if any(comparison.regression for comparison in comparisons):
+            sys.exit(1)
@@ -0,0 +1,255 @@
+"""Command Line Interface used to maintain database dumps without starting the server.
+
+Records are validated in chunks within a pool of processes (one worker per core by default).
+Use `--workers 0` to validate within the running process instead.
+
+Usage:
+
+    demo-app db validate employees.json --workers 8
+    demo-app db stats employees.json
+    demo-app db export employees.json -o employees.jsonl --format jsonl
+    demo-app db export employees.json -o employees.arrow --format arrow
+    demo-app db import employees.jsonl --db employees.json --skip-invalid
+    demo-app db compact employees.json -o compacted.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import sys
+import typing
+
+from ..lib.columnar import ColumnarWriter, import_pyarrow
+from ..lib.database import EmployeeDatabase
+from ..lib.errors import ExportUnavailableError
+from ..lib.executors import ExecutorPool
+from ..lib.maintenance import (
+    CHUNK_SIZE,
+    ChunkOutput,
+    ChunkResult,
+    DumpFormatError,
+    DumpReport,
+    DumpWriter,
+    scan_dump,
+)
+from ..lib.models import EmployeeInDB
+
+db_parser = argparse.ArgumentParser(
+    prog="demo-app db", description="Maintain database dumps"
+)
+db_parser.add_argument(
+    "--workers",
+    type=int,
+    default=os.cpu_count() or 1,
+    help="Number of validation processes. Records are validated in-process when 0.",
+)
+db_parser.add_argument(
+    "--chunk-size",
+    type=int,
+    default=CHUNK_SIZE,
+    help="Number of records validated at once by a worker",
+)
+commands = db_parser.add_subparsers(dest="command", required=True)
+
+validate_parser = commands.add_parser(
+    "validate", help="Validate a dump and report errors and duplicate ids"
+)
+validate_parser.add_argument("path", help="Dump to validate (JSON array or JSON lines)")
+
+stats_parser = commands.add_parser(
+    "stats", help="Validate a dump and report statistics about employees"
+)
+stats_parser.add_argument("path", help="Dump to inspect (JSON array or JSON lines)")
+
+export_parser = commands.add_parser(
+    "export", help="Validate a dump and write valid employees to another format"
+)
+export_parser.add_argument("path", help="Dump to export (JSON array or JSON lines)")
+export_parser.add_argument(
+    "--output", "-o", required=True, help="Path of the exported dump"
+)
+export_parser.add_argument(
+    "--format",
+    choices=["json", "jsonl", "arrow", "parquet"],
+    default="jsonl",
+    help="Format of the exported dump. Arrow (IPC stream) and Parquet require pyarrow.",
+)
+export_parser.add_argument(
+    "--skip-invalid",
+    action="store_true",
+    help="Skip invalid records instead of failing",
+)
+
+import_parser = commands.add_parser(
+    "import", help="Validate a dump and merge its employees into a database"
+)
+import_parser.add_argument("path", help="Dump to import (JSON array or JSON lines)")
+import_parser.add_argument(
+    "--db", required=True, help="Database file. Created when it does not exist."
+)
+import_parser.add_argument(
+    "--replace",
+    action="store_true",
+    help="Replace employees of database instead of merging imported employees",
+)
+import_parser.add_argument(
+    "--skip-invalid",
+    action="store_true",
+    help="Skip invalid records instead of failing",
+)
+
+compact_parser = commands.add_parser(
+    "compact",
+    help="Rewrite a database without duplicate ids (last record wins) nor whitespaces",
+)
+compact_parser.add_argument("path", help="Database file")
+compact_parser.add_argument(
+    "--output",
+    "-o",
+    default=None,
+    help="Write compacted database to this file instead of rewriting database",
+)
+compact_parser.add_argument(
+    "--skip-invalid",
+    action="store_true",
+    help="Drop invalid records instead of failing",
+)
+
+
+def print_report(report: DumpReport, **extra: typing.Any) -> None:
+    print(
+        json.dumps(
+            {**report.summary(stats=extra.pop("stats", False)), **extra}, indent=2
+        )
+    )
+
+
+async def scan(
+    ns: argparse.Namespace,
+    path: str,
+    output: ChunkOutput = "none",
+    on_chunk: typing.Optional[typing.Callable[[ChunkResult], None]] = None,
+) -> DumpReport:
+    """Validate a dump using a pool of processes started for this command only"""
+    if ns.workers <= 0:
+        return await scan_dump(path, None, output, ns.chunk_size, on_chunk)
+    pool = ExecutorPool("db", "process", ns.workers)
+    await pool.start()
+    try:
+        return await scan_dump(path, pool, output, ns.chunk_size, on_chunk)
+    finally:
+        pool.shutdown()
+
+
+async def read_employees(
+    ns: argparse.Namespace, path: str
+) -> typing.Tuple[DumpReport, typing.List[EmployeeInDB]]:
+    employees: typing.List[EmployeeInDB] = []
+    report = await scan(
+        ns, path, "employees", lambda result: employees.extend(result.employees)
+    )
+    return report, employees
+
+
+def fail_on_invalid(ns: argparse.Namespace, report: DumpReport) -> None:
+    """Exit before writing anything when records are invalid, unless they can be skipped"""
+    if report.invalid and not ns.skip_invalid:
+        print_report(report)
+        print(
+            f"{report.invalid} invalid records in {report.path}, use --skip-invalid to ignore them",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+async def validate(ns: argparse.Namespace, stats: bool = False) -> None:
+    report = await scan(ns, ns.path)
+    print_report(report, stats=stats)
+    if not stats and (report.invalid or report.duplicates):
+        sys.exit(1)
+
+
+async def export(ns: argparse.Namespace) -> None:
+    output = pathlib.Path(ns.output)
+    # Valid records are written as soon as their chunk is validated, in order
+    if ns.format in ("arrow", "parquet"):
+        # Fail before creating output when pyarrow is missing
+        import_pyarrow()
+        with open(output, "wb") as sink, ColumnarWriter(sink, ns.format) as columnar:
+            # Each chunk is written as a record batch
+            report = await scan(
+                ns, ns.path, "columns", lambda result: columnar.write(result.columns)
+            )
+        written = columnar.rows
+    else:
+        with DumpWriter(output, ns.format) as writer:
+            report = await scan(
+                ns, ns.path, "json", lambda result: writer.write(result.serialized)
+            )
+        written = writer.count
+    if report.invalid and not ns.skip_invalid:
+        output.unlink()
+    fail_on_invalid(ns, report)
+    print_report(report, output=output.as_posix(), written=written)
+
+
+async def import_dump(ns: argparse.Namespace) -> None:
+    report, employees = await read_employees(ns, ns.path)
+    fail_on_invalid(ns, report)
+    path = pathlib.Path(ns.db)
+    if path.exists() and not ns.replace:
+        # Existing employees are validated the same way as imported ones
+        existing_report, existing = await read_employees(ns, path.as_posix())
+        if existing_report.invalid:
+            print_report(existing_report)
+            print(f"Database {path.as_posix()} is invalid", file=sys.stderr)
+            sys.exit(1)
+        employees = existing + employees
+    elif not path.exists():
+        path.write_text("[]")
+    # Imported employees override existing employees with the same id
+    database = EmployeeDatabase(path, employees=employees)
+    database.save()
+    print_report(report, database=path.as_posix(), employees=len(database.employees))
+
+
+async def compact(ns: argparse.Namespace) -> None:
+    report, employees = await read_employees(ns, ns.path)
+    fail_on_invalid(ns, report)
+    path = pathlib.Path(ns.output or ns.path)
+    if not path.exists():
+        path.write_text("[]")
+    # Duplicate ids are dropped by the database: last record wins
+    database = EmployeeDatabase(path, employees=employees)
+    database.save()
+    print_report(
+        report,
+        output=path.as_posix(),
+        employees=len(database.employees),
+        bytes_written=path.stat().st_size,
+    )
+
+
+def run(*args: str) -> None:
+    ns = db_parser.parse_args(args)
+    try:
+        if ns.command == "validate":
+            asyncio.run(validate(ns))
+        elif ns.command == "stats":
+            asyncio.run(validate(ns, stats=True))
+        elif ns.command == "export":
+            asyncio.run(export(ns))
+        elif ns.command == "import":
+            asyncio.run(import_dump(ns))
+        elif ns.command == "compact":
+            asyncio.run(compact(ns))
+    except (DumpFormatError, json.JSONDecodeError) as exc:
+        # Malformed dumps cannot be streamed past the first error
+        print(f"Malformed dump: {exc}", file=sys.stderr)
+        sys.exit(1)
+    except ExportUnavailableError as exc:
+        print(exc, file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,76 @@
+"""This module provides request coalescing: identical concurrent requests share a single response.
+
+Requests are identical when they target the same path with the same query string, and the database version
+did not change in between. The first request computes the response, requests arriving while it is in flight
+wait for it and receive a copy of its status code, headers and body.
+
+Only idempotent routes returning rendered responses (I.E, not streaming responses) should be coalesced.
+Background tasks attached to a shared response only run once.
+"""
+from __future__ import annotations
+
+import typing
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .caching import StoredResponse
+from .lib.metrics import MetricsRegistry
+from .lib.singleflight import SingleFlight
+from .providers.tenancy import scope_tenant
+
+Handler = typing.Callable[[Request], typing.Coroutine[typing.Any, typing.Any, Response]]
+
+
+class RequestCoalescer:
+    """Share responses between identical concurrent GET requests.
+
+    Arguments:
+        routes: Path templates of coalesced routes (E.G, "/employees/lastnames/{lastname}").
+        version: Function returning current version of data used to compute the response of a request.
+        registry: Registry where the number of coalesced requests is reported.
+    """
+
+    def __init__(
+        self,
+        routes: typing.Iterable[str],
+        version: typing.Callable[[Request], typing.Hashable],
+        registry: MetricsRegistry,
+    ) -> None:
+        self.routes = frozenset(routes)
+        self.version = version
+        self.flights: SingleFlight[
+            typing.Tuple[Response, typing.Optional[StoredResponse]]
+        ] = SingleFlight()
+        self.coalesced = registry.counter(
+            "http_requests_coalesced_total",
+            "Number of requests which received the response of an identical request in flight",
+            ("route",),
+        )
+
+    def accepts(self, route: str, method: str) -> bool:
+        return method == "GET" and route in self.routes
+
+    async def handle(self, route: str, request: Request, handler: Handler) -> Response:
+        """Process request using handler, unless an identical request is in flight"""
+        key = (
+            scope_tenant(request.scope),
+            request.scope["path"],
+            request.scope["query_string"],
+            self.version(request),
+        )
+
+        async def compute() -> typing.Tuple[Response, typing.Optional[StoredResponse]]:
+            response = await handler(request)
+            # Streaming responses cannot be shared
+            if not hasattr(response, "body"):
+                return response, None
+            return response, StoredResponse(response)
+
+        (response, stored), shared = await self.flights.do(key, compute)
+        if not shared:
+            return response
+        if stored is None:
+            return await handler(request)
+        self.coalesced.labels(route).inc()
+        return stored.response()
@@ -0,0 +1,36 @@
+"""This module maps employee versions to HTTP entity tags, used by conditional requests.
+
+Single employee responses hold an `ETag` header with the version of the employee (E.G, `"3"`).
+Clients send it back using an `If-Match` header to modify the employee only if nobody modified it in between.
+Otherwise, the modification is rejected using a `412` response holding the current `ETag`.
+
+`If-Match: *` matches any existing employee. Weak entity tags (E.G, `W/"3"`) never match, since `If-Match`
+uses strong comparison.
+"""
+from __future__ import annotations
+
+import typing
+
+from .lib.database import ANY_VERSION
+
+
+def etag(version: int) -> str:
+    """Entity tag of an employee version"""
+    return f'"{version}"'
+
+
+def expected_versions(
+    if_match: typing.Optional[str],
+) -> typing.Optional[typing.Container[int]]:
+    """Parse an `If-Match` header into expected versions. Return None when header is missing."""
+    if if_match is None:
+        return None
+    versions: typing.Set[int] = set()
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return ANY_VERSION
+        # Unparsable tags never match
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.add(int(tag[1:-1]))
+    return versions
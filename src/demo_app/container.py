@@ -7,21 +7,34 @@
 import asyncio
 import contextlib
 import dataclasses
+import inspect
 import pathlib
+import random
 import sys
+import time
 import types
 import typing
 
 import fastapi
 import uvicorn
+from structlog import get_logger
 
 from .errors import ERROR_HANDLERS
+from .lib.cache import ResponseCache
+from .lib.executors import ExecutorPool, ExecutorRegistry
+from .lib.metrics import MetricsRegistry, NullRegistry
+from .lib.scheduler import Job, Scheduler, TaskStats
+from .lib.server import select_http, select_loop
 from .settings import AppMeta, AppSettings, ConfigFilesSettings
 
 if typing.TYPE_CHECKING:
     from fastapi.testclient import TestClient
 
 T = typing.TypeVar("T")
+# Options accepted by the installed uvicorn version
+UVICORN_OPTIONS = frozenset(inspect.signature(uvicorn.Config).parameters)
+# What to do when a task completes: either never restart, restart only when it failed, or always restart
+RestartPolicy = typing.Literal["never", "on-failure", "always"]
 
 
 @dataclasses.dataclass
@@ -74,6 +87,14 @@ class AppContainer:
     submitted_tasks: typing.Dict[str, AppTask[typing.Any]] = dataclasses.field(
         init=False, repr=False
     )
+    # Metrics are no-op unless a metrics provider replaces the registry
+    metrics: MetricsRegistry = dataclasses.field(init=False, repr=False)
+    # Response cache is disabled unless a cache provider replaces it
+    cache: ResponseCache[typing.Any] = dataclasses.field(init=False, repr=False)
+    # Periodic tasks share a single scheduler
+    scheduler: Scheduler = dataclasses.field(init=False, repr=False)
+    # Thread and process pools, started before hooks
+    executors: ExecutorRegistry = dataclasses.field(init=False, repr=False)
 
     def __post_init__(self) -> None:
         """Post-init processing of application container.
@@ -95,6 +116,23 @@ def __post_init__(self) -> None:
             version=self.meta.version,
             exception_handlers=ERROR_HANDLERS,
         )
+        # Select event loop and HTTP parser, falling back to standard implementations when not installed
+        loop = select_loop(self.settings.server.loop)
+        http = select_http(self.settings.server.http)
+        for requested, selected in (
+            (self.settings.server.loop, loop),
+            (self.settings.server.http, http),
+        ):
+            if requested not in ("auto", selected):
+                get_logger().warning(
+                    f"{requested} is not installed, using {selected} instead"
+                )
+        # Older uvicorn versions do not accept all options
+        extra_options: typing.Dict[str, typing.Any] = {}
+        if "h11_max_incomplete_event_size" in UVICORN_OPTIONS:
+            extra_options[
+                "h11_max_incomplete_event_size"
+            ] = self.settings.server.h11_max_incomplete_event_size
         # Create uvicorn config
         uvicorn_config = uvicorn.Config(
             app=self.app,
@@ -108,14 +146,32 @@ def __post_init__(self) -> None:
             access_log=False,
             limit_concurrency=self.settings.server.limit_concurrency,
             limit_max_requests=self.settings.server.limit_max_requests,
+            loop=loop,
+            http=http,
+            backlog=self.settings.server.backlog,
+            timeout_keep_alive=self.settings.server.timeout_keep_alive,
+            **extra_options,
         )
         # Create uvicorn server
         self.server = uvicorn.Server(uvicorn_config)
         # Initialize pending tasks
         self.submitted_tasks = {}
+        # Initialize metrics registry
+        self.metrics = NullRegistry()
+        # Initialize response cache
+        self.cache = ResponseCache()
+        # Initialize scheduler of periodic tasks
+        self.scheduler = Scheduler()
         # Execute providers
         for provider in self.providers:
             provider(self)
+        # Create executors once metrics registry is known
+        self.executors = ExecutorRegistry(
+            self.settings.executors.threads,
+            self.settings.executors.processes,
+            start_method=self.settings.executors.start_method,
+            registry=self.metrics,
+        )
         # Start stack on application startup
         self.app.add_event_handler("startup", self._start_stack)
         # Exit stack on application shutdown
@@ -138,6 +194,8 @@ async def _start_stack(self) -> None:
         await self.stack.__aenter__()
         # Start all resources
         try:
+            # Start executors before hooks, so that process workers are forked before any dataset is loaded
+            await self.stack.enter_async_context(self.executors)
             # Start hooks
             for hook in self.hooks:
                 context = hook(self)
@@ -189,6 +247,15 @@ def provider(request: fastapi.Request) -> AppContainer:
         """Provide the appication container from a FastAPI request."""
         return request.app.state.container  # type: ignore[no-any-return]
 
+    @staticmethod
+    def executor(name: str) -> typing.Any:
+        """Inject a named executor of the application container using `fastapi.Depends`"""
+
+        def get_executor(request: fastapi.Request) -> ExecutorPool:
+            return request.app.state.container.executors[name]  # type: ignore[no-any-return]
+
+        return fastapi.Depends(get_executor)
+
     @property
     def test_client(self) -> TestClient:
         """Provide a quick access to a test client.
@@ -219,6 +286,10 @@ class AppTask(typing.Generic[T]):
     and task must be stopped before application shutdown is considered complete.
 
     It is also really easy to either get task status, stop, start, or restart task using a custom endpoint.
+
+    Tasks can be restarted automatically according to a restart policy. Delay before restarting grows exponentially
+    with the number of consecutive failures, from `backoff` up to `max_backoff` seconds, and is randomly shortened
+    by up to half so that tasks failing at the same time do not restart at the same time.
     """
 
     def __init__(
@@ -227,9 +298,16 @@ def __init__(
             [AppContainer], typing.Coroutine[typing.Any, typing.Any, T]
         ],
         name: typing.Optional[str] = None,
+        restart_policy: RestartPolicy = "never",
+        backoff: float = 1,
+        max_backoff: float = 60,
     ) -> None:
         self.function = function
         self.name = name or function.__name__
+        self.restart_policy = restart_policy
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = TaskStats()
         self.task: typing.Optional[asyncio.Task[T]] = None
         self._result: typing.Optional[T] = None
         self._container: typing.Optional[AppContainer] = None
@@ -308,9 +386,52 @@ async def start(self) -> AppTask[T]:
         if self._container is None:
             raise asyncio.InvalidStateError("No container has been attached to task")
         if not self.started:
-            self.task = asyncio.create_task(self.function(self._container))
+            self.task = asyncio.create_task(self._supervise(self._container))
         return self
 
+    async def _supervise(self, container: AppContainer) -> T:
+        """Run task function, restarting it according to restart policy"""
+        logger = get_logger().bind(logger="tasks")
+        while True:
+            started = time.monotonic()
+            try:
+                result = await self.function(container)
+            except Exception as exc:
+                self.stats.record(time.monotonic() - started, exc)
+                if self.restart_policy == "never":
+                    raise
+                delay = self.restart_delay()
+                logger.error(
+                    f"Task {self.name} failed, restarting in {delay:.1f} seconds",
+                    error=self.stats.last_error,
+                    failures=self.stats.consecutive_failures,
+                )
+            else:
+                self.stats.record(time.monotonic() - started, None)
+                if self.restart_policy != "always":
+                    return result
+                delay = self.restart_delay()
+            await asyncio.sleep(delay)
+            self.stats.restarts += 1
+
+    def restart_delay(self) -> float:
+        """Delay (in seconds) before task is restarted"""
+        exponent = max(self.stats.consecutive_failures - 1, 0)
+        delay = min(self.max_backoff, self.backoff * 2**exponent)
+        return random.uniform(delay / 2, delay)
+
+    def summary(self) -> typing.Dict[str, typing.Any]:
+        """Describe task status and runtime statistics"""
+        return {
+            "name": self.name,
+            "started": self.started,
+            "done": self.done,
+            "cancelled": self.cancelled,
+            "exception": str(self.exception) if self.exception else None,
+            "restart_policy": self.restart_policy,
+            **self.stats.summary(),
+        }
+
     async def stop(self) -> None:
         """Stop task"""
         if self.task is None:
@@ -347,3 +468,76 @@ def get_task(request: fastapi.Request) -> AppTask[typing.Any]:
             return request.app.state.container.submitted_tasks[key]  # type: ignore[no-any-return]
 
         return fastapi.Depends(get_task)
+
+
+class PeriodicTask(AppTask[None]):
+    """A task calling a coroutine function at a fixed interval as long as application is running.
+
+    Periodic tasks do not run their own coroutine: they are scheduled by the container scheduler,
+    which runs all periodic tasks out of a single timer heap. A failed run is logged and does not stop the task.
+
+    Arguments:
+        function: Coroutine function called with the application container on each run.
+        interval: Delay (in seconds) between the end of a run and the start of the next one.
+        name: Name of the task. Defaults to function name.
+        delay: Delay (in seconds) before first run.
+        jitter: Fraction of interval by which each delay is randomly shortened or extended.
+    """
+
+    def __init__(
+        self,
+        function: typing.Callable[
+            [AppContainer], typing.Coroutine[typing.Any, typing.Any, typing.Any]
+        ],
+        interval: float,
+        name: typing.Optional[str] = None,
+        delay: float = 0,
+        jitter: float = 0.1,
+    ) -> None:
+        super().__init__(function, name)
+        self.interval = interval
+        self.delay = delay
+        self.job = Job(self._run_once, interval, self.name, jitter)
+        # Statistics are recorded by the scheduler
+        self.stats = self.job.stats
+
+    @property
+    def started(self) -> bool:
+        """Return True if task is scheduled else False"""
+        return (
+            self._container is not None and self.job in self._container.scheduler.jobs
+        )
+
+    async def _run_once(self) -> None:
+        assert self._container is not None
+        try:
+            await self.function(self._container)
+        except Exception:
+            get_logger().bind(logger="tasks").error(
+                f"Periodic task {self.name} failed", exc_info=True
+            )
+            raise
+
+    async def start(self) -> AppTask[None]:
+        """Schedule task"""
+        if self._container is None:
+            raise asyncio.InvalidStateError("No container has been attached to task")
+        self._container.scheduler.add(self.job, self.delay)
+        return self
+
+    async def stop(self) -> None:
+        """Unschedule task, cancelling current run if any"""
+        if self._container is not None:
+            await self._container.scheduler.remove(self.job)
+
+    def summary(self) -> typing.Dict[str, typing.Any]:
+        now = self._container.scheduler.clock() if self._container else 0
+        return {
+            **super().summary(),
+            "restart_policy": None,
+            "interval": self.interval,
+            "running": self.job.running is not None,
+            "next_run_in": None
+            if self.job.next_run is None
+            else self.job.next_run - now,
+        }
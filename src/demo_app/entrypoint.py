@@ -12,11 +12,24 @@
 from demo_app.settings import AppSettings
 
 from .container import AppContainer
-from .hooks.database import database_hook, database_monitor
+from .hooks.database import (
+    database_hook,
+    database_monitor_task,
+    tenants_hook,
+    tenants_monitor_task,
+)
+from .hooks.event_loop import event_loop_monitor_task
+from .hooks.idempotency import idempotency_hook
+from .hooks.memory import memory_watermark_task
+from .providers.cache import response_cache_provider
+from .providers.coalescing import request_coalescing_provider
+from .providers.limiter import concurrency_limiter_provider
 from .providers.logger import structured_logging_provider
-from .providers.metrics import prometheus_metrics_provider
+from .providers.metrics import native_metrics_provider, prometheus_metrics_provider
+from .providers.tenancy import tenancy_provider
+from .providers.timing import request_timing_provider
 from .providers.tracing import openelemetry_traces_provider
-from .routes import debug_router, employees_router
+from .routes import debug_router, employees_router, health_router, profiling_router
 
 
 def create_container(
@@ -39,19 +52,46 @@ def create_container(
         routers=[
             # Router can be APIRouter instances
             employees_router,
+            # Liveness and readiness probes
+            health_router,
             # Or functions. Function must either return None or an APIRouter instance
             lambda container: debug_router if container.settings.server.debug else None,
+            # Profiling endpoints can be enabled without enabling debug mode
+            lambda container: profiling_router
+            if container.settings.server.debug or container.settings.profiling.enabled
+            else None,
         ],
         # Hooks are coroutine functions which accept an application container and return an async context manager
-        hooks=[database_hook],
+        hooks=[
+            # Either a single database or a registry of tenant databases is opened
+            lambda container: tenants_hook(container)
+            if container.settings.database.tenants_dir
+            else database_hook(container),
+            # Responses of requests sent with an idempotency key are replayed on retry
+            idempotency_hook,
+        ],
         # Tasks are similar to hooks but can be created out of coroutines instead of async context managers
         # Tasks are simply cancelled on application exit. If you need a more sophisticated exit mechanism, use a hook.
         # Tasks can be accessed within endpoints. It is possible to get task status, stop task, start task, restart task.
-        tasks=[database_monitor],
+        # Tasks can be restarted automatically using a restart policy, and periodic tasks share a single scheduler.
+        tasks=[
+            database_monitor_task,
+            event_loop_monitor_task,
+            tenants_monitor_task,
+            memory_watermark_task,
+        ],
         # Providers are functions which accept an application container and return None
         providers=[
+            request_timing_provider,
+            native_metrics_provider,
             prometheus_metrics_provider,
             openelemetry_traces_provider,
+            request_coalescing_provider,
+            response_cache_provider,
+            # Shed requests before they reach other middlewares (except logging)
+            concurrency_limiter_provider,
+            # Tenant path prefix is removed before limiter and other middlewares match request path
+            tenancy_provider,
             structured_logging_provider,
         ],
     )
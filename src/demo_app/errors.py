@@ -7,7 +7,15 @@
 from starlette.requests import Request
 from starlette.responses import Response
 
-from .lib.errors import EmployeeNotFoundError
+from .conditional import etag
+from .lib.errors import (
+    DatabaseNotReadyError,
+    EmployeeNotFoundError,
+    ExportUnavailableError,
+    IdempotencyKeyError,
+    TenantNotFoundError,
+    VersionConflictError,
+)
 
 
 async def employee_not_found_to_404(
@@ -19,6 +27,66 @@ async def employee_not_found_to_404(
     )
 
 
+async def tenant_not_found_to_404(
+    request: Request, exception: TenantNotFoundError
+) -> Response:
+    """Catch TenantNotFoundError to return meaningful 404 responses"""
+    return fastapi.responses.JSONResponse(
+        status_code=404, content={"details": "Tenant not found"}
+    )
+
+
+async def database_not_ready_to_503(
+    request: Request, exception: DatabaseNotReadyError
+) -> Response:
+    """Catch DatabaseNotReadyError to ask clients to retry once database is loaded"""
+    settings = request.app.state.container.settings.database
+    return fastapi.responses.JSONResponse(
+        status_code=503,
+        content={"details": "Database is loading"},
+        headers={"Retry-After": str(settings.load_retry_after)},
+    )
+
+
+async def export_unavailable_to_501(
+    request: Request, exception: ExportUnavailableError
+) -> Response:
+    """Catch ExportUnavailableError to tell clients that export format is not supported by this server"""
+    return fastapi.responses.JSONResponse(
+        status_code=501, content={"details": str(exception)}
+    )
+
+
+async def idempotency_key_error_to_422(
+    request: Request, exception: IdempotencyKeyError
+) -> Response:
+    """Catch IdempotencyKeyError to reject requests reusing an idempotency key"""
+    return fastapi.responses.JSONResponse(
+        status_code=422, content={"details": str(exception)}
+    )
+
+
+async def version_conflict_to_412(
+    request: Request, exception: VersionConflictError
+) -> Response:
+    """Catch VersionConflictError to reject conditional modifications of employees modified in between"""
+    headers = {}
+    if exception.current is not None:
+        headers["ETag"] = etag(exception.current)
+    return fastapi.responses.JSONResponse(
+        status_code=412,
+        content={"details": "Employee does not match If-Match header"},
+        headers=headers,
+    )
+
+
 ERROR_HANDLERS: Dict[
     Union[int, Type[Exception]], Callable[[Request, Any], Coroutine[Any, Any, Response]]
-] = {EmployeeNotFoundError: employee_not_found_to_404}
+] = {
+    EmployeeNotFoundError: employee_not_found_to_404,
+    TenantNotFoundError: tenant_not_found_to_404,
+    DatabaseNotReadyError: database_not_ready_to_503,
+    ExportUnavailableError: export_unavailable_to_501,
+    IdempotencyKeyError: idempotency_key_error_to_422,
+    VersionConflictError: version_conflict_to_412,
+}
@@ -1,3 +1,3 @@
-from .database import database, database_hook
+from .database import database, database_hook, tenants_hook
 
-__all__ = ["database_hook", "database"]
+__all__ = ["database_hook", "database", "tenants_hook"]
@@ -4,26 +4,52 @@
 
 import asyncio
 import contextlib
+import pathlib
 import typing
 
 from starlette.requests import Request
 from structlog import get_logger
 
-from demo_app.container import AppContainer
+from demo_app.caching import tenant_tags
+from demo_app.container import AppContainer, PeriodicTask
 from demo_app.lib import EmployeeDatabase
+from demo_app.lib.asgi import ASGIClient
+from demo_app.lib.errors import DatabaseNotReadyError, TenantNotFoundError
+from demo_app.lib.instrumentation import DatabaseInstrument, TelemetryDatabaseInstrument
+from demo_app.lib.loading import LoadProgress, parse_with_progress, read_with_progress
+from demo_app.lib.tenants import DatabaseRegistry
+from demo_app.providers.tenancy import scope_tenant
+from demo_app.routing import without_middlewares
+
+# Address of the client sending warm up requests. It cannot be the address of a remote client.
+WARMUP_CLIENT = ("warmup", 0)
 
 
 @contextlib.asynccontextmanager
 async def database_hook(
     container: AppContainer,
-) -> typing.AsyncIterator[EmployeeDatabase]:
-    """A hook providing a database instance in application state."""
+) -> typing.AsyncIterator[typing.Optional[EmployeeDatabase]]:
+    """A hook providing a database instance in application state.
+
+    When background load is enabled in settings, startup completes right away and the database is attached
+    to application state once it is loaded and cache is warm. Load progress is available in application state.
+    """
     logger = get_logger().bind(logger="database-hook")
+    progress = LoadProgress()
+    container.app.state.database_load = progress
+    if container.settings.database.background_load:
+        logger.info(
+            f"Loading database in background from {container.settings.database.path}"
+        )
+        task = asyncio.create_task(load_database_in_background(container, progress))
+        try:
+            yield None
+        finally:
+            task.cancel()
+            logger.warning(f"Closing database in {container.settings.database.path}")
+        return
     logger.info(f"Opening database in {container.settings.database.path}")
-    # Create new database instance using path from settings
-    database = EmployeeDatabase(container.settings.database.path)
-    # Attach database to application state
-    container.app.state.database = database
+    database = await load_database(container, progress)
     # Let the application run (I.E, signal startup complete)
     # The yielded value is not used by the application itself
     # So yielding the database is equivalent to yielding None when application is running
@@ -35,29 +61,207 @@ async def database_hook(
         logger.warning(f"Closing database in {container.settings.database.path}")
 
 
+async def load_database(
+    container: AppContainer, progress: LoadProgress
+) -> EmployeeDatabase:
+    """Load database without blocking the event loop, attach it to application state, then warm up cache"""
+    loop = asyncio.get_running_loop()
+    settings = container.settings.database
+    instrument = database_instrument(container)
+    # Loop default executor is used when no default pool is declared in settings
+    executor = container.executors.get("default")
+    raw = await loop.run_in_executor(
+        executor, read_with_progress, settings.path, progress
+    )
+    progress.advance("parsing")
+    employees = await loop.run_in_executor(executor, parse_with_progress, raw, progress)
+    # Create new database instance using path from settings
+    database = await loop.run_in_executor(
+        executor,
+        lambda: EmployeeDatabase(
+            settings.path,
+            instrument=instrument,
+            fsync=settings.fsync,
+            employees=employees,
+        ),
+    )
+    # Cached responses are invalidated when employees are modified
+    database.add_listener(container.cache.invalidate)
+    # Attach database to application state
+    container.app.state.database = database
+    # Warming up is useless when responses are not cached
+    if container.cache.enabled:
+        progress.advance("warming")
+        await warm_up(container, container.settings.cache.warmup_paths)
+    progress.advance("ready")
+    return database
+
+
+async def load_database_in_background(
+    container: AppContainer, progress: LoadProgress
+) -> None:
+    """A task loading database, exiting the application when database cannot be loaded"""
+    logger = get_logger().bind(logger="database-hook")
+    try:
+        database = await load_database(container, progress)
+    except Exception as exc:
+        progress.fail(exc)
+        logger.critical(
+            f"Loading database... Exiting application due to critical error: {progress.error}"
+        )
+        container.exit_soon()
+        return
+    logger.info(
+        f"Loaded database in {database.path.as_posix()}",
+        records=progress.records,
+        duration=progress.elapsed,
+    )
+
+
+async def warm_up(container: AppContainer, paths: typing.Iterable[str]) -> None:
+    """Request given paths from within the process, so that their responses are cached"""
+    logger = get_logger().bind(logger="database-hook")
+    # Warm up requests are not logged, measured nor limited
+    client = ASGIClient(without_middlewares(container.app), client=WARMUP_CLIENT)
+    for path in paths:
+        response = await client.get(path)
+        if response.status_code != 200:
+            logger.warning(
+                f"Warming up {path}... Unexpected status code {response.status_code}"
+            )
+
+
+@contextlib.asynccontextmanager
+async def tenants_hook(
+    container: AppContainer,
+) -> typing.AsyncIterator[DatabaseRegistry]:
+    """A hook providing a registry of tenant databases in application state.
+
+    Databases are opened on first use. Pending modifications are saved on application shutdown.
+    """
+    logger = get_logger().bind(logger="tenants-hook")
+    settings = container.settings.database
+    assert settings.tenants_dir is not None
+    instrument = database_instrument(container)
+
+    def open_database(tenant: str, path: pathlib.Path) -> EmployeeDatabase:
+        database = EmployeeDatabase(path, instrument=instrument, fsync=settings.fsync)
+        # Cached responses of the tenant are invalidated when its employees are modified
+        database.add_listener(
+            lambda tags: container.cache.invalidate(tenant_tags(tenant, tags))
+        )
+        logger.info(f"Opened database of tenant {tenant} in {path}")
+        return database
+
+    registry = DatabaseRegistry(
+        settings.tenants_dir,
+        open_database,
+        max_open=settings.tenants_max_open,
+        max_bytes=settings.tenants_max_bytes,
+        idle_timeout=settings.tenants_idle_timeout,
+        executor=container.executors.get("default"),
+    )
+    logger.info(f"Serving tenant databases from {settings.tenants_dir}")
+    container.app.state.databases = registry
+    try:
+        yield registry
+    finally:
+        logger.warning(f"Closing tenant databases in {settings.tenants_dir}")
+        await registry.close_all()
+
+
+def tenants_monitor_task(
+    container: AppContainer,
+) -> typing.Optional[PeriodicTask]:
+    """Create the task closing idle tenant databases when tenants are enabled in settings"""
+    settings = container.settings.database
+    if settings.tenants_dir is None:
+        return None
+    interval = min(settings.tenants_idle_timeout / 2, 60)
+    return PeriodicTask(tenants_monitor, interval=interval, delay=interval)
+
+
+async def tenants_monitor(container: AppContainer) -> None:
+    """A task saving and closing databases of idle tenants"""
+    logger = get_logger().bind(logger="tenants-monitor")
+    registry: DatabaseRegistry = container.app.state.databases
+    for tenant in await registry.close_idle():
+        logger.info(f"Closed database of idle tenant {tenant}")
+
+
+def database_instrument(container: AppContainer) -> DatabaseInstrument:
+    """Select the instrument used to observe database operations.
+
+    A no-op instrument is used when both metrics and traces are disabled.
+    """
+    tracer = None
+    if container.settings.telemetry.traces_enabled:
+        tracer = container.app.state.tracer_provider.get_tracer("demo_app.lib.database")
+    if tracer is None and not container.metrics.enabled:
+        return DatabaseInstrument()
+    return TelemetryDatabaseInstrument(container.metrics, tracer)
+
+
+def database_monitor_task(container: AppContainer) -> PeriodicTask:
+    """Create the task checking database health at the interval configured in settings"""
+    return PeriodicTask(
+        database_monitor, interval=container.settings.database.monitor_interval
+    )
+
+
 async def database_monitor(container: AppContainer) -> None:
     """A task to monitor database health (mocked since db is a file)"""
     logger = get_logger().bind(logger="database-monitor")
-    # Access the database from the container
-    db: EmployeeDatabase = container.app.state.database
+    # Access the database (or the tenants directory) from the container
+    registry: typing.Optional[DatabaseRegistry] = getattr(
+        container.app.state, "databases", None
+    )
+    path = (
+        pathlib.Path(container.settings.database.path)
+        if registry is None
+        else registry.directory
+    )
     # Deploying application using docker containers is quite common nowadays
     # A useful trick when working with containers, it to exit the application if it is not healthy
     # It is then the responsability of the orchestrator (kubernetes / swarm / docker / ...) to create a new container
     # This example will check if the database dump is still present in the file system
     # If that's not the case, the application exits with an error message.
-    while True:
-        logger.debug("Checking connection to database...")
-        if not db.path.exists():
-            logger.error("Checking connection to database... ERROR")
-            logger.critical(
-                f"Checking connection to database... Exiting application due to critical error: Database dump not found ({db.path.as_posix()})"
-            )
-            container.exit_soon()
-            return
-        logger.info("Checking connection to database... OK")
-        await asyncio.sleep(30)
+    logger.debug("Checking connection to database...")
+    if not path.exists():
+        logger.error("Checking connection to database... ERROR")
+        logger.critical(
+            f"Checking connection to database... Exiting application due to critical error: Database dump not found ({path.as_posix()})"
+        )
+        container.exit_soon()
+        return
+    logger.info("Checking connection to database... OK")
+
+
+async def database(request: Request) -> EmployeeDatabase:
+    """Access the employee database from a Starlette/FastAPI request.
 
+    When tenants are enabled, the database of request tenant is returned.
 
-def database(request: Request) -> EmployeeDatabase:
-    """Access the employee database from a Starlette/FastAPI request"""
-    return request.app.state.database  # type: ignore[no-any-return]
+    Raises:
+        TenantNotFoundError: When tenants are enabled and request tenant is missing or unknown
+        DatabaseNotReadyError: When database is still loading
+    """
+    registry: typing.Optional[DatabaseRegistry] = getattr(
+        request.app.state, "databases", None
+    )
+    if registry is None:
+        progress: typing.Optional[LoadProgress] = getattr(
+            request.app.state, "database_load", None
+        )
+        # Requests sent to warm up cache are processed before database reports ready
+        if (
+            progress is not None
+            and not progress.ready
+            and request.scope.get("client") != WARMUP_CLIENT
+        ):
+            raise DatabaseNotReadyError(f"Database is {progress.state}")
+        return request.app.state.database  # type: ignore[no-any-return]
+    tenant = scope_tenant(request.scope)
+    if tenant is None:
+        raise TenantNotFoundError("Request has no tenant")
+    return await registry.get(tenant)
@@ -0,0 +1,225 @@
+"""This module exposes a task monitoring the event loop.
+
+Route handlers run on the event loop, so any blocking call delays all other requests.
+The monitor sleeps at a fixed interval and measures how late it wakes up (I.E, the event loop lag).
+
+A watchdog thread captures the stack of the event loop thread while it is blocked,
+so that the offending callback and route can be logged once the event loop is released.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import math
+import sys
+import threading
+import time
+import traceback
+import types
+import typing
+
+from structlog import get_logger
+
+from demo_app.container import AppContainer, AppTask
+from demo_app.routing import endpoint_code_paths
+
+# Buckets (in seconds) are tuned for scheduling delays
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_QUANTILES = (0.5, 0.9, 0.99)
+# Maximum number of frames reported when event loop is blocked
+MAX_STACK_DEPTH = 10
+
+
+def event_loop_monitor_task(container: AppContainer) -> typing.Optional[AppTask[None]]:
+    """Create the event loop monitor task when it is enabled in settings"""
+    if not container.settings.telemetry.loop_monitor_enabled:
+        return None
+    return AppTask(event_loop_monitor, restart_policy="on-failure")
+
+
+async def event_loop_monitor(container: AppContainer) -> None:
+    """A task measuring event loop lag and reporting callbacks which block the event loop"""
+    logger = get_logger().bind(logger="event-loop-monitor")
+    settings = container.settings.telemetry
+    interval = settings.loop_monitor_interval
+    threshold = settings.loop_lag_threshold
+    loop = asyncio.get_running_loop()
+    # Recent measurements are kept to compute percentiles on collection
+    window: typing.Deque[float] = collections.deque(maxlen=max(int(60 / interval), 1))
+    lag_histogram = container.metrics.histogram(
+        "event_loop_lag_seconds",
+        "Delay between expected and actual wake up of event loop monitor in seconds",
+        buckets=LAG_BUCKETS,
+    ).labels()
+    blocked_counter = container.metrics.counter(
+        "event_loop_blocked_total",
+        "Number of times event loop lag exceeded threshold",
+    ).labels()
+    percentiles = container.metrics.gauge(
+        "event_loop_lag_percentile_seconds",
+        "Percentiles of event loop lag over the last minute in seconds",
+        ("quantile",),
+    )
+    for q in LAG_QUANTILES:
+        percentiles.labels(str(q)).set_function(
+            lambda q=q: _percentile(list(window), q)  # type: ignore[misc]
+        )
+    watchdog = Watchdog(
+        threading.get_ident(),
+        threshold,
+        endpoint_code_paths(container.app.routes),
+    )
+    slow_callbacks = _enable_slow_callback_detection(
+        container, loop, settings.loop_slow_callback_duration
+    )
+    watchdog.start()
+    try:
+        while True:
+            expected = loop.time() + interval
+            watchdog.expect(time.monotonic() + interval)
+            await asyncio.sleep(interval)
+            lag = max(loop.time() - expected, 0.0)
+            lag_histogram.observe(lag)
+            window.append(lag)
+            if lag < threshold:
+                continue
+            blocked_counter.inc()
+            report = watchdog.pop_report()
+            if report is None:
+                logger.warning("Event loop blocked", lag=lag)
+            else:
+                logger.warning(
+                    "Event loop blocked",
+                    lag=lag,
+                    route=report.route,
+                    callback=report.callback,
+                    frames=report.frames,
+                )
+    finally:
+        watchdog.stop()
+        if slow_callbacks is not None:
+            slow_callbacks()
+
+
+class BlockedReport(typing.NamedTuple):
+    """What the event loop thread was running while it was blocked"""
+
+    callback: str
+    route: typing.Optional[str]
+    frames: typing.List[str]
+
+
+class Watchdog(threading.Thread):
+    """A thread capturing the stack of the event loop thread when it does not wake up in time.
+
+    Arguments:
+        loop_thread_id: Identifier of the thread running the event loop.
+        threshold: Lag (in seconds) after which the event loop is considered blocked.
+        route_codes: Route path templates keyed by code objects of endpoint functions.
+    """
+
+    def __init__(
+        self,
+        loop_thread_id: int,
+        threshold: float,
+        route_codes: typing.Dict[types.CodeType, str],
+    ) -> None:
+        super().__init__(name="event-loop-watchdog", daemon=True)
+        self.loop_thread_id = loop_thread_id
+        self.threshold = threshold
+        self.route_codes = route_codes
+        self._deadline = math.inf
+        self._report: typing.Optional[BlockedReport] = None
+        self._stopped = threading.Event()
+
+    def expect(self, wakeup: float) -> None:
+        """Declare when event loop monitor expects to wake up (using monotonic clock)"""
+        # Discard reports captured before a wake up which was late but below threshold
+        self._report = None
+        self._deadline = wakeup + self.threshold
+
+    def pop_report(self) -> typing.Optional[BlockedReport]:
+        """Get report captured while event loop was blocked, if any"""
+        report, self._report = self._report, None
+        return report
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def run(self) -> None:
+        # Checking twice per threshold is enough to catch blocking calls lasting longer than threshold
+        period = max(self.threshold / 2, 0.005)
+        while not self._stopped.wait(period):
+            if time.monotonic() < self._deadline:
+                continue
+            # Capture a single report per wake up
+            self._deadline = math.inf
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is not None:
+                self._report = self._capture(frame)
+
+    def _capture(self, frame: types.FrameType) -> BlockedReport:
+        callback = f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}"
+        route = None
+        current: typing.Optional[types.FrameType] = frame
+        while current is not None:
+            route = self.route_codes.get(current.f_code)
+            if route is not None:
+                break
+            current = current.f_back
+        frames = traceback.format_list(
+            traceback.extract_stack(frame, limit=MAX_STACK_DEPTH)
+        )
+        return BlockedReport(callback, route, [line.rstrip() for line in frames])
+
+
+def _enable_slow_callback_detection(
+    container: AppContainer,
+    loop: asyncio.AbstractEventLoop,
+    duration: typing.Optional[float],
+) -> typing.Optional[typing.Callable[[], None]]:
+    """Enable asyncio debug mode so that slow callbacks are logged by asyncio logger.
+
+    Returns a function restoring previous event loop configuration.
+    """
+    if duration is None:
+        return None
+    slow_callbacks = container.metrics.counter(
+        "event_loop_slow_callbacks_total",
+        "Number of callbacks which ran longer than slow callback duration",
+    ).labels()
+    previous_debug = loop.get_debug()
+    previous_duration = loop.slow_callback_duration
+    asyncio_logger = logging.getLogger("asyncio")
+    log_filter = _SlowCallbackCounter(slow_callbacks.inc)
+    loop.set_debug(True)
+    loop.slow_callback_duration = duration
+    asyncio_logger.addFilter(log_filter)
+
+    def restore() -> None:
+        loop.set_debug(previous_debug)
+        loop.slow_callback_duration = previous_duration
+        asyncio_logger.removeFilter(log_filter)
+
+    return restore
+
+
+class _SlowCallbackCounter(logging.Filter):
+    """Count slow callbacks reported by asyncio without filtering any record"""
+
+    def __init__(self, increment: typing.Callable[[], None]) -> None:
+        super().__init__()
+        self.increment = increment
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str) and record.msg.startswith("Executing "):
+            self.increment()
+        return True
+
+
+def _percentile(values: typing.List[float], q: float) -> float:
+    if not values:
+        return math.nan
+    values.sort()
+    return values[min(int(q * len(values)), len(values) - 1)]
@@ -0,0 +1,68 @@
+"""This module exposes a hook replaying responses of requests sent with an idempotency key.
+
+Stored responses are read from file on startup, so clients retrying a request across a restart
+still receive the response of their first request.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import pathlib
+import typing
+
+from structlog import get_logger
+
+from demo_app.container import AppContainer
+from demo_app.idempotency import IdempotentRequests
+from demo_app.lib.idempotency import IdempotencyStore
+
+
+def idempotency_hook(
+    container: AppContainer,
+) -> typing.Optional[typing.AsyncContextManager[IdempotentRequests]]:
+    """Create the idempotency hook when it is enabled in settings"""
+    if not container.settings.idempotency.enabled:
+        return None
+    return idempotent_requests(container)
+
+
+def idempotency_store_path(container: AppContainer) -> pathlib.Path:
+    settings = container.settings
+    if settings.idempotency.path is not None:
+        return pathlib.Path(settings.idempotency.path)
+    if settings.database.tenants_dir is not None:
+        # Tenant databases are named "<tenant>.json", so store cannot be mistaken for a tenant
+        return pathlib.Path(settings.database.tenants_dir, ".idempotency")
+    database_path = pathlib.Path(settings.database.path)
+    return database_path.with_name(database_path.name + ".idempotency")
+
+
+@contextlib.asynccontextmanager
+async def idempotent_requests(
+    container: AppContainer,
+) -> typing.AsyncIterator[IdempotentRequests]:
+    """A hook providing stored responses of requests sent with an idempotency key in application state.
+
+    Routes created using `demo_app.routing.AppRoute` replay stored responses.
+    """
+    logger = get_logger().bind(logger="idempotency-hook")
+    settings = container.settings.idempotency
+    # Store is written using the same executor and durability settings as databases
+    executor = container.executors.get("default")
+    store = IdempotencyStore(
+        idempotency_store_path(container),
+        max_entries=settings.max_entries,
+        ttl=settings.ttl,
+        fsync=container.settings.database.fsync,
+    )
+    loaded = await asyncio.get_running_loop().run_in_executor(executor, store.load)
+    logger.info(f"Loaded {loaded} idempotent responses from {store.path.as_posix()}")
+    requests = IdempotentRequests(
+        store, header=settings.header, executor=executor, registry=container.metrics
+    )
+    container.app.state.idempotency = requests
+    try:
+        yield requests
+    finally:
+        # Responses are persisted before they are returned, so nothing is written on exit
+        del container.app.state.idempotency
@@ -0,0 +1,134 @@
+"""This module exposes a task recycling the worker when its memory grows too large.
+
+Resident memory is sampled at a fixed interval by a periodic task:
+
+- Above the soft limit, the worker stops accepting connections, lets in-flight requests complete, and exits.
+  The process manager (E.G, gunicorn, systemd, kubernetes) is expected to start a new worker.
+- Above the hard limit, the worker exits without waiting for in-flight requests.
+
+Workers crossing the soft limit wait for a random delay, then take an exclusive lock on a file shared by
+all workers (when configured), so that workers which grow at the same pace do not all recycle at once.
+The lock is held until the process exits.
+"""
+from __future__ import annotations
+
+import random
+import time
+import typing
+
+from structlog import get_logger
+
+from demo_app.container import AppContainer, PeriodicTask
+from demo_app.lib.memory import heap_stats, resident_memory
+from demo_app.settings import ServerSettings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # Workers are not coordinated on platforms without fcntl (E.G, Windows)
+    fcntl = None  # type: ignore[assignment]
+
+
+def memory_watermark_task(
+    container: AppContainer,
+) -> typing.Optional[MemoryWatermarkTask]:
+    """Create the memory watermark task when a memory limit is configured in settings"""
+    settings = container.settings.server
+    if settings.memory_soft_limit is None and settings.memory_hard_limit is None:
+        return None
+    container.metrics.gauge(
+        "process_resident_memory_bytes", "Resident memory size in bytes"
+    ).labels().set_function(lambda: resident_memory() or 0)
+    container.metrics.gauge(
+        "python_allocated_blocks", "Number of memory blocks allocated by Python"
+    ).labels().set_function(lambda: heap_stats()["allocated_blocks"])
+    return MemoryWatermarkTask(settings)
+
+
+class RecycleLock:
+    """An exclusive lock on a file shared by workers, released when process exits"""
+
+    def __init__(self, path: typing.Optional[str]) -> None:
+        self.path = path
+        self._file: typing.Optional[typing.IO[bytes]] = None
+
+    def acquire(self) -> bool:
+        """Try to acquire lock without waiting. Always succeeds when no lock file is configured."""
+        if self.path is None or fcntl is None:
+            return True
+        lock_file = open(self.path, "ab")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # File must stay open, else lock is released
+        self._file = lock_file
+        return True
+
+
+class MemoryWatermarkTask(PeriodicTask):
+    """A periodic task exiting the application once memory exceeds configured limits.
+
+    Once soft limit is crossed, memory is checked every second (at most) until worker recycles.
+    Task does nothing once worker is exiting.
+    """
+
+    def __init__(self, settings: ServerSettings) -> None:
+        super().__init__(
+            self.check, interval=settings.memory_check_interval, name="memory_watermark"
+        )
+        self.settings = settings
+        self.lock = RecycleLock(settings.memory_recycle_lock_file)
+        # Time at which worker recycles, once soft limit is crossed
+        self.recycle_at: typing.Optional[float] = None
+        self.exiting = False
+
+    async def check(self, container: AppContainer) -> None:
+        if self.exiting:
+            return
+        logger = get_logger().bind(logger="memory-watermark")
+        soft_limit = self.settings.memory_soft_limit
+        hard_limit = self.settings.memory_hard_limit
+        rss = resident_memory()
+        if rss is None:
+            logger.error("Resident memory is not available, memory limits are ignored")
+            self.exiting = True
+            return
+        if hard_limit is not None and rss >= hard_limit:
+            logger.critical(
+                "Memory hard limit exceeded, exiting without waiting for in-flight requests",
+                rss=rss,
+                limit=hard_limit,
+                **heap_stats(),
+            )
+            self.exiting = True
+            container.server.force_exit = True
+            container.exit_soon()
+            return
+        if soft_limit is None or rss < soft_limit:
+            return
+        if self.recycle_at is None:
+            self.recycle_at = time.monotonic() + random.uniform(
+                0, self.settings.memory_recycle_jitter
+            )
+            # Next runs are scheduled using the shortened interval
+            self.interval = self.job.interval = min(self.interval, 1.0)
+            logger.warning(
+                "Memory soft limit exceeded, recycling worker soon",
+                rss=rss,
+                limit=soft_limit,
+                **heap_stats(),
+            )
+        if time.monotonic() < self.recycle_at:
+            return
+        if self.lock.acquire():
+            logger.warning(
+                "Memory soft limit exceeded, draining in-flight requests and exiting",
+                rss=rss,
+                limit=soft_limit,
+            )
+            self.exiting = True
+            container.exit_soon()
+            return
+        logger.info("Another worker is recycling, waiting for its turn")
@@ -0,0 +1,168 @@
+"""This module lets clients retry mutating requests safely using an `Idempotency-Key` header.
+
+The first request sent with a key is processed, and its response is stored before it is returned to the client.
+Requests sent later with the same key receive a copy of the stored response, marked using an
+`Idempotent-Replayed: true` header, without executing the endpoint again. Requests sent while the first request is
+in flight wait for it. Keys are scoped to the request tenant.
+
+A key must not be reused for another request: requests are fingerprinted using method, path, query string and body,
+and a request whose fingerprint differs from the stored one is rejected using a `422` response.
+
+Only responses returned by endpoints are stored. Errors raised by endpoints (E.G, `404` when an employee is not found),
+responses with a `5xx` status code and streaming responses are not stored, so the request is executed again on retry.
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import hashlib
+import typing
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .lib.errors import IdempotencyKeyError
+from .lib.idempotency import IdempotencyStore, StoredResult, StoreKey
+from .lib.metrics import MetricsRegistry, NullRegistry
+from .lib.singleflight import SingleFlight
+from .providers.tenancy import scope_tenant
+
+Handler = typing.Callable[[Request], typing.Coroutine[typing.Any, typing.Any, Response]]
+
+# Methods which do not modify data never need an idempotency key
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+# Longer keys are rejected, so that stored keys remain small
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotentRequests:
+    """Store responses of mutating requests sent with an idempotency key, and replay them on retry.
+
+    Arguments:
+        store: Store holding responses by key.
+        header: Name of the header holding idempotency keys.
+        executor: Executor used to write the store to file. Event loop default executor is used when None.
+        registry: Registry where the number of replayed responses is reported.
+    """
+
+    def __init__(
+        self,
+        store: IdempotencyStore,
+        header: str = "Idempotency-Key",
+        executor: typing.Optional[concurrent.futures.Executor] = None,
+        registry: typing.Optional[MetricsRegistry] = None,
+    ) -> None:
+        self.store = store
+        self.header = header
+        self.executor = executor
+        self.flights: SingleFlight[
+            typing.Tuple[Response, typing.Optional[StoredResult]]
+        ] = SingleFlight()
+        self._write_lock = asyncio.Lock()
+        registry = registry or NullRegistry()
+        self.replayed = registry.counter(
+            "http_requests_replayed_total",
+            "Number of requests which received the stored response of a request sent with the same idempotency key",
+            ("route",),
+        )
+
+    def accepts(self, request: Request) -> bool:
+        return request.method not in SAFE_METHODS and self.header in request.headers
+
+    async def handle(self, route: str, request: Request, handler: Handler) -> Response:
+        """Process request using handler, unless a response is stored (or in flight) for its idempotency key
+
+        Raises:
+            IdempotencyKeyError: When key is too long, or was used for another request
+        """
+        idempotency_key = request.headers[self.header]
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            raise IdempotencyKeyError(
+                f"{self.header} header must hold between 1 and {MAX_KEY_LENGTH} characters"
+            )
+        key: StoreKey = (scope_tenant(request.scope), idempotency_key)
+        # Body is cached by request, so handler reads it again without receiving it twice
+        fingerprint = await self.fingerprint(request)
+        stored = self.store.get(key)
+        if stored is None:
+
+            async def compute() -> typing.Tuple[
+                Response, typing.Optional[StoredResult]
+            ]:
+                response = await handler(request)
+                # Failed requests can be retried, and streaming responses cannot be stored
+                if response.status_code >= 500 or not hasattr(response, "body"):
+                    return response, None
+                result = self.store.put(
+                    key,
+                    response.status_code,
+                    [
+                        (name.decode("latin-1"), value.decode("latin-1"))
+                        for name, value in response.raw_headers
+                    ],
+                    response.body,
+                    fingerprint,
+                )
+                # Response is returned once it is persisted, so a retry after a restart is replayed as well
+                await self.persist()
+                return response, result
+
+            (response, stored), shared = await self.flights.do(key, compute)
+            if not shared:
+                return response
+            if stored is None:
+                # Response was not stored, so request is executed again as if it was retried
+                return await handler(request)
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyKeyError(
+                f"{self.header} header was already used for another request"
+            )
+        self.replayed.labels(route).inc()
+        return self.replay(stored)
+
+    async def fingerprint(self, request: Request) -> str:
+        digest = hashlib.sha256()
+        for part in (
+            request.method.encode("latin-1"),
+            request.scope["path"].encode("utf-8"),
+            request.scope["query_string"],
+            await request.body(),
+        ):
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def replay(self, stored: StoredResult) -> Response:
+        response = Response(stored.body, status_code=stored.status_code)
+        response.raw_headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in stored.headers
+        ] + [(REPLAYED_HEADER.lower().encode("latin-1"), b"true")]
+        return response
+
+    async def persist(self) -> None:
+        """Write stored results to file without blocking the event loop.
+
+        Writes are serialized, and a single write persists all results stored while previous write was running.
+        Results are appended to file, unless file holds too many lines: it is then rewritten out of stored results.
+        Results are serialized within executor.
+        """
+        async with self._write_lock:
+            entries, self.store.unwritten = self.store.unwritten, []
+            if not entries:
+                return
+            loop = asyncio.get_running_loop()
+            try:
+                if self.store.should_compact(len(entries)):
+                    await loop.run_in_executor(
+                        self.executor, self.store.compact, self.store.entries()
+                    )
+                else:
+                    await loop.run_in_executor(
+                        self.executor, self.store.append, entries
+                    )
+            except BaseException:
+                # Results are written again by next write
+                self.store.unwritten[:0] = entries
+                raise
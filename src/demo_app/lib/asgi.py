@@ -0,0 +1,156 @@
+"""A minimal ASGI client used to drive the application in-process (E.G, by benchmarks and cache warm up).
+
+Unlike `fastapi.testclient.TestClient`, this client does not depend on `requests` and does not run the application in another thread.
+Requests are sent directly to the ASGI application from the running event loop, so that measurements are not skewed by the client itself.
+"""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import types
+import typing
+
+from starlette.types import ASGIApp, Message
+
+
+@dataclasses.dataclass
+class ASGIResponse:
+    """A response received from an ASGI application"""
+
+    status_code: int
+    headers: typing.List[typing.Tuple[bytes, bytes]]
+    body: bytes
+
+    def json(self) -> typing.Any:
+        return json.loads(self.body)
+
+    def header(self, name: str) -> typing.Optional[str]:
+        """Get the value of a response header (case insensitive)"""
+        key = name.lower().encode("latin-1")
+        for header, value in self.headers:
+            if header.lower() == key:
+                return value.decode("latin-1")
+        return None
+
+
+class ASGIClient:
+    """Send requests to an ASGI application without any network involved.
+
+    Application lifespan (startup and shutdown) is handled when client is used as an async context manager.
+    """
+
+    def __init__(self, app: ASGIApp, client: typing.Tuple[str, int] = ("bench", 0)):
+        self.app = app
+        self.client = client
+        self._lifespan_task: typing.Optional[asyncio.Task[None]] = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        query_string: str = "",
+        json_body: typing.Any = None,
+        headers: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> ASGIResponse:
+        """Send a request and wait for the complete response"""
+        body = b"" if json_body is None else json.dumps(json_body).encode("utf-8")
+        raw_headers = [(b"host", b"bench")]
+        if json_body is not None:
+            raw_headers.append((b"content-type", b"application/json"))
+            raw_headers.append((b"content-length", str(len(body)).encode()))
+        for key, value in (headers or {}).items():
+            raw_headers.append((key.lower().encode("latin-1"), value.encode("latin-1")))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method.upper(),
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "query_string": query_string.encode("utf-8"),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": self.client,
+            "server": ("bench", 80),
+        }
+        request_sent = False
+        disconnected = asyncio.Event()
+        status_code = 500
+        response_headers: typing.List[typing.Tuple[bytes, bytes]] = []
+        chunks: typing.List[bytes] = []
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Request is never disconnected before response is complete
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:
+            nonlocal status_code, response_headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    disconnected.set()
+
+        await self.app(scope, receive, send)
+        disconnected.set()
+        return ASGIResponse(status_code, response_headers, b"".join(chunks))
+
+    async def get(self, path: str, **kwargs: typing.Any) -> ASGIResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: typing.Any) -> ASGIResponse:
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path: str, **kwargs: typing.Any) -> ASGIResponse:
+        return await self.request("PUT", path, **kwargs)
+
+    async def delete(self, path: str, **kwargs: typing.Any) -> ASGIResponse:
+        return await self.request("DELETE", path, **kwargs)
+
+    async def startup(self) -> None:
+        """Run application startup using ASGI lifespan protocol"""
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}}
+        # Queues are created here to be bound to the running event loop
+        self._lifespan_receive: asyncio.Queue[Message] = asyncio.Queue()
+        self._lifespan_send: asyncio.Queue[Message] = asyncio.Queue()
+
+        async def lifespan() -> None:
+            await self.app(scope, self._lifespan_receive.get, self._lifespan_send.put)
+
+        self._lifespan_task = asyncio.create_task(lifespan())
+        await self._lifespan_receive.put({"type": "lifespan.startup"})
+        message = await self._lifespan_send.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"Application startup failed: {message}")
+
+    async def shutdown(self) -> None:
+        """Run application shutdown using ASGI lifespan protocol"""
+        if self._lifespan_task is None:
+            return
+        await self._lifespan_receive.put({"type": "lifespan.shutdown"})
+        message = await self._lifespan_send.get()
+        await self._lifespan_task
+        self._lifespan_task = None
+        if message["type"] != "lifespan.shutdown.complete":
+            raise RuntimeError(f"Application shutdown failed: {message}")
+
+    async def __aenter__(self) -> ASGIClient:
+        await self.startup()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: typing.Optional[typing.Type[BaseException]] = None,
+        exc: typing.Optional[BaseException] = None,
+        tb: typing.Optional[types.TracebackType] = None,
+    ) -> None:
+        await self.shutdown()
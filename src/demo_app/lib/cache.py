@@ -0,0 +1,163 @@
+"""This module provides an in-memory cache bounded by a memory budget.
+
+Entries are evicted in least recently used order once the total size of entries exceeds the budget.
+Entries may expire after a time to live, and may be tagged so that they can be invalidated together.
+
+Tags are plain strings (E.G, "employee:<id>"). A tag ending with "*" invalidates all tags starting with
+the same prefix (E.G, "employees:*" invalidates "employees:all" and "employees:lastnames").
+
+Sizes are provided by callers: the cache does not measure values, so it never traverses them.
+"""
+from __future__ import annotations
+
+import collections
+import time
+import typing
+
+from .metrics import MetricsRegistry, NullRegistry
+
+T = typing.TypeVar("T")
+
+
+class _Entry(typing.Generic[T]):
+
+    __slots__ = ("value", "size", "expires", "tags")
+
+    def __init__(
+        self,
+        value: T,
+        size: int,
+        expires: typing.Optional[float],
+        tags: typing.FrozenSet[str],
+    ) -> None:
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.tags = tags
+
+
+class ResponseCache(typing.Generic[T]):
+    """An LRU cache with a memory budget, time to live and tag based invalidation.
+
+    Arguments:
+        max_bytes: Maximum total size of entries. Cache is disabled when 0.
+        default_ttl: Time to live (in seconds) of entries stored without an explicit time to live. None means forever.
+        registry: Registry where cache metrics are reported.
+        clock: Function returning current time in seconds.
+
+    Attributes:
+        generation: Incremented on each invalidation. Values computed while generation changed may be stale,
+            and should not be stored.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 0,
+        default_ttl: typing.Optional[float] = None,
+        registry: typing.Optional[MetricsRegistry] = None,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self.size = 0
+        self.generation = 0
+        self._entries: collections.OrderedDict[
+            typing.Hashable, _Entry[T]
+        ] = collections.OrderedDict()
+        self._tags: typing.Dict[str, typing.Set[typing.Hashable]] = {}
+        registry = registry or NullRegistry()
+        self.hits = registry.counter(
+            "response_cache_hits_total", "Number of cache hits", ("route",)
+        )
+        self.misses = registry.counter(
+            "response_cache_misses_total", "Number of cache misses", ("route",)
+        )
+        self.evictions = registry.counter(
+            "response_cache_evictions_total",
+            "Number of entries removed from cache",
+            ("reason",),
+        )
+        registry.gauge(
+            "response_cache_size_bytes", "Total size of cache entries in bytes"
+        ).labels().set_function(lambda: self.size)
+        registry.gauge(
+            "response_cache_entries", "Number of cache entries"
+        ).labels().set_function(lambda: len(self._entries))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: typing.Hashable) -> typing.Optional[T]:
+        """Get a value and mark it as recently used. Return None when value is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires is not None and entry.expires <= self.clock():
+            self._remove(key, "expired")
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def set(
+        self,
+        key: typing.Hashable,
+        value: T,
+        size: int,
+        ttl: typing.Optional[float] = None,
+        tags: typing.Iterable[str] = (),
+    ) -> bool:
+        """Store a value, evicting least recently used values if needed. Return False when value is too large."""
+        if size > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._remove(key, "replaced")
+        ttl = self.default_ttl if ttl is None else ttl
+        entry = _Entry(
+            value,
+            size,
+            None if ttl is None else self.clock() + ttl,
+            frozenset(tags),
+        )
+        self._entries[key] = entry
+        self.size += size
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)), "lru")
+        return True
+
+    def invalidate(self, tags: typing.Iterable[str]) -> int:
+        """Remove entries holding any of given tags. Return number of removed entries."""
+        self.generation += 1
+        keys: typing.Set[typing.Hashable] = set()
+        for tag in tags:
+            if tag.endswith("*"):
+                prefix = tag[:-1]
+                for candidate, tagged in self._tags.items():
+                    if candidate.startswith(prefix):
+                        keys.update(tagged)
+            else:
+                keys.update(self._tags.get(tag, ()))
+        for key in keys:
+            self._remove(key, "invalidated")
+        return len(keys)
+
+    def clear(self) -> None:
+        self.generation += 1
+        for key in list(self._entries):
+            self._remove(key, "invalidated")
+
+    def _remove(self, key: typing.Hashable, reason: str) -> None:
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+        for tag in entry.tags:
+            tagged = self._tags[tag]
+            tagged.discard(key)
+            if not tagged:
+                del self._tags[tag]
+        self.evictions.labels(reason).inc()
@@ -0,0 +1,181 @@
+"""This module writes employees in columnar formats: Arrow IPC streams and Parquet files.
+
+Both formats are written one record batch at a time, out of the columnar view of `EmployeeDatabase`,
+so the whole table is never built in memory. Arrow IPC streams can be read by dataframe libraries
+(E.G, `pyarrow.ipc.open_stream`, `polars.read_ipc_stream`) without parsing JSON.
+
+pyarrow is an optional dependency (see the "arrow" extra). It is imported the first time an export is requested,
+so that processes which never export do not pay for its import time and memory.
+"""
+from __future__ import annotations
+
+import typing
+
+from .errors import ExportUnavailableError
+from .models import EmployeeInDB
+
+ColumnarFormat = typing.Literal["arrow", "parquet"]
+
+# Number of employees within each record batch (or Parquet row group)
+BATCH_SIZE = 64 * 1024
+
+MEDIA_TYPES: typing.Dict[ColumnarFormat, str] = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Columns in the order they are written, with their type and whether they may be null
+COLUMNS: typing.List[typing.Tuple[str, str, bool]] = [
+    ("id", "string", False),
+    ("lastname", "string", False),
+    ("firstname", "string", False),
+    ("team", "string", False),
+    ("age", "int64", True),
+    ("favorite_animal", "string", True),
+    ("hobby", "string", True),
+    ("version", "int64", False),
+]
+
+
+def to_columns(
+    employees: typing.Sequence[EmployeeInDB],
+) -> typing.Dict[str, typing.List[typing.Any]]:
+    """Lists of values by column name. Does not require pyarrow."""
+    return {
+        name: [getattr(employee, name) for employee in employees]
+        for name, _, _ in COLUMNS
+    }
+
+
+def import_pyarrow() -> typing.Any:
+    """Import pyarrow on first use
+
+    Raises:
+        ExportUnavailableError: When pyarrow is not installed
+    """
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ExportUnavailableError(
+            'Columnar exports require pyarrow (install the "arrow" extra)'
+        ) from exc
+    return pyarrow
+
+
+def employee_schema(pa: typing.Any) -> typing.Any:
+    """Arrow schema of employees, built using given pyarrow module"""
+    return pa.schema(
+        [
+            pa.field(name, getattr(pa, type_name)(), nullable=nullable)
+            for name, type_name, nullable in COLUMNS
+        ]
+    )
+
+
+class ColumnarWriter:
+    """Write batches of columns to a binary file, as an Arrow IPC stream or as a Parquet file.
+
+    Arguments:
+        sink: Binary file object written sequentially.
+        format: Either "arrow" or "parquet".
+
+    Raises:
+        ExportUnavailableError: When pyarrow is not installed
+    """
+
+    def __init__(self, sink: typing.BinaryIO, format: ColumnarFormat = "arrow") -> None:
+        self.format = format
+        self.rows = 0
+        self._pa = import_pyarrow()
+        self.schema = employee_schema(self._pa)
+        self._writer: typing.Any
+        if format == "parquet":
+            import pyarrow.parquet
+
+            self._writer = pyarrow.parquet.ParquetWriter(sink, self.schema)
+        else:
+            self._writer = self._pa.ipc.new_stream(sink, self.schema)
+
+    def write(self, columns: typing.Mapping[str, typing.List[typing.Any]]) -> None:
+        """Write a batch, out of lists of values by column name"""
+        batch = self._pa.RecordBatch.from_arrays(
+            [
+                self._pa.array(columns[field.name], type=field.type)
+                for field in self.schema
+            ],
+            schema=self.schema,
+        )
+        if self.format == "parquet":
+            # Each batch is written as a row group
+            self._writer.write_table(self._pa.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self) -> None:
+        """Write end of stream (or Parquet footer)"""
+        self._writer.close()
+
+    def __enter__(self) -> ColumnarWriter:
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+
+class _ChunkSink:
+    """A write-only binary file keeping written bytes until they are taken"""
+
+    closed = False
+
+    def __init__(self) -> None:
+        self.chunks: typing.List[bytes] = []
+        self.position = 0
+
+    def write(self, data: typing.Any) -> int:
+        chunk = bytes(data)
+        self.chunks.append(chunk)
+        self.position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def take(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def iter_columnar(
+    batches: typing.Iterable[typing.Mapping[str, typing.List[typing.Any]]],
+    format: ColumnarFormat = "arrow",
+) -> typing.Iterator[bytes]:
+    """Encode batches of columns, yielding encoded bytes as soon as each batch is written.
+
+    pyarrow is imported before the first batch is requested, so a missing dependency is reported
+    by the first call to `next`, before any byte is yielded.
+
+    Raises:
+        ExportUnavailableError: When pyarrow is not installed
+    """
+    sink = _ChunkSink()
+    writer = ColumnarWriter(typing.cast(typing.BinaryIO, sink), format)
+    for columns in batches:
+        writer.write(columns)
+        data = sink.take()
+        if data:
+            yield data
+    writer.close()
+    yield sink.take()
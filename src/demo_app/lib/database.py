@@ -1,63 +1,193 @@
 """This module provides a class to facilitates data management and interaction with the demo database."""
 from __future__ import annotations
 
+import os
 import pathlib
 import typing
 import uuid
 
-from .errors import EmployeeNotFoundError
+from .columnar import to_columns
+from .errors import EmployeeNotFoundError, VersionConflictError
+from .instrumentation import DatabaseInstrument
 from .models import EmployeeDump, EmployeeFormCreate, EmployeeFormUpdate, EmployeeInDB
+from .timing import timed
+
+
+class _AnyVersion:
+    """A container holding all versions"""
+
+    def __contains__(self, version: object) -> bool:
+        return True
+
+
+# Expected versions matching any existing employee
+ANY_VERSION: typing.Container[int] = _AnyVersion()
 
 
 class EmployeeDatabase:
-    """A class used to perform mutations on employee databases easily"""
+    """A class used to perform mutations on employee databases easily
 
-    def __init__(self, path: typing.Union[str, pathlib.Path]) -> None:
+    Arguments:
+        path: Path to the JSON dump holding employees.
+        instrument: Instrument used to observe database operations. Does nothing by default.
+        fsync: Flush file to disk using `os.fsync` each time database is saved.
+        employees: Employees, when they were already read from path. Path is read when None.
+
+    Attributes:
+        version: Incremented each time employees are modified or refreshed.
+            Values computed out of employees remain valid as long as version does not change.
+        saved_version: Version of employees last read from or written to file.
+
+    Listeners added using `add_listener` are called with invalidated tags each time employees are modified:
+    "employees:*" on any modification, and "employee:<id>" when an existing employee is updated or deleted.
+
+    Each employee holds its own version, incremented each time it is updated. Updates and deletions can be
+    conditioned on expected versions: concurrent writers modifying the same employee are detected without
+    serializing writers modifying other employees.
+    """
+
+    def __init__(
+        self,
+        path: typing.Union[str, pathlib.Path],
+        instrument: typing.Optional[DatabaseInstrument] = None,
+        fsync: bool = False,
+        employees: typing.Optional[typing.Iterable[EmployeeInDB]] = None,
+    ) -> None:
         self.path = pathlib.Path(path).resolve(True)
-        self.employees = {
-            employee.id: employee
-            for employee in EmployeeDump.parse_file(self.path).__root__
-        }
+        self.instrument = instrument or DatabaseInstrument()
+        self.fsync = fsync
+        self.employees: typing.Dict[str, EmployeeInDB] = {}
+        self.version = 0
+        self.saved_version = 0
+        self.listeners: typing.List[
+            typing.Callable[[typing.List[str]], typing.Any]
+        ] = []
+        self.refresh(employees)
+
+    def add_listener(
+        self, listener: typing.Callable[[typing.List[str]], typing.Any]
+    ) -> None:
+        """Call listener with invalidated tags each time employees are modified"""
+        self.listeners.append(listener)
+
+    @property
+    def dirty(self) -> bool:
+        """True when some modifications are not saved to file"""
+        return self.version != self.saved_version
+
+    def _changed(self, *tags: str) -> None:
+        self.version += 1
+        for listener in self.listeners:
+            listener(list(tags))
 
     def values(self) -> typing.List[EmployeeInDB]:
         """List holding all employees in database"""
-        return list(self.employees.values())
+        with self.instrument.operation("values") as op, timed("db"):
+            values = list(self.employees.values())
+            op.rows(returned=len(values))
+            return values
 
     def json(self, **kwargs: typing.Any) -> str:
         """JSON representation of database state"""
         kwargs["exclude_unset"] = True
-        return EmployeeDump.parse_obj(self.values()).json(**kwargs)
+        with self.instrument.operation("json") as op, timed("db"):
+            with op.phase("serialize"):
+                return EmployeeDump.parse_obj(self.values()).json(**kwargs)
 
-    def refresh(self) -> None:
-        """Refresh database"""
-        self.employees = {
-            employee.id: employee
-            for employee in EmployeeDump.parse_file(self.path).__root__
-        }
+    def columns(
+        self, batch_size: int
+    ) -> typing.Iterator[typing.Dict[str, typing.List[typing.Any]]]:
+        """Columnar view of database: yield batches of at most `batch_size` employees, as lists of values by field.
+
+        Employees are listed when this method is called, so batches are consistent even when
+        employees are modified while batches are consumed. Only one batch is built at a time.
+        """
+        return self._columns(self.values(), batch_size)
+
+    def _columns(
+        self, employees: typing.List[EmployeeInDB], batch_size: int
+    ) -> typing.Iterator[typing.Dict[str, typing.List[typing.Any]]]:
+        # Generator is not timed, for the same reason as `filter`
+        with self.instrument.operation("columns", current=False) as op:
+            returned = 0
+            try:
+                for start in range(0, len(employees), batch_size):
+                    batch = employees[start : start + batch_size]
+                    yield to_columns(batch)
+                    returned += len(batch)
+            finally:
+                op.rows(scanned=len(employees), returned=returned)
+
+    def refresh(
+        self, employees: typing.Optional[typing.Iterable[EmployeeInDB]] = None
+    ) -> None:
+        """Refresh database, out of given employees or else out of file"""
+        with self.instrument.operation("refresh") as op, timed("db"):
+            if employees is None:
+                with op.phase("read"):
+                    raw = self.path.read_bytes()
+                op.bytes(read=len(raw))
+                with op.phase("parse"):
+                    employees = EmployeeDump.parse_raw(raw).__root__
+            self.employees = {employee.id: employee for employee in employees}
+            self._changed("employees:*", "employee:*")
+            self.saved_version = self.version
+            op.rows(scanned=len(self.employees))
 
     def save(self, **kwargs: typing.Any) -> None:
         """Save database state to file"""
-        self.path.write_text(self.json(**kwargs))
+        with self.instrument.operation("save") as op, timed("db"):
+            with op.phase("serialize"):
+                data = self.json(**kwargs).encode("utf-8")
+            with op.phase("write"):
+                with open(self.path, "wb") as dump:
+                    dump.write(data)
+                    dump.flush()
+                    if self.fsync:
+                        with op.phase("fsync"):
+                            os.fsync(dump.fileno())
+            op.bytes(written=len(data))
+            self.saved_version = self.version
 
     def filter(self, **kwargs: typing.Any) -> typing.Iterator[EmployeeInDB]:
         """Yield employees matching filters. By default all employees are yielded"""
-        for employee in self.employees.values():
-            employee_dict = employee.dict(by_alias=False)
-            for field, expected_value in kwargs.items():
-                value_in_db = employee_dict.get(field, ...)
-                if value_in_db is ...:
-                    break
-                try:
-                    if value_in_db != expected_value:
-                        break
-                except AttributeError:
-                    break
+        # Filter is a generator, so it is not timed: time spent by consumers between two items would be counted.
+        with self.instrument.operation("filter", current=False) as op:
+            scanned = returned = 0
+            # Employees are indexed by ID, there is no need to scan all employees when filtering by ID
+            _id = kwargs.get("id", None)
+            candidates: typing.Iterable[EmployeeInDB]
+            if isinstance(_id, str):
+                employee = self.employees.get(_id)
+                candidates = () if employee is None else (employee,)
             else:
-                yield employee
+                candidates = self.employees.values()
+            try:
+                for employee in candidates:
+                    scanned += 1
+                    employee_dict = employee.dict(by_alias=False)
+                    for field, expected_value in kwargs.items():
+                        value_in_db = employee_dict.get(field, ...)
+                        if value_in_db is ...:
+                            break
+                        try:
+                            if value_in_db != expected_value:
+                                break
+                        except AttributeError:
+                            break
+                    else:
+                        returned += 1
+                        yield employee
+            # Consumers may stop iterating before all employees are scanned
+            finally:
+                op.rows(scanned=scanned, returned=returned)
 
     def find(self, **kwargs: typing.Any) -> typing.List[EmployeeInDB]:
         """Find a many employees, optionally using filters"""
-        return list(self.filter(**kwargs))
+        with self.instrument.operation("find") as op, timed("db"):
+            employees = list(self.filter(**kwargs))
+            op.rows(returned=len(employees))
+            return employees
 
     def find_one(self, **kwargs: typing.Any) -> EmployeeInDB:
         """Find a single employee, optionally using filter
@@ -65,10 +195,12 @@ def find_one(self, **kwargs: typing.Any) -> EmployeeInDB:
         Raises:
             EmployeeNotFoundError: When no employee is found
         """
-        # Return first employe found
-        for employee in self.filter(**kwargs):
-            return employee
-        raise EmployeeNotFoundError(f"No employee found using filters: {kwargs}")
+        with self.instrument.operation("find_one") as op, timed("db"):
+            # Return first employe found
+            for employee in self.filter(**kwargs):
+                op.rows(returned=1)
+                return employee
+            raise EmployeeNotFoundError(f"No employee found using filters: {kwargs}")
 
     def create_one(
         self, employee: EmployeeFormCreate, save: bool = True
@@ -78,13 +210,15 @@ def create_one(
         Raises:
             ValidationError: When employee data is not valid
         """
-        _id = str(uuid.uuid4())
-        self.employees[_id] = EmployeeInDB.parse_obj(
-            {"_id": _id, **employee.dict(exclude_unset=True)}
-        )
-        if save:
-            self.save()
-        return self.employees[_id]
+        with self.instrument.operation("create_one"), timed("db"):
+            _id = str(uuid.uuid4())
+            self.employees[_id] = EmployeeInDB.parse_obj(
+                {"_id": _id, "version": 1, **employee.dict(exclude_unset=True)}
+            )
+            self._changed("employees:*")
+            if save:
+                self.save()
+            return self.employees[_id]
 
     def update_one(
         self,
@@ -92,40 +226,83 @@ def update_one(
         field_updates: EmployeeFormUpdate,
         create: bool = False,
         save: bool = True,
+        expected_versions: typing.Optional[typing.Container[int]] = None,
     ) -> EmployeeInDB:
-        """Update an existing employee matching filter
+        """Update an existing employee matching filter.
+
+        When expected versions are given, employee is only updated if its version is one of them,
+        and it is never created (use `ANY_VERSION` to update any existing employee).
 
         Raises:
             EmployeeNotFoundError: When filters do not match any employee
+            VersionConflictError: When employee is not at an expected version, or does not exist
         """
-        try:
-            employee = self.find_one(**filters)
-        except EmployeeNotFoundError:
-            if create:
-                new_fields = EmployeeFormCreate.parse_obj(field_updates)
-                new_employee = self.create_one(new_fields)
-                if save:
-                    self.save()
-                return new_employee
-            else:
-                raise
-        self.employees[employee.id] = EmployeeInDB.parse_obj(
-            employee.copy(update=field_updates.dict(exclude_unset=True, by_alias=True))
-        )
-        if save:
-            self.save()
-        return self.employees[employee.id]
+        with self.instrument.operation("update_one"), timed("db"):
+            try:
+                employee = self.find_one(**filters)
+            except EmployeeNotFoundError:
+                if expected_versions is not None:
+                    raise VersionConflictError(
+                        f"No employee found using filters: {filters}"
+                    )
+                if create:
+                    new_fields = EmployeeFormCreate.parse_obj(field_updates)
+                    new_employee = self.create_one(new_fields)
+                    if save:
+                        self.save()
+                    return new_employee
+                else:
+                    raise
+            self._check_version(employee, expected_versions)
+            self.employees[employee.id] = EmployeeInDB.parse_obj(
+                employee.copy(
+                    update={
+                        **field_updates.dict(exclude_unset=True, by_alias=True),
+                        "version": employee.version + 1,
+                    }
+                )
+            )
+            self._changed("employees:*", f"employee:{employee.id}")
+            if save:
+                self.save()
+            return self.employees[employee.id]
 
     def delete_one(
-        self, filters: typing.Dict[str, typing.Any], save: bool = True
+        self,
+        filters: typing.Dict[str, typing.Any],
+        save: bool = True,
+        expected_versions: typing.Optional[typing.Container[int]] = None,
     ) -> None:
-        """Delete an existing employee matching filter
+        """Delete an existing employee matching filter, if it is at one of the expected versions (when given)
 
         Raises:
             EmployeeNotFoundError: When filters do not match any employee
+            VersionConflictError: When employee is not at an expected version, or does not exist
         """
-        employee = self.find_one(**filters)
-        if employee:
-            self.employees.pop(employee.id)
-            if save:
-                self.save()
+        with self.instrument.operation("delete_one"), timed("db"):
+            try:
+                employee = self.find_one(**filters)
+            except EmployeeNotFoundError:
+                if expected_versions is not None:
+                    raise VersionConflictError(
+                        f"No employee found using filters: {filters}"
+                    )
+                raise
+            self._check_version(employee, expected_versions)
+            if employee:
+                self.employees.pop(employee.id)
+                self._changed("employees:*", f"employee:{employee.id}")
+                if save:
+                    self.save()
+
+    def _check_version(
+        self,
+        employee: EmployeeInDB,
+        expected_versions: typing.Optional[typing.Container[int]],
+    ) -> None:
+        # Check and modification happen without yielding to other writers, so no lock is needed
+        if expected_versions is not None and employee.version not in expected_versions:
+            raise VersionConflictError(
+                f"Employee {employee.id} is at version {employee.version}",
+                current=employee.version,
+            )
@@ -1,8 +1,46 @@
 """This module provides error classes to use within library code."""
 from __future__ import annotations
 
+import typing
+
 
 class EmployeeNotFoundError(KeyError):
     """A class raised when query did not match any known employee"""
 
     pass
+
+
+class VersionConflictError(RuntimeError):
+    """A class raised when an employee is not at the version expected by a conditional modification
+
+    Attributes:
+        current: Current version of employee, or None when employee does not exist.
+    """
+
+    def __init__(self, message: str, current: typing.Optional[int] = None) -> None:
+        super().__init__(message)
+        self.current = current
+
+
+class TenantNotFoundError(KeyError):
+    """A class raised when request tenant is missing, invalid, or has no database"""
+
+    pass
+
+
+class DatabaseNotReadyError(RuntimeError):
+    """A class raised when database is accessed while it is still loading"""
+
+    pass
+
+
+class IdempotencyKeyError(ValueError):
+    """A class raised when an idempotency key is invalid, or was already used for another request"""
+
+    pass
+
+
+class ExportUnavailableError(RuntimeError):
+    """A class raised when an export format requires an optional dependency which is not installed"""
+
+    pass
@@ -0,0 +1,224 @@
+"""This module provides named pools of threads and processes used to run blocking or CPU bound work.
+
+Each pool reports its queue depth (tasks waiting for a worker) and its utilization (fraction of busy workers).
+Both are derived from the number of submitted tasks which are not done yet, so they are measured the same way
+for thread and process pools, without running any code within workers.
+
+Process pools start their workers when the registry is started, rather than on first submission.
+When workers are forked, they only inherit memory allocated so far: starting the registry before loading
+a large dataset keeps the dataset out of workers.
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import functools
+import multiprocessing
+import os
+import threading
+import types
+import typing
+
+from .metrics import MetricsRegistry, NullRegistry
+
+T = typing.TypeVar("T")
+PoolKind = typing.Literal["thread", "process"]
+
+
+class ExecutorPool(concurrent.futures.Executor):
+    """A pool of threads or processes, created when started and measured while running.
+
+    Arguments:
+        name: Name of the pool, used as metrics label.
+        kind: Either "thread" or "process".
+        max_workers: Number of workers.
+        start_method: Start method of process workers (E.G, "fork" or "spawn"). Platform default is used when None.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: PoolKind,
+        max_workers: int,
+        start_method: typing.Optional[str] = None,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.start_method = start_method
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self.executor: typing.Optional[concurrent.futures.Executor] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of submitted tasks waiting for a worker"""
+        return max(self.in_flight - self.max_workers, 0)
+
+    @property
+    def utilization(self) -> float:
+        """Fraction of workers running a task"""
+        return min(self.in_flight, self.max_workers) / self.max_workers
+
+    async def start(self) -> None:
+        """Create the pool. Process workers are all started before this coroutine returns."""
+        if self.executor is not None:
+            return
+        if self.kind == "thread":
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix=f"{self.name}-executor"
+            )
+            return
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            self.max_workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+        )
+        # Workers are started on demand, so as many tasks as workers are submitted at once
+        await asyncio.gather(
+            *(
+                asyncio.wrap_future(self.executor.submit(os.getpid))
+                for _ in range(self.max_workers)
+            )
+        )
+
+    def submit(
+        self,
+        fn: typing.Callable[..., T],
+        /,
+        *args: typing.Any,
+        **kwargs: typing.Any,
+    ) -> concurrent.futures.Future[T]:
+        if self.executor is None:
+            raise RuntimeError(f"Executor {self.name} is not started")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(
+        self, future: typing.Optional[concurrent.futures.Future[typing.Any]]
+    ) -> None:
+        # Called from worker threads, or from the management thread of process pools
+        with self._lock:
+            self.in_flight -= 1
+
+    async def run(
+        self, fn: typing.Callable[..., T], *args: typing.Any, **kwargs: typing.Any
+    ) -> T:
+        """Run a function within the pool and wait for its result"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True, **kwargs: typing.Any) -> None:
+        if self.executor is None:
+            return
+        executor, self.executor = self.executor, None
+        executor.shutdown(wait=wait)
+
+
+class ExecutorRegistry:
+    """Named thread and process pools, started and stopped together.
+
+    The registry is an async context manager: pools are started on enter, and shut down on exit
+    once running tasks are complete.
+
+    Arguments:
+        threads: Number of workers of each thread pool, by name.
+        processes: Number of workers of each process pool, by name.
+        start_method: Start method of process workers. Platform default is used when None.
+        registry: Registry where pools metrics are reported.
+    """
+
+    def __init__(
+        self,
+        threads: typing.Mapping[str, int],
+        processes: typing.Mapping[str, int],
+        start_method: typing.Optional[str] = None,
+        registry: typing.Optional[MetricsRegistry] = None,
+    ) -> None:
+        self.pools: typing.Dict[str, ExecutorPool] = {}
+        for name, workers in threads.items():
+            self.pools[name] = ExecutorPool(name, "thread", workers)
+        for name, workers in processes.items():
+            if name in self.pools:
+                raise ValueError(f"Executor {name} is declared twice")
+            self.pools[name] = ExecutorPool(name, "process", workers, start_method)
+        registry = registry or NullRegistry()
+        workers_gauge = registry.gauge(
+            "executor_workers", "Number of workers of executor", ("executor", "kind")
+        )
+        queue_gauge = registry.gauge(
+            "executor_queue_depth",
+            "Number of tasks waiting for a worker of executor",
+            ("executor",),
+        )
+        utilization_gauge = registry.gauge(
+            "executor_utilization_ratio",
+            "Fraction of workers of executor running a task",
+            ("executor",),
+        )
+        for pool in self.pools.values():
+            workers_gauge.labels(pool.name, pool.kind).set(pool.max_workers)
+            queue_gauge.labels(pool.name).set_function(
+                lambda pool=pool: pool.queue_depth  # type: ignore[misc]
+            )
+            utilization_gauge.labels(pool.name).set_function(
+                lambda pool=pool: pool.utilization  # type: ignore[misc]
+            )
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.pools
+
+    def __getitem__(self, name: str) -> ExecutorPool:
+        """Get a pool by name
+
+        Raises:
+            KeyError: When no pool is declared with given name
+        """
+        return self.pools[name]
+
+    def get(self, name: str) -> typing.Optional[ExecutorPool]:
+        return self.pools.get(name)
+
+    async def start(self) -> None:
+        for pool in self.pools.values():
+            await pool.start()
+
+    async def shutdown(self) -> None:
+        """Shut down all pools, waiting for running tasks without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        for pool in self.pools.values():
+            # Waiting for running tasks blocks, so it happens within a thread of the default loop executor
+            await loop.run_in_executor(
+                None, functools.partial(pool.shutdown, wait=True)
+            )
+
+    def summary(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        return [
+            {
+                "name": pool.name,
+                "kind": pool.kind,
+                "workers": pool.max_workers,
+                "started": pool.executor is not None,
+                "in_flight": pool.in_flight,
+                "queue_depth": pool.queue_depth,
+                "utilization": pool.utilization,
+            }
+            for pool in self.pools.values()
+        ]
+
+    async def __aenter__(self) -> ExecutorRegistry:
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: typing.Optional[typing.Type[BaseException]] = None,
+        exc: typing.Optional[BaseException] = None,
+        tb: typing.Optional[types.TracebackType] = None,
+    ) -> None:
+        await self.shutdown()
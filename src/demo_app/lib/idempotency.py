@@ -0,0 +1,218 @@
+"""This module provides a bounded store of results of requests sent with an idempotency key.
+
+Clients retrying a request (E.G, after a timeout) send the same idempotency key, and receive the stored result
+of the first request instead of executing it again.
+
+Results expire after a time to live, and the oldest results are evicted once the store holds too many of them.
+Expiration times are wall clock times, so that they remain valid once the store is written to a file
+and read again after a restart.
+
+The file is an append-only log holding one JSON result per line: storing a result appends a single line,
+whatever the number of stored results. The log is rewritten out of stored results once it holds
+too many lines, and when it is read.
+"""
+from __future__ import annotations
+
+import base64
+import collections
+import json
+import os
+import pathlib
+import time
+import typing
+
+# Idempotency keys are scoped to a tenant (None when tenants are disabled)
+StoreKey = typing.Tuple[typing.Optional[str], str]
+
+
+class StoredResult:
+    """Status code, headers and body of the response to a request, with a fingerprint of the request"""
+
+    __slots__ = ("status_code", "headers", "body", "fingerprint", "expires")
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: typing.List[typing.Tuple[str, str]],
+        body: bytes,
+        fingerprint: str,
+        expires: float,
+    ) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.fingerprint = fingerprint
+        self.expires = expires
+
+    def to_dict(self, key: StoreKey) -> typing.Dict[str, typing.Any]:
+        return {
+            "tenant": key[0],
+            "key": key[1],
+            "status_code": self.status_code,
+            "headers": self.headers,
+            "body": base64.b64encode(self.body).decode("ascii"),
+            "fingerprint": self.fingerprint,
+            "expires": self.expires,
+        }
+
+    @classmethod
+    def from_dict(
+        cls, data: typing.Dict[str, typing.Any]
+    ) -> typing.Tuple[StoreKey, StoredResult]:
+        return (data["tenant"], data["key"]), cls(
+            data["status_code"],
+            [(name, value) for name, value in data["headers"]],
+            base64.b64decode(data["body"]),
+            data["fingerprint"],
+            data["expires"],
+        )
+
+
+# A stored result with its key
+Entry = typing.Tuple[StoreKey, StoredResult]
+
+
+class IdempotencyStore:
+    """Results of requests by idempotency key, bounded in number and in time.
+
+    The store lives in memory. It is read from file using `load`, and written using `append` or `compact`.
+    Results to write are taken from `unwritten` on the thread modifying the store, and are serialized
+    by `append` and `compact`, so that they can run within another thread.
+
+    Arguments:
+        path: Path of the file holding stored results.
+        max_entries: Maximum number of stored results. Oldest results are evicted first.
+        ttl: Time to live (in seconds) of stored results.
+        fsync: Flush file to disk using `os.fsync` each time store is written.
+        clock: Function returning current wall clock time in seconds.
+
+    Attributes:
+        unwritten: Results stored since they were last taken to be written, in order.
+        logged: Number of lines of the file.
+    """
+
+    def __init__(
+        self,
+        path: typing.Union[str, pathlib.Path],
+        max_entries: int = 10000,
+        ttl: float = 24 * 60 * 60,
+        fsync: bool = False,
+        clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        self.path = pathlib.Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fsync = fsync
+        self.clock = clock
+        self.unwritten: typing.List[Entry] = []
+        self.logged = 0
+        self._results: collections.OrderedDict[
+            StoreKey, StoredResult
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, key: StoreKey) -> typing.Optional[StoredResult]:
+        """Get a stored result. Return None when result is missing or expired."""
+        result = self._results.get(key)
+        if result is None:
+            return None
+        if result.expires <= self.clock():
+            del self._results[key]
+            return None
+        return result
+
+    def put(
+        self,
+        key: StoreKey,
+        status_code: int,
+        headers: typing.List[typing.Tuple[str, str]],
+        body: bytes,
+        fingerprint: str,
+    ) -> StoredResult:
+        """Store a result, evicting oldest results when store is full"""
+        result = StoredResult(
+            status_code, headers, body, fingerprint, self.clock() + self.ttl
+        )
+        self._results.pop(key, None)
+        self._results[key] = result
+        self.unwritten.append((key, result))
+        self.purge()
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        return result
+
+    def purge(self) -> int:
+        """Remove expired results. Return number of removed results."""
+        now = self.clock()
+        removed = 0
+        # Results are ordered by insertion, and all results share the same time to live
+        while self._results:
+            key, result = next(iter(self._results.items()))
+            if result.expires > now:
+                break
+            del self._results[key]
+            removed += 1
+        return removed
+
+    def entries(self) -> typing.List[Entry]:
+        """Snapshot of stored results, which can be compacted within another thread"""
+        self.purge()
+        return list(self._results.items())
+
+    def should_compact(self, appended: int) -> bool:
+        """True when appending results would let the file hold twice as many lines as the store can hold results"""
+        return self.logged + appended > 2 * self.max_entries
+
+    def append(self, entries: typing.Sequence[Entry]) -> None:
+        """Append results to file, one line per result"""
+        data = b"".join(_dumps(key, result) for key, result in entries)
+        with open(self.path, "ab") as store_file:
+            store_file.write(data)
+            store_file.flush()
+            if self.fsync:
+                os.fsync(store_file.fileno())
+        self.logged += len(entries)
+
+    def compact(self, entries: typing.Sequence[Entry]) -> None:
+        """Rewrite file out of given results, replacing previous file atomically"""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "wb") as store_file:
+            store_file.write(b"".join(_dumps(key, result) for key, result in entries))
+            store_file.flush()
+            if self.fsync:
+                os.fsync(store_file.fileno())
+        os.replace(tmp_path, self.path)
+        self.logged = len(entries)
+
+    def load(self) -> int:
+        """Read results from file, if it exists, then compact file. Return number of results which are not expired."""
+        if not self.path.exists():
+            return 0
+        now = self.clock()
+        results: typing.Dict[StoreKey, StoredResult] = {}
+        for line in self.path.read_bytes().splitlines():
+            try:
+                key, result = StoredResult.from_dict(json.loads(line))
+            # Last line is truncated when process stopped while appending it
+            except ValueError:
+                continue
+            # Results appended last override previous results with the same key
+            results.pop(key, None)
+            results[key] = result
+        self._results = collections.OrderedDict(
+            (key, result)
+            for key, result in sorted(
+                results.items(), key=lambda entry: entry[1].expires
+            )
+            if result.expires > now
+        )
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        self.compact(list(self._results.items()))
+        return len(self._results)
+
+
+def _dumps(key: StoreKey, result: StoredResult) -> bytes:
+    return json.dumps(result.to_dict(key)).encode("utf-8") + b"\n"
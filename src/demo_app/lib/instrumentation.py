@@ -0,0 +1,249 @@
+"""This module provides instruments used to observe database operations.
+
+`EmployeeDatabase` reports every operation into an instrument:
+
+- `DatabaseInstrument` does nothing. It is used by default, so that instrumentation costs nothing when telemetry is disabled.
+
+- `TelemetryDatabaseInstrument` records operations durations, rows scanned and returned and bytes read or written into metrics,
+  and creates a span for each operation when a tracer is provided. Spans are made current while operations run, so that
+  spans of nested operations (E.G, `filter` called by `find`) are children of the calling operation span.
+
+The instrument is selected once, when the database is created.
+"""
+from __future__ import annotations
+
+import time
+import types
+import typing
+
+from .metrics import MetricsRegistry
+
+# Buckets (in seconds) are tuned for in-memory operations as well as file writes
+OPERATION_BUCKETS = (
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+)
+
+
+class OperationRecord:
+    """Collect details about a single database operation.
+
+    This class does nothing, it is returned by `DatabaseInstrument`.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> OperationRecord:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: typing.Optional[typing.Type[BaseException]] = None,
+        exc: typing.Optional[BaseException] = None,
+        tb: typing.Optional[types.TracebackType] = None,
+    ) -> None:
+        pass
+
+    def rows(self, scanned: int = 0, returned: int = 0) -> None:
+        """Report rows scanned and rows returned by operation"""
+
+    def bytes(self, read: int = 0, written: int = 0) -> None:
+        """Report bytes read or written by operation"""
+
+    def phase(self, name: str) -> typing.ContextManager[typing.Any]:
+        """Measure a phase of operation (E.G, "serialize" or "fsync")"""
+        return self
+
+
+_NULL_RECORD = OperationRecord()
+
+
+class DatabaseInstrument:
+    """An instrument which does nothing"""
+
+    enabled = False
+
+    def operation(self, name: str, current: bool = True) -> OperationRecord:
+        """Start recording an operation. Must be used as a context manager.
+
+        Operations implemented as generators must set `current` to False: the current context
+        must not leak through yield statements, and generators may be resumed from another context.
+        """
+        return _NULL_RECORD
+
+
+class TelemetryDatabaseInstrument(DatabaseInstrument):
+    """An instrument reporting database operations into metrics and traces.
+
+    Arguments:
+        metrics: The registry where metrics are registered.
+        tracer: An opentelemetry tracer. When provided, a span is created for each operation.
+    """
+
+    enabled = True
+
+    def __init__(
+        self, metrics: MetricsRegistry, tracer: typing.Optional[typing.Any] = None
+    ) -> None:
+        self.tracer = tracer
+        if tracer is not None:
+            from opentelemetry import context, trace
+
+            self.attach = context.attach
+            self.detach = context.detach
+            self.set_span_in_context = trace.set_span_in_context
+        self.duration = metrics.histogram(
+            "database_operation_duration_seconds",
+            "Duration of database operations in seconds",
+            ("operation",),
+            buckets=OPERATION_BUCKETS,
+        )
+        self.phase_duration = metrics.histogram(
+            "database_operation_phase_duration_seconds",
+            "Duration of database operations phases (read, parse, serialize, write, fsync) in seconds",
+            ("operation", "phase"),
+            buckets=OPERATION_BUCKETS,
+        )
+        self.rows_scanned = metrics.counter(
+            "database_rows_scanned_total",
+            "Number of rows scanned by database operations",
+            ("operation",),
+        )
+        self.rows_returned = metrics.counter(
+            "database_rows_returned_total",
+            "Number of rows returned by database operations",
+            ("operation",),
+        )
+        self.bytes_read = metrics.counter(
+            "database_bytes_read_total",
+            "Number of bytes read by database operations",
+            ("operation",),
+        )
+        self.bytes_written = metrics.counter(
+            "database_bytes_written_total",
+            "Number of bytes written by database operations",
+            ("operation",),
+        )
+
+    def operation(self, name: str, current: bool = True) -> OperationRecord:
+        return _TelemetryOperationRecord(self, name, current)
+
+
+class _TelemetryOperationRecord(OperationRecord):
+
+    __slots__ = (
+        "instrument",
+        "name",
+        "current",
+        "start",
+        "span",
+        "token",
+        "scanned",
+        "returned",
+        "read",
+        "written",
+    )
+
+    def __init__(
+        self, instrument: TelemetryDatabaseInstrument, name: str, current: bool
+    ) -> None:
+        self.instrument = instrument
+        self.name = name
+        self.current = current
+        self.start = 0.0
+        self.span: typing.Any = None
+        self.token: typing.Any = None
+        self.scanned = self.returned = self.read = self.written = 0
+
+    def __enter__(self) -> OperationRecord:
+        instrument = self.instrument
+        if instrument.tracer is not None:
+            self.span = instrument.tracer.start_span(f"EmployeeDatabase.{self.name}")
+            if self.current:
+                self.token = instrument.attach(
+                    instrument.set_span_in_context(self.span)
+                )
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: typing.Optional[typing.Type[BaseException]] = None,
+        exc: typing.Optional[BaseException] = None,
+        tb: typing.Optional[types.TracebackType] = None,
+    ) -> None:
+        duration = time.perf_counter() - self.start
+        instrument = self.instrument
+        instrument.duration.labels(self.name).observe(duration)
+        if self.scanned:
+            instrument.rows_scanned.labels(self.name).inc(self.scanned)
+        if self.returned:
+            instrument.rows_returned.labels(self.name).inc(self.returned)
+        if self.read:
+            instrument.bytes_read.labels(self.name).inc(self.read)
+        if self.written:
+            instrument.bytes_written.labels(self.name).inc(self.written)
+        if self.token is not None:
+            instrument.detach(self.token)
+            self.token = None
+        if self.span is not None:
+            self.span.set_attributes(
+                {
+                    "db.rows_scanned": self.scanned,
+                    "db.rows_returned": self.returned,
+                    "db.bytes_read": self.read,
+                    "db.bytes_written": self.written,
+                }
+            )
+            # Expected errors (E.G, employee not found) are recorded as well
+            if exc is not None and not isinstance(exc, GeneratorExit):
+                self.span.record_exception(exc)
+            self.span.end()
+
+    def rows(self, scanned: int = 0, returned: int = 0) -> None:
+        self.scanned += scanned
+        self.returned += returned
+
+    def bytes(self, read: int = 0, written: int = 0) -> None:
+        self.read += read
+        self.written += written
+
+    def phase(self, name: str) -> typing.ContextManager[typing.Any]:
+        return _Phase(self, name)
+
+
+class _Phase:
+
+    __slots__ = ("record", "name", "start")
+
+    def __init__(self, record: _TelemetryOperationRecord, name: str) -> None:
+        self.record = record
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> _Phase:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: typing.Optional[typing.Type[BaseException]] = None,
+        exc: typing.Optional[BaseException] = None,
+        tb: typing.Optional[types.TracebackType] = None,
+    ) -> None:
+        duration = time.perf_counter() - self.start
+        self.record.instrument.phase_duration.labels(
+            self.record.name, self.name
+        ).observe(duration)
+        if self.record.span is not None:
+            self.record.span.set_attribute(f"db.{self.name}_seconds", duration)
@@ -0,0 +1,161 @@
+"""This module provides an adaptive concurrency limiter.
+
+The limit is the number of requests allowed to be processed concurrently. It is not configured, but estimated
+from observed latency: when latency grows, requests are queuing somewhere (event loop, database, executor),
+and the limit is lowered. When latency is stable, the limit is slowly raised to probe for more capacity.
+
+Two algorithms are available:
+
+- `AIMDLimit` (additive increase, multiplicative decrease) lowers the limit when latency exceeds a fixed threshold.
+- `GradientLimit` compares short-term latency to long-term latency, and does not require any threshold.
+
+Requests have a priority. Critical requests are always admitted, low priority requests are only admitted
+while concurrency is below a fraction of the limit, so that they are shed first.
+"""
+from __future__ import annotations
+
+import math
+import typing
+
+Priority = typing.Literal["critical", "normal", "low"]
+
+
+class LimitAlgorithm(typing.Protocol):
+    """Estimate a concurrency limit out of latency samples"""
+
+    limit: float
+
+    def update(self, latency: float, in_flight: int) -> None:
+        ...
+
+
+class AIMDLimit:
+    """Increase limit by 1 when latency is below threshold, multiply limit by backoff ratio otherwise.
+
+    Arguments:
+        initial_limit: Limit used until enough samples are observed.
+        min_limit: Limit is never lowered below this value.
+        max_limit: Limit is never raised above this value.
+        latency_threshold: Latency (in seconds) above which limit is lowered.
+        backoff_ratio: Ratio applied to limit when it is lowered.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 20,
+        min_limit: float = 1,
+        max_limit: float = 1000,
+        latency_threshold: float = 0.1,
+        backoff_ratio: float = 0.9,
+    ) -> None:
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.backoff_ratio = backoff_ratio
+
+    def update(self, latency: float, in_flight: int) -> None:
+        if latency > self.latency_threshold:
+            self.limit = max(self.limit * self.backoff_ratio, self.min_limit)
+        # Limit is only raised when it is actually used, else it would grow without bounds while idle
+        elif in_flight * 2 >= self.limit:
+            self.limit = min(self.limit + 1, self.max_limit)
+
+
+class GradientLimit:
+    """Scale limit by the ratio between long-term and short-term latency.
+
+    When short-term latency is close to long-term latency, limit grows by a queue allowance (square root of limit).
+    When short-term latency grows, the gradient drops below 1 and limit is lowered proportionally.
+
+    Arguments:
+        initial_limit: Limit used until enough samples are observed.
+        min_limit: Limit is never lowered below this value.
+        max_limit: Limit is never raised above this value.
+        smoothing: Weight of a new estimate in the limit (between 0 and 1).
+        tolerance: Ratio of short-term over long-term latency tolerated before limit is lowered.
+        long_window: Number of samples over which long-term latency is averaged.
+        short_window: Number of samples over which short-term latency is averaged.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 20,
+        min_limit: float = 1,
+        max_limit: float = 1000,
+        smoothing: float = 0.2,
+        tolerance: float = 1.5,
+        long_window: int = 600,
+        short_window: int = 10,
+    ) -> None:
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.long_window = long_window
+        self.short_window = short_window
+        self.long_latency = math.nan
+        self.short_latency = math.nan
+
+    def update(self, latency: float, in_flight: int) -> None:
+        if math.isnan(self.long_latency):
+            self.long_latency = self.short_latency = latency
+            return
+        self.short_latency += (latency - self.short_latency) / self.short_window
+        self.long_latency += (latency - self.long_latency) / self.long_window
+        # Long-term latency recovers quickly once load drops, else limit would stay high after a latency increase
+        if self.long_latency > self.short_latency * 2:
+            self.long_latency *= 0.95
+        # Limit is only updated when it is actually used, else it would grow without bounds while idle
+        if in_flight * 2 < self.limit:
+            return
+        gradient = max(
+            0.5,
+            min(1.0, self.tolerance * self.long_latency / (self.short_latency or 1e-9)),
+        )
+        estimate = self.limit * gradient + math.sqrt(self.limit)
+        self.limit = min(
+            max(
+                self.limit * (1 - self.smoothing) + estimate * self.smoothing,
+                self.min_limit,
+            ),
+            self.max_limit,
+        )
+
+
+class ConcurrencyLimiter:
+    """Admit or shed requests according to an adaptive limit and request priority.
+
+    Arguments:
+        algorithm: Algorithm used to estimate limit.
+        low_priority_ratio: Fraction of the limit available to low priority requests.
+    """
+
+    def __init__(
+        self, algorithm: LimitAlgorithm, low_priority_ratio: float = 0.5
+    ) -> None:
+        self.algorithm = algorithm
+        self.low_priority_ratio = low_priority_ratio
+        self.in_flight = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self.algorithm.limit)
+
+    def try_acquire(self, priority: Priority = "normal") -> bool:
+        """Return True and count request as in flight when request is admitted, else return False"""
+        if priority != "critical":
+            limit = self.algorithm.limit
+            if priority == "low":
+                limit *= self.low_priority_ratio
+            if self.in_flight >= max(int(limit), 1):
+                return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: typing.Optional[float]) -> None:
+        """Release an admitted request. Latency (in seconds) is used to update limit unless it is None."""
+        if latency is not None:
+            self.algorithm.update(latency, self.in_flight)
+        self.in_flight -= 1
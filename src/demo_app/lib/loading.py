@@ -0,0 +1,109 @@
+"""This module tracks progress of a database load running in the background.
+
+A load goes through the following states:
+
+- "reading": Dump is read from file in chunks, so that progress can be reported.
+- "parsing": Dump is parsed and employees are indexed.
+- "warming": Responses of frequently requested routes are computed and cached.
+- "ready": Database is available to requests.
+- "failed": Database could not be loaded. Error is available in `error` attribute.
+"""
+from __future__ import annotations
+
+import json
+import pathlib
+import time
+import typing
+
+from .models import EmployeeInDB
+
+LoadState = typing.Literal["reading", "parsing", "warming", "ready", "failed"]
+
+# Size of chunks read from database dump
+CHUNK_SIZE = 1024 * 1024
+
+
+class LoadProgress:
+    """Progress of a database load.
+
+    Attributes are written by the loading thread and read by the event loop. Each of them is replaced
+    atomically, so no lock is needed.
+
+    Arguments:
+        clock: Function returning current time in seconds.
+    """
+
+    def __init__(self, clock: typing.Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self.state: LoadState = "reading"
+        self.bytes_read = 0
+        self.bytes_total = 0
+        self.records = 0
+        self.error: typing.Optional[str] = None
+        self.started = clock()
+        self.finished: typing.Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    @property
+    def elapsed(self) -> float:
+        """Duration of the load (in seconds), so far if it is not finished"""
+        end = self.clock() if self.finished is None else self.finished
+        return end - self.started
+
+    def advance(self, state: LoadState) -> None:
+        self.state = state
+        if state in ("ready", "failed"):
+            self.finished = self.clock()
+
+    def fail(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+        self.advance("failed")
+
+    def summary(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "state": self.state,
+            "bytes_read": self.bytes_read,
+            "bytes_total": self.bytes_total,
+            "progress": self.bytes_read / self.bytes_total if self.bytes_total else 0,
+            "records": self.records,
+            "elapsed": self.elapsed,
+            "error": self.error,
+        }
+
+
+def read_with_progress(
+    path: typing.Union[str, pathlib.Path],
+    progress: LoadProgress,
+    chunk_size: int = CHUNK_SIZE,
+) -> bytes:
+    """Read a file in chunks, reporting the number of bytes read so far"""
+    path = pathlib.Path(path)
+    progress.bytes_total = path.stat().st_size
+    chunks: typing.List[bytes] = []
+    with open(path, "rb") as dump:
+        while True:
+            chunk = dump.read(chunk_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            progress.bytes_read += len(chunk)
+    return b"".join(chunks)
+
+
+def parse_with_progress(
+    raw: bytes, progress: LoadProgress
+) -> typing.List[EmployeeInDB]:
+    """Parse a dump, reporting the number of employees parsed so far.
+
+    The dump is decoded using a single `json.loads` call, which holds the GIL until the whole dump is decoded,
+    so requests wait for it. Employees are then validated one at a time rather than as a single list,
+    so that progress is reported and the event loop gets the GIL back between employees.
+    """
+    employees: typing.List[EmployeeInDB] = []
+    for record in json.loads(raw):
+        employees.append(EmployeeInDB.parse_obj(record))
+        progress.records = len(employees)
+    return employees
@@ -0,0 +1,346 @@
+"""This module provides offline maintenance of database dumps.
+
+Dumps are streamed: records are decoded one at a time out of a bounded buffer, so a dump is never read at once.
+Both JSON arrays (the format written by `EmployeeDatabase.save`) and JSON lines are supported.
+
+Decoded records are validated in chunks, within a pool of processes, so that validation scales with the number
+of cores. Chunks are processed in order, and at most a few chunks per worker are pending at any time,
+so memory does not grow with the size of the dump unless validated employees are kept.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses
+import json
+import pathlib
+import re
+import time
+import typing
+
+import pydantic
+
+from .columnar import to_columns
+from .executors import ExecutorPool
+from .models import EmployeeInDB
+
+DumpFormat = typing.Literal["json", "jsonl"]
+# What is returned for valid records: nothing, employees, employees serialized as JSON, or columns of employees
+ChunkOutput = typing.Literal["none", "employees", "json", "columns"]
+
+# Size of blocks read from dumps
+READ_SIZE = 1024 * 1024
+# Number of records validated at once by a worker
+CHUNK_SIZE = 5000
+# Maximum number of errors kept in reports
+MAX_ERRORS = 20
+
+_SEPARATORS = re.compile(r"[\s,]*")
+_WHITESPACES = re.compile(r"\s*")
+
+
+class DumpFormatError(ValueError):
+    """A class raised when a dump is neither a JSON array nor JSON lines"""
+
+    pass
+
+
+def detect_format(path: typing.Union[str, pathlib.Path]) -> DumpFormat:
+    """Detect format of a dump out of its first character"""
+    with open(path, "r", encoding="utf-8") as dump:
+        while True:
+            char = dump.read(1)
+            if not char:
+                # Empty files are considered empty JSON lines
+                return "jsonl"
+            if not char.isspace():
+                break
+    if char == "[":
+        return "json"
+    if char == "{":
+        return "jsonl"
+    raise DumpFormatError(f"Unexpected character at start of dump: {char!r}")
+
+
+def iter_records(
+    path: typing.Union[str, pathlib.Path], read_size: int = READ_SIZE
+) -> typing.Iterator[typing.Any]:
+    """Decode records of a dump one at a time, without reading the whole dump.
+
+    Raises:
+        DumpFormatError: When dump is neither a JSON array nor JSON lines
+        json.JSONDecodeError: When a record is not valid JSON
+    """
+    array = detect_format(path) == "json"
+    separators = _SEPARATORS if array else _WHITESPACES
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as dump:
+        if array:
+            # Skip opening bracket, which is the first character after whitespaces
+            while dump.read(1) != "[":
+                pass
+        buffer = dump.read(read_size)
+        eof = not buffer
+        pos = 0
+        while True:
+            pos = separators.match(buffer, pos).end()  # type: ignore[union-attr]
+            # Keep enough data in buffer to decode next record
+            if pos >= len(buffer) - 1 and not eof:
+                more = dump.read(read_size)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            if pos >= len(buffer):
+                if array:
+                    raise DumpFormatError("Dump ends before closing bracket")
+                return
+            if array and buffer[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                # A record ending with the buffer may be a truncated number
+                truncated = end == len(buffer) and not eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                truncated = True
+            if truncated:
+                more = dump.read(read_size)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield record
+            pos = end
+            # Drop records already decoded from buffer
+            if pos > read_size:
+                buffer, pos = buffer[pos:], 0
+
+
+class DumpWriter:
+    """Write serialized employees to a dump, as a JSON array or as JSON lines"""
+
+    def __init__(
+        self, path: typing.Union[str, pathlib.Path], format: DumpFormat = "json"
+    ) -> None:
+        self.path = pathlib.Path(path)
+        self.format = format
+        self.count = 0
+        self._file: typing.Optional[typing.TextIO] = None
+
+    def __enter__(self) -> DumpWriter:
+        self._file = open(self.path, "w", encoding="utf-8")
+        if self.format == "json":
+            self._file.write("[")
+        return self
+
+    def write(self, records: typing.Iterable[str]) -> None:
+        assert self._file is not None
+        for record in records:
+            if self.format == "jsonl":
+                self._file.write(record)
+                self._file.write("\n")
+            else:
+                if self.count:
+                    self._file.write(", ")
+                self._file.write(record)
+            self.count += 1
+
+    def __exit__(self, *args: typing.Any) -> None:
+        assert self._file is not None
+        if self.format == "json":
+            self._file.write("]")
+        self._file.close()
+        self._file = None
+
+
+@dataclasses.dataclass
+class ChunkResult:
+    """Outcome of the validation of a chunk of records"""
+
+    # Index of first record of chunk within dump
+    offset: int
+    count: int
+    ids: typing.List[str]
+    # Index of invalid records within dump, and why they are invalid
+    errors: typing.List[typing.Tuple[int, str]]
+    # Valid employees, either as models or serialized, according to requested output
+    employees: typing.List[EmployeeInDB]
+    serialized: typing.List[str]
+    columns: typing.Dict[str, typing.List[typing.Any]]
+    teams: typing.Counter[str]
+    lastnames: typing.Set[str]
+    # Number of valid records setting each optional field
+    fields: typing.Counter[str]
+
+
+def _describe(error: pydantic.ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+def validate_chunk(
+    records: typing.List[typing.Any], offset: int, output: ChunkOutput = "none"
+) -> ChunkResult:
+    """Validate records as employees. Runs within worker processes."""
+    result = ChunkResult(
+        offset,
+        len(records),
+        [],
+        [],
+        [],
+        [],
+        {},
+        collections.Counter(),
+        set(),
+        collections.Counter(),
+    )
+    for index, record in enumerate(records, offset):
+        try:
+            employee = EmployeeInDB.parse_obj(record)
+        except pydantic.ValidationError as err:
+            result.errors.append((index, _describe(err)))
+            continue
+        result.ids.append(employee.id)
+        result.teams[employee.team] += 1
+        result.lastnames.add(employee.lastname)
+        result.fields.update(
+            field
+            for field in ("age", "favorite_animal", "hobby")
+            if getattr(employee, field) is not None
+        )
+        if output in ("employees", "columns"):
+            result.employees.append(employee)
+        elif output == "json":
+            # Same serialization as `EmployeeDatabase.json`
+            result.serialized.append(employee.json(exclude_unset=True))
+    if output == "columns":
+        # Columns are smaller than employees to send back from workers
+        result.columns, result.employees = to_columns(result.employees), []
+    return result
+
+
+def iter_chunks(
+    records: typing.Iterable[typing.Any], chunk_size: int
+) -> typing.Iterator[typing.Tuple[int, typing.List[typing.Any]]]:
+    """Group records in lists of given size, along with the index of their first record"""
+    chunk: typing.List[typing.Any] = []
+    offset = 0
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield offset, chunk
+            offset += len(chunk)
+            chunk = []
+    if chunk:
+        yield offset, chunk
+
+
+async def validate_records(
+    records: typing.Iterable[typing.Any],
+    pool: typing.Optional[ExecutorPool],
+    output: ChunkOutput = "none",
+    chunk_size: int = CHUNK_SIZE,
+) -> typing.AsyncIterator[ChunkResult]:
+    """Validate records in chunks within a pool, yielding results in order.
+
+    Records are validated within the running process when pool is None.
+    """
+    if pool is None:
+        for offset, chunk in iter_chunks(records, chunk_size):
+            yield validate_chunk(chunk, offset, output)
+        return
+    # Keep workers busy while chunks are read, without reading the whole dump ahead
+    max_pending = 2 * pool.max_workers
+    pending: typing.Deque[asyncio.Future[ChunkResult]] = collections.deque()
+    try:
+        for offset, chunk in iter_chunks(records, chunk_size):
+            pending.append(
+                asyncio.wrap_future(pool.submit(validate_chunk, chunk, offset, output))
+            )
+            if len(pending) >= max_pending:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+@dataclasses.dataclass
+class DumpReport:
+    """Summary of the validation of a dump"""
+
+    path: str
+    format: DumpFormat
+    bytes: int = 0
+    records: int = 0
+    valid: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    duration: float = 0
+    errors: typing.List[str] = dataclasses.field(default_factory=list)
+    teams: typing.Counter[str] = dataclasses.field(default_factory=collections.Counter)
+    lastnames: typing.Set[str] = dataclasses.field(default_factory=set)
+    fields: typing.Counter[str] = dataclasses.field(default_factory=collections.Counter)
+    _ids: typing.Set[str] = dataclasses.field(default_factory=set, repr=False)
+
+    def add(self, result: ChunkResult) -> None:
+        self.records += result.count
+        self.valid += len(result.ids)
+        self.invalid += len(result.errors)
+        for index, error in result.errors:
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append(f"Record {index}: {error}")
+        for id in result.ids:
+            if id in self._ids:
+                self.duplicates += 1
+            else:
+                self._ids.add(id)
+        self.teams.update(result.teams)
+        self.lastnames.update(result.lastnames)
+        self.fields.update(result.fields)
+
+    def summary(self, stats: bool = False) -> typing.Dict[str, typing.Any]:
+        summary: typing.Dict[str, typing.Any] = {
+            "path": self.path,
+            "format": self.format,
+            "bytes": self.bytes,
+            "records": self.records,
+            "valid": self.valid,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "duration": self.duration,
+            "records_per_second": self.records / self.duration if self.duration else 0,
+            "mb_per_second": self.bytes / 1e6 / self.duration if self.duration else 0,
+            "errors": self.errors,
+        }
+        if stats:
+            summary["distinct_ids"] = len(self._ids)
+            summary["distinct_lastnames"] = len(self.lastnames)
+            summary["teams"] = dict(self.teams.most_common())
+            summary["fields_fill_ratio"] = {
+                field: self.fields[field] / self.valid if self.valid else 0
+                for field in ("age", "favorite_animal", "hobby")
+            }
+        return summary
+
+
+async def scan_dump(
+    path: typing.Union[str, pathlib.Path],
+    pool: typing.Optional[ExecutorPool],
+    output: ChunkOutput = "none",
+    chunk_size: int = CHUNK_SIZE,
+    on_chunk: typing.Optional[typing.Callable[[ChunkResult], None]] = None,
+) -> DumpReport:
+    """Validate all records of a dump, calling `on_chunk` with the result of each chunk, in order"""
+    path = pathlib.Path(path)
+    report = DumpReport(path.as_posix(), detect_format(path), path.stat().st_size)
+    started = time.perf_counter()
+    async for result in validate_records(iter_records(path), pool, output, chunk_size):
+        report.add(result)
+        if on_chunk is not None:
+            on_chunk(result)
+    report.duration = time.perf_counter() - started
+    return report
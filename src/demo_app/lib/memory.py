@@ -0,0 +1,246 @@
+"""This module provides helpers to investigate memory usage of a running process.
+
+- `MemoryProfiler` wraps `tracemalloc`: it starts and stops tracing, keeps a bounded number of named snapshots
+  and compares snapshots to find where memory grows.
+
+- `database_summary` returns a cheap summary of objects held by an `EmployeeDatabase`. It does not traverse the heap,
+  sizes are estimated out of a sample of records.
+
+- `resident_memory` and `heap_stats` are cheap enough to be sampled periodically.
+"""
+from __future__ import annotations
+
+import collections
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import typing
+
+from .database import EmployeeDatabase
+from .models import EmployeeInDB
+
+# Allocations performed by tracemalloc itself or by the import system are not relevant
+_IGNORED_TRACES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def resident_memory() -> typing.Optional[int]:
+    """Resident set size (in bytes) of current process.
+
+    It is read from `/proc/self/statm` on Linux. On other platforms, the peak resident set size is returned,
+    since current resident set size is not available without third-party dependencies.
+    None is returned when neither is available.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Peak is expressed in bytes on macOS, and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def heap_stats() -> typing.Dict[str, int]:
+    """Cheap statistics about Python heap, which do not require traversing objects"""
+    stats = {
+        "allocated_blocks": sys.getallocatedblocks(),
+        "gc_collections": sum(
+            generation["collections"] for generation in gc.get_stats()
+        ),
+        "gc_uncollectable": sum(
+            generation["uncollectable"] for generation in gc.get_stats()
+        ),
+    }
+    if tracemalloc.is_tracing():
+        stats["traced_bytes"] = tracemalloc.get_traced_memory()[0]
+    return stats
+
+
+class TracingNotStartedError(RuntimeError):
+    """Raised when a snapshot is requested while tracemalloc is not tracing"""
+
+
+class SnapshotNotFoundError(KeyError):
+    """Raised when a snapshot name is not known"""
+
+
+class MemoryProfiler:
+    """Start and stop `tracemalloc` and keep named snapshots.
+
+    Arguments:
+        max_snapshots: Maximum number of snapshots kept. Oldest snapshots are discarded first.
+    """
+
+    def __init__(self, max_snapshots: int = 10) -> None:
+        self.max_snapshots = max_snapshots
+        self.snapshots: typing.OrderedDict[
+            str, typing.Tuple[float, tracemalloc.Snapshot]
+        ] = collections.OrderedDict()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        """Start tracing memory allocations. Storing more frames per allocation costs more memory and CPU."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        """Stop tracing memory allocations. Snapshots already taken are kept."""
+        tracemalloc.stop()
+
+    def take_snapshot(self, name: str) -> tracemalloc.Snapshot:
+        """Take a snapshot and store it under given name, replacing existing snapshot with the same name
+
+        Raises:
+            TracingNotStartedError: When tracemalloc is not tracing
+        """
+        snapshot = self._take_snapshot()
+        self.snapshots.pop(name, None)
+        self.snapshots[name] = (time.time(), snapshot)
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+        return snapshot
+
+    def get_snapshot(self, name: str) -> tracemalloc.Snapshot:
+        """Get a snapshot by name
+
+        Raises:
+            SnapshotNotFoundError: When snapshot does not exist
+        """
+        try:
+            return self.snapshots[name][1]
+        except KeyError:
+            raise SnapshotNotFoundError(f"Snapshot not found: {name}")
+
+    def delete_snapshot(self, name: str) -> None:
+        """Delete a snapshot by name
+
+        Raises:
+            SnapshotNotFoundError: When snapshot does not exist
+        """
+        try:
+            del self.snapshots[name]
+        except KeyError:
+            raise SnapshotNotFoundError(f"Snapshot not found: {name}")
+
+    def diff(
+        self,
+        base: str,
+        target: typing.Optional[str] = None,
+        group_by: typing.Literal["filename", "lineno", "traceback"] = "lineno",
+        limit: int = 20,
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Return top allocation differences between two snapshots, largest growth first.
+
+        When target is not provided, base snapshot is compared to a new snapshot which is not stored.
+
+        Raises:
+            SnapshotNotFoundError: When a snapshot does not exist
+            TracingNotStartedError: When target is not provided and tracemalloc is not tracing
+        """
+        base_snapshot = self.get_snapshot(base)
+        target_snapshot = (
+            self.get_snapshot(target) if target is not None else self._take_snapshot()
+        )
+        stats = target_snapshot.compare_to(base_snapshot, group_by)
+        return [
+            {
+                "location": [
+                    f"{frame.filename}:{frame.lineno}"
+                    if group_by != "filename"
+                    else frame.filename
+                    for frame in stat.traceback
+                ],
+                "size": stat.size,
+                "size_diff": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:limit]
+        ]
+
+    def summary(self) -> typing.Dict[str, typing.Any]:
+        """Return tracing status and stored snapshots"""
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_memory": current,
+            "traced_memory_peak": peak,
+            "tracemalloc_overhead": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": [
+                {"name": name, "taken_at": taken_at, "traces": len(snapshot.traces)}
+                for name, (taken_at, snapshot) in self.snapshots.items()
+            ],
+        }
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise TracingNotStartedError(
+                "tracemalloc is not tracing memory allocations"
+            )
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED_TRACES)
+
+
+def estimate_size(employee: EmployeeInDB) -> int:
+    """Estimate the size in bytes of a single record, including its fields values"""
+    fields = employee.__dict__
+    return (
+        sys.getsizeof(employee)
+        + sys.getsizeof(fields)
+        + sum(sys.getsizeof(value) for value in fields.values())
+    )
+
+
+def database_summary(
+    database: EmployeeDatabase, sample_size: int = 100
+) -> typing.Dict[str, typing.Any]:
+    """Summarize objects held by a database without traversing the heap.
+
+    Records size is extrapolated from the first `sample_size` records.
+    """
+    count = len(database.employees)
+    sample = [
+        estimate_size(employee)
+        for _, employee in zip(range(sample_size), database.employees.values())
+    ]
+    record_size = sum(sample) / len(sample) if sample else 0
+    return {
+        "path": database.path.as_posix(),
+        "records": count,
+        "records_size_estimate": int(record_size * count),
+        "indexes": {
+            "id": {
+                "entries": count,
+                "size": sys.getsizeof(database.employees),
+            },
+        },
+    }
+
+
+def count_instances(
+    types: typing.Sequence[typing.Type[typing.Any]] = (EmployeeInDB,),
+) -> typing.Dict[str, int]:
+    """Count live instances of given types tracked by garbage collector.
+
+    This traverses all objects tracked by garbage collector, so its cost grows with heap size.
+    """
+    counts = {cls.__name__: 0 for cls in types}
+    for obj in gc.get_objects():
+        for cls in types:
+            if type(obj) is cls:
+                counts[cls.__name__] += 1
+    return counts
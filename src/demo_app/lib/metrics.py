@@ -0,0 +1,342 @@
+"""This module provides low overhead metrics which can be exposed using Prometheus text format.
+
+Metrics do not depend on any third-party library:
+
+- Histograms use preallocated fixed buckets, so recording a value is a binary search and two additions.
+
+- Counters and histograms keep one shard per thread. Recording a value never acquires a lock,
+  and shards are only merged when metrics are collected (I.E, on scrape).
+
+- When metrics are disabled, a `NullRegistry` can be used instead of a `MetricsRegistry`.
+  It returns no-op metrics so that instrumented code does not need to check whether metrics are enabled.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import typing
+
+# Default buckets (in seconds) are tuned for request latencies
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+M = typing.TypeVar("M", "Counter", "Gauge", "Histogram")
+
+
+class Counter:
+    """A monotonic counter"""
+
+    __slots__ = ("_shards",)
+
+    def __init__(self) -> None:
+        self._shards: typing.Dict[int, typing.List[float]] = {}
+
+    def inc(self, amount: float = 1) -> None:
+        """Increment counter"""
+        try:
+            self._shards[threading.get_ident()][0] += amount
+        except KeyError:
+            # Each thread writes into its own shard, so there is no need for a lock
+            self._shards[threading.get_ident()] = [amount]
+
+    @property
+    def value(self) -> float:
+        """Merge all shards to get counter value"""
+        return sum(shard[0] for shard in list(self._shards.values()))
+
+    def samples(self, name: str) -> typing.Iterator[typing.Tuple[str, str, float]]:
+        yield name, "", self.value
+
+
+class Gauge:
+    """A value which can go up and down.
+
+    Gauges are not sharded, they must be updated from a single thread (usually the event loop thread).
+    Alternatively, a function can be used to compute gauge value on collection.
+    """
+
+    __slots__ = ("_value", "_function")
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._function: typing.Optional[typing.Callable[[], float]] = None
+
+    def inc(self, amount: float = 1) -> None:
+        self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, function: typing.Callable[[], float]) -> None:
+        """Compute gauge value using function each time metrics are collected"""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+    def samples(self, name: str) -> typing.Iterator[typing.Tuple[str, str, float]]:
+        yield name, "", self.value
+
+
+class Histogram:
+    """Count observed values into preallocated fixed buckets.
+
+    Each shard is a list holding one counter per bucket (including the +Inf bucket), followed by the sum of observed values.
+    """
+
+    __slots__ = ("bounds", "_size", "_shards")
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = tuple(sorted(buckets))
+        self._size = len(self.bounds) + 2
+        self._shards: typing.Dict[int, typing.List[float]] = {}
+
+    def observe(self, value: float) -> None:
+        """Record a value"""
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            shard = self._shards[ident] = [0] * self._size
+        # Prometheus buckets are inclusive upper bounds
+        shard[bisect.bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> typing.Tuple[typing.List[float], float]:
+        """Merge all shards. Return non-cumulative bucket counts and sum of observed values."""
+        merged = [0.0] * self._size
+        for shard in list(self._shards.values()):
+            for idx, value in enumerate(shard):
+                merged[idx] += value
+        return merged[:-1], merged[-1]
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile using linear interpolation within buckets"""
+        counts, _ = self.snapshot()
+        total = sum(counts)
+        if not total:
+            return math.nan
+        rank = q * total
+        cumulative = 0.0
+        for idx, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.bounds[idx - 1] if idx else 0.0
+                if idx == len(self.bounds):
+                    return lower
+                upper = self.bounds[idx]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.bounds[-1]
+
+    def samples(self, name: str) -> typing.Iterator[typing.Tuple[str, str, float]]:
+        counts, total = self.snapshot()
+        cumulative = 0.0
+        for bound, count in zip(self.bounds, counts):
+            cumulative += count
+            yield f"{name}_bucket", f'le="{_format_value(bound)}"', cumulative
+        cumulative += counts[-1]
+        yield f"{name}_bucket", 'le="+Inf"', cumulative
+        yield f"{name}_sum", "", total
+        yield f"{name}_count", "", cumulative
+
+
+class MetricFamily(typing.Generic[M]):
+    """A group of metrics sharing the same name and label names, but different label values"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        labelnames: typing.Sequence[str],
+        factory: typing.Callable[[], M],
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory: typing.Callable[[], M] = factory
+        self._children: typing.Dict[typing.Tuple[str, ...], M] = {}
+
+    def labels(self, *values: str) -> M:
+        """Get metric for given label values. Metric is created on first access."""
+        try:
+            return self._children[values]
+        except KeyError:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"Expected {len(self.labelnames)} label values for metric {self.name}, got {len(values)}"
+                )
+            child = self._children.setdefault(values, self._factory())
+            return child
+
+    def collect(self) -> typing.Iterator[str]:
+        """Yield lines in Prometheus text format"""
+        yield f"# HELP {self.name} {_escape_help(self.documentation)}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in list(self._children.items()):
+            labels = ",".join(
+                f'{name}="{_escape_label(value)}"'
+                for name, value in zip(self.labelnames, values)
+            )
+            for name, extra_label, value in child.samples(self.name):
+                all_labels = ",".join(label for label in (labels, extra_label) if label)
+                if all_labels:
+                    yield f"{name}{{{all_labels}}} {_format_value(value)}"
+                else:
+                    yield f"{name} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Create and collect metrics.
+
+    Registering a metric twice with the same name returns the existing metric family.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self._families: typing.Dict[str, MetricFamily[typing.Any]] = {}
+
+    def counter(
+        self, name: str, documentation: str, labelnames: typing.Sequence[str] = ()
+    ) -> MetricFamily[Counter]:
+        return self._register(name, documentation, "counter", labelnames, Counter)
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: typing.Sequence[str] = ()
+    ) -> MetricFamily[Gauge]:
+        return self._register(name, documentation, "gauge", labelnames, Gauge)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = DEFAULT_BUCKETS,
+    ) -> MetricFamily[Histogram]:
+        return self._register(
+            name, documentation, "histogram", labelnames, lambda: Histogram(buckets)
+        )
+
+    def render(self) -> str:
+        """Render all metrics using Prometheus text format"""
+        lines: typing.List[str] = []
+        for family in list(self._families.values()):
+            lines.extend(family.collect())
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def _register(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        labelnames: typing.Sequence[str],
+        factory: typing.Callable[[], M],
+    ) -> MetricFamily[M]:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = MetricFamily(
+                name, documentation, kind, labelnames, factory
+            )
+        elif family.kind != kind or family.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered with another type")
+        return family
+
+
+class _NullMetric:
+    """A metric which does nothing. It can be used as a counter, a gauge or an histogram."""
+
+    __slots__ = ()
+
+    value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def set_function(self, function: typing.Callable[[], float]) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def quantile(self, q: float) -> float:
+        return math.nan
+
+    def samples(self, name: str) -> typing.Iterator[typing.Tuple[str, str, float]]:
+        return iter(())
+
+
+_NULL_METRIC = _NullMetric()
+
+
+class _NullFamily(MetricFamily[typing.Any]):
+    def labels(self, *values: str) -> typing.Any:
+        return _NULL_METRIC
+
+    def collect(self) -> typing.Iterator[str]:
+        return iter(())
+
+
+class NullRegistry(MetricsRegistry):
+    """A registry used when metrics are disabled. All metrics are no-op."""
+
+    enabled = False
+
+    def _register(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        labelnames: typing.Sequence[str],
+        factory: typing.Callable[[], M],
+    ) -> MetricFamily[M]:
+        return _NullFamily(name, documentation, kind, labelnames, factory)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n")
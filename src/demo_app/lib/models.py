@@ -26,6 +26,8 @@ class EmployeeFormUpdate(EmployeeOptionalData):
 
 class EmployeeInDB(EmployeeFormCreate, allow_population_by_field_name=True):
     id: str = Field(..., alias="_id")
+    # Incremented by database each time employee is updated
+    version: int = 1
 
 
 class EmployeeDump(BaseModel):
@@ -0,0 +1,178 @@
+"""This module provides a statistical profiler which samples stacks of all running threads.
+
+Sampling is performed from a dedicated thread using `sys._current_frames()`, so no signal handler is installed
+and profiled code does not need to be modified.
+
+Overhead is bounded: the sampler never spends more than `max_overhead` of its time taking samples.
+When taking a sample gets too expensive (E.G, many threads with deep stacks), sampling interval grows accordingly.
+
+Only one profile can run at a time within a process.
+"""
+from __future__ import annotations
+
+import collections
+import sys
+import threading
+import time
+import types
+import typing
+
+# Frames are identified by function name, file name and first line number of the function
+FrameKey = typing.Tuple[str, str, int]
+
+_PROFILE_LOCK = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another profile is running"""
+
+
+class Profile:
+    """Stacks sampled during a profile.
+
+    Samples are aggregated: identical stacks from the same thread are only stored once along with a count.
+    Stacks are stored from root frame to leaf frame.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.duration = 0.0
+        self.sampling_time = 0.0
+        self.sample_count = 0
+        self.stacks: typing.Counter[
+            typing.Tuple[str, typing.Tuple[FrameKey, ...]]
+        ] = collections.Counter()
+
+    @property
+    def effective_interval(self) -> float:
+        """Average interval between two samples, which is larger than requested interval when sampling is expensive"""
+        return self.duration / self.sample_count if self.sample_count else self.interval
+
+    @property
+    def overhead(self) -> float:
+        """Fraction of profile duration spent taking samples"""
+        return self.sampling_time / self.duration if self.duration else 0.0
+
+    def collapsed(self) -> str:
+        """Render profile using collapsed stacks format (one line per stack, frames separated by semicolons).
+
+        This format is understood by flamegraph.pl, inferno and speedscope.
+        """
+        lines = [
+            ";".join([thread, *(_frame_label(frame) for frame in stack)]) + f" {count}"
+            for (thread, stack), count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def speedscope(self, name: str = "profile") -> typing.Dict[str, typing.Any]:
+        """Render profile using speedscope file format, with one sampled profile per thread.
+
+        See: https://github.com/jlfwong/speedscope/wiki/Importing-from-custom-sources
+        """
+        interval = self.effective_interval
+        frame_indexes: typing.Dict[FrameKey, int] = {}
+        frames: typing.List[typing.Dict[str, typing.Any]] = []
+        profiles: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        for (thread, stack), count in self.stacks.items():
+            profile = profiles.get(thread)
+            if profile is None:
+                profile = profiles[thread] = {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": 0,
+                    "samples": [],
+                    "weights": [],
+                }
+            indexes = []
+            for frame in stack:
+                index = frame_indexes.get(frame)
+                if index is None:
+                    index = frame_indexes[frame] = len(frames)
+                    frames.append(
+                        {"name": frame[0], "file": frame[1], "line": frame[2]}
+                    )
+                indexes.append(index)
+            weight = count * interval
+            profile["samples"].append(indexes)
+            profile["weights"].append(weight)
+            profile["endValue"] += weight
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "demo_app",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": list(profiles.values()),
+        }
+
+
+class StackSampler:
+    """Sample stacks of all threads (except the sampling thread itself) at a fixed interval.
+
+    Arguments:
+        interval: Interval (in seconds) between two samples.
+        max_overhead: Maximum fraction of time spent taking samples.
+        max_depth: Maximum number of frames kept per stack. Frames closest to the root are dropped first.
+    """
+
+    def __init__(
+        self, interval: float = 0.01, max_overhead: float = 0.1, max_depth: int = 128
+    ) -> None:
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+
+    def run(self, seconds: float) -> Profile:
+        """Sample stacks during given duration. This function blocks, it should run in a dedicated thread.
+
+        Raises:
+            ProfilerBusyError: When another profile is running.
+        """
+        if not _PROFILE_LOCK.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            return self._run(seconds)
+        finally:
+            _PROFILE_LOCK.release()
+
+    def _run(self, seconds: float) -> Profile:
+        profile = Profile(self.interval)
+        sampler_id = threading.get_ident()
+        start = time.perf_counter()
+        deadline = start + seconds
+        while True:
+            sample_start = time.perf_counter()
+            if sample_start >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+                thread = names.get(thread_id, f"Thread-{thread_id}")
+                profile.stacks[(thread, self._stack(frame))] += 1
+            profile.sample_count += 1
+            cost = time.perf_counter() - sample_start
+            profile.sampling_time += cost
+            # Wait longer when sampling is expensive, so that overhead stays bounded
+            wait = max(self.interval - cost, cost / self.max_overhead - cost)
+            time.sleep(max(min(wait, deadline - time.perf_counter()), 0))
+        profile.duration = time.perf_counter() - start
+        return profile
+
+    def _stack(
+        self, frame: typing.Optional[types.FrameType]
+    ) -> typing.Tuple[FrameKey, ...]:
+        stack: typing.List[FrameKey] = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+
+def _frame_label(frame: FrameKey) -> str:
+    name, filename, line = frame
+    return f"{name} ({filename}:{line})"
@@ -0,0 +1,174 @@
+"""This module provides a scheduler running periodic jobs out of a single timer heap.
+
+Jobs are kept in a heap ordered by due time. A single coroutine sleeps until the earliest job is due,
+so the number of scheduled jobs does not increase the number of sleeping coroutines.
+
+Each run executes in its own asyncio task, so that a slow job does not delay other jobs.
+A job never runs concurrently with itself: its next run is scheduled once the current run completes.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import random
+import time
+import typing
+
+
+class TaskStats:
+    """Runtime statistics of a task or a job"""
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.failures = 0
+        # Reset each time a run succeeds
+        self.consecutive_failures = 0
+        self.restarts = 0
+        self.last_duration: typing.Optional[float] = None
+        self.last_error: typing.Optional[str] = None
+
+    def record(self, duration: float, error: typing.Optional[BaseException]) -> None:
+        """Record a completed run"""
+        self.runs += 1
+        self.last_duration = duration
+        if error is None:
+            self.consecutive_failures = 0
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+
+    def summary(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "restarts": self.restarts,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+        }
+
+
+class Job:
+    """A coroutine function called at a fixed interval.
+
+    Arguments:
+        function: Coroutine function called without argument on each run.
+        interval: Delay (in seconds) between the end of a run and the start of the next one.
+        name: Name of the job.
+        jitter: Fraction of interval by which each delay is randomly shortened or extended,
+            so that jobs scheduled at the same time do not keep running at the same time.
+    """
+
+    def __init__(
+        self,
+        function: typing.Callable[[], typing.Awaitable[typing.Any]],
+        interval: float,
+        name: str,
+        jitter: float = 0.1,
+    ) -> None:
+        self.function = function
+        self.interval = interval
+        self.name = name
+        self.jitter = jitter
+        self.stats = TaskStats()
+        # Due time of next run, None while job is running or not scheduled
+        self.next_run: typing.Optional[float] = None
+        self.running: typing.Optional[asyncio.Task[None]] = None
+
+    def delay(self) -> float:
+        """Delay before next run"""
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class Scheduler:
+    """Run periodic jobs from a single coroutine.
+
+    The coroutine is started when the first job is added, and stopped when the last job is removed.
+
+    Arguments:
+        clock: Function returning current time in seconds. Must be consistent with event loop time.
+    """
+
+    def __init__(self, clock: typing.Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self.jobs: typing.Set[Job] = set()
+        self._heap: typing.List[typing.Tuple[float, int, Job]] = []
+        self._counter = itertools.count()
+        self._wakeup: typing.Optional[asyncio.Event] = None
+        self._task: typing.Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def add(self, job: Job, delay: float = 0) -> None:
+        """Schedule a job to run after given delay (in seconds), then periodically"""
+        if job in self.jobs:
+            return
+        self.jobs.add(job)
+        self._push(job, delay)
+        if self._task is None or self._wakeup is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        else:
+            self._wakeup.set()
+
+    async def remove(self, job: Job) -> None:
+        """Unschedule a job, cancelling its current run if any"""
+        self.jobs.discard(job)
+        job.next_run = None
+        running = job.running
+        if running is not None:
+            running.cancel()
+            await asyncio.wait([running])
+        if not self.jobs and self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            await asyncio.wait([task])
+
+    def _push(self, job: Job, delay: float) -> None:
+        job.next_run = self.clock() + delay
+        heapq.heappush(self._heap, (job.next_run, next(self._counter), job))
+
+    def _pop_due(self) -> typing.Tuple[typing.Optional[Job], typing.Optional[float]]:
+        """Pop the next due job, or return the delay until next job is due"""
+        while self._heap:
+            due, _, job = self._heap[0]
+            # Entries of removed jobs are discarded lazily
+            if job not in self.jobs or job.next_run != due:
+                heapq.heappop(self._heap)
+                continue
+            timeout = due - self.clock()
+            if timeout > 0:
+                return None, timeout
+            heapq.heappop(self._heap)
+            job.next_run = None
+            return job, None
+        return None, None
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            job, timeout = self._pop_due()
+            if job is not None:
+                job.running = asyncio.create_task(self._execute(job))
+                continue
+            self._wakeup.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+
+    async def _execute(self, job: Job) -> None:
+        started = self.clock()
+        error: typing.Optional[BaseException] = None
+        try:
+            await job.function()
+        except Exception as exc:
+            error = exc
+        finally:
+            job.running = None
+        job.stats.record(self.clock() - started, error)
+        if job in self.jobs:
+            self._push(job, job.delay())
+            if self._wakeup is not None:
+                self._wakeup.set()
@@ -0,0 +1,31 @@
+"""This module selects the event loop and the HTTP parser used by uvicorn.
+
+uvloop and httptools are faster than asyncio and h11, but they are optional dependencies
+(see the "speedups" extra). When either is requested but not installed, the standard implementation is used instead.
+"""
+from __future__ import annotations
+
+import importlib.util
+import typing
+
+LoopSetting = typing.Literal["auto", "asyncio", "uvloop"]
+HTTPSetting = typing.Literal["auto", "h11", "httptools"]
+
+
+def is_installed(module: str) -> bool:
+    """Return True when module can be imported"""
+    return importlib.util.find_spec(module) is not None
+
+
+def select_loop(requested: LoopSetting) -> typing.Literal["asyncio", "uvloop"]:
+    """Select uvloop when it is requested (or when selection is automatic) and installed, else asyncio"""
+    if requested != "asyncio" and is_installed("uvloop"):
+        return "uvloop"
+    return "asyncio"
+
+
+def select_http(requested: HTTPSetting) -> typing.Literal["h11", "httptools"]:
+    """Select httptools when it is requested (or when selection is automatic) and installed, else h11"""
+    if requested != "h11" and is_installed("httptools"):
+        return "httptools"
+    return "h11"
@@ -0,0 +1,66 @@
+"""This module provides a way to share a single in-flight computation between concurrent callers.
+
+The first caller using a key starts the computation in a new task, and callers using the same key
+while computation is in flight wait for the same task. Once computation is done, key is forgotten:
+results are never cached, the next caller starts a new computation.
+
+Cancelling a caller never cancels the computation while other callers are waiting for it.
+Computation is cancelled once all callers are cancelled.
+"""
+from __future__ import annotations
+
+import asyncio
+import typing
+
+T = typing.TypeVar("T")
+
+
+class _Call(typing.Generic[T]):
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future[T]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(typing.Generic[T]):
+    """Deduplicate concurrent computations sharing the same key"""
+
+    def __init__(self) -> None:
+        self._calls: typing.Dict[typing.Hashable, _Call[T]] = {}
+
+    def __len__(self) -> int:
+        """Number of computations in flight"""
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: typing.Hashable,
+        func: typing.Callable[[], typing.Awaitable[T]],
+    ) -> typing.Tuple[T, bool]:
+        """Return result of computation and whether it was shared with another caller.
+
+        Exceptions raised by computation are raised to all callers.
+        """
+        call = self._calls.get(key)
+        # A cancelled computation is never joined, even when its key is not forgotten yet
+        if call is not None and call.task.cancelled():
+            call = None
+        shared = call is not None
+        if call is None:
+            new_call = call = self._calls[key] = _Call(asyncio.ensure_future(func()))
+            call.task.add_done_callback(lambda _: self._forget(key, new_call))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # Key is forgotten right away, so that callers arriving before task completes start a new computation
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: typing.Hashable, call: _Call[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
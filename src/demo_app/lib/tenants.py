@@ -0,0 +1,189 @@
+"""This module provides a registry of employee databases, one per tenant.
+
+Each tenant has its own dump in a common directory (E.G, "<directory>/<tenant>.json").
+Databases are opened on first use, in an executor so that loading a large dump does not block the event loop.
+Concurrent first accesses to the same tenant share a single load.
+
+Open databases are kept in least recently used order, and are closed when either the number of open databases
+or their estimated memory exceeds a limit, or when they were not used for a while.
+Modifications which are not saved yet are written to file, in an executor, when a database is closed.
+A tenant is never opened again before its previous database is written.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import concurrent.futures
+import pathlib
+import re
+import time
+import typing
+
+from .database import EmployeeDatabase
+from .errors import TenantNotFoundError
+from .memory import database_summary
+from .singleflight import SingleFlight
+
+# Tenant names are used as file names, so they must not hold path separators
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+class _OpenDatabase:
+
+    __slots__ = ("database", "size", "last_used")
+
+    def __init__(self, database: EmployeeDatabase, size: int, last_used: float) -> None:
+        self.database = database
+        self.size = size
+        self.last_used = last_used
+
+
+def estimate_database_size(database: EmployeeDatabase) -> int:
+    """Estimate memory held by a database, out of a sample of its records"""
+    summary = database_summary(database)
+    return int(summary["records_size_estimate"]) + sum(
+        int(index["size"]) for index in summary["indexes"].values()
+    )
+
+
+class DatabaseRegistry:
+    """Open and cache databases of tenants.
+
+    Arguments:
+        directory: Directory holding one dump per tenant.
+        opener: Function creating a database out of a tenant name and a dump path. Called from an executor.
+        max_open: Maximum number of open databases.
+        max_bytes: Maximum estimated memory held by open databases. A single database may exceed it.
+        idle_timeout: Databases not used for this duration (in seconds) are closed by `close_idle`.
+        executor: Executor where databases are opened and saved. Event loop default executor is used when None.
+        clock: Function returning current time in seconds.
+    """
+
+    def __init__(
+        self,
+        directory: typing.Union[str, pathlib.Path],
+        opener: typing.Callable[[str, pathlib.Path], EmployeeDatabase],
+        max_open: int = 100,
+        max_bytes: int = 1024 * 1024 * 1024,
+        idle_timeout: float = 600,
+        executor: typing.Optional[concurrent.futures.Executor] = None,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.directory = pathlib.Path(directory)
+        self.opener = opener
+        self.max_open = max_open
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.executor = executor
+        self.clock = clock
+        self.size = 0
+        self._open: collections.OrderedDict[
+            str, _OpenDatabase
+        ] = collections.OrderedDict()
+        self._loads: SingleFlight[EmployeeDatabase] = SingleFlight()
+        # Saves of closed databases, by tenant
+        self._saves: typing.Dict[str, asyncio.Future[None]] = {}
+
+    def __len__(self) -> int:
+        """Number of open databases"""
+        return len(self._open)
+
+    def path(self, tenant: str) -> pathlib.Path:
+        """Path to the dump of a tenant
+
+        Raises:
+            TenantNotFoundError: When tenant name is not valid or tenant has no dump
+        """
+        if not TENANT_PATTERN.match(tenant):
+            raise TenantNotFoundError(f"Invalid tenant: {tenant!r}")
+        path = self.directory / f"{tenant}.json"
+        if not path.is_file():
+            raise TenantNotFoundError(f"No database found for tenant: {tenant!r}")
+        return path
+
+    def version(self, tenant: str) -> typing.Optional[int]:
+        """Version of an open database, or None when database is not open"""
+        entry = self._open.get(tenant)
+        return None if entry is None else entry.database.version
+
+    async def get(self, tenant: str) -> EmployeeDatabase:
+        """Get database of a tenant, opening it if needed
+
+        Raises:
+            TenantNotFoundError: When tenant name is not valid or tenant has no dump
+        """
+        entry = self._open.get(tenant)
+        if entry is not None:
+            entry.last_used = self.clock()
+            self._open.move_to_end(tenant)
+            return entry.database
+        database, _ = await self._loads.do(tenant, lambda: self._load(tenant))
+        return database
+
+    async def _load(self, tenant: str) -> EmployeeDatabase:
+        path = self.path(tenant)
+        loop = asyncio.get_running_loop()
+        # Dump must not be read while modifications of a closed database are written to it
+        save = self._saves.get(tenant)
+        if save is not None:
+            await asyncio.wait([save])
+        database = await loop.run_in_executor(self.executor, self.opener, tenant, path)
+        size = estimate_database_size(database)
+        self._open[tenant] = _OpenDatabase(database, size, self.clock())
+        self.size += size
+        # Least recently used databases are closed first, newly opened database is never closed
+        while len(self._open) > 1 and (
+            len(self._open) > self.max_open or self.size > self.max_bytes
+        ):
+            await self.close(next(iter(self._open)))
+        return database
+
+    async def close(self, tenant: str) -> None:
+        """Close database of a tenant, if it is open, and save its pending modifications without blocking the event loop"""
+        entry = self._open.pop(tenant, None)
+        if entry is None:
+            return
+        self.size -= entry.size
+        if not entry.database.dirty:
+            return
+        save = asyncio.get_running_loop().run_in_executor(
+            self.executor, entry.database.save
+        )
+        self._saves[tenant] = save
+        save.add_done_callback(lambda _: self._forget_save(tenant, save))
+        # Save completes even when caller is cancelled
+        await asyncio.shield(save)
+
+    def _forget_save(self, tenant: str, save: asyncio.Future[None]) -> None:
+        if self._saves.get(tenant) is save:
+            del self._saves[tenant]
+
+    async def close_idle(self) -> typing.List[str]:
+        """Close databases not used for longer than idle timeout. Return closed tenants."""
+        deadline = self.clock() - self.idle_timeout
+        idle = [
+            tenant
+            for tenant, entry in self._open.items()
+            if entry.last_used <= deadline
+        ]
+        for tenant in idle:
+            await self.close(tenant)
+        return idle
+
+    async def close_all(self) -> None:
+        for tenant in list(self._open):
+            await self.close(tenant)
+
+    def summary(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Describe open databases, from least to most recently used"""
+        now = self.clock()
+        return [
+            {
+                "tenant": tenant,
+                "records": len(entry.database.employees),
+                "size_estimate": entry.size,
+                "idle_seconds": now - entry.last_used,
+                "dirty": entry.database.dirty,
+            }
+            for tenant, entry in self._open.items()
+        ]
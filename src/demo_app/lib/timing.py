@@ -0,0 +1,134 @@
+"""This module provides a context-local timer used to break down request processing time into phases.
+
+A `RequestTimer` is attached to the current context when a request starts (see `demo_app.providers.timing`).
+Code measured using `timed(name)` reports into the timer of the current context, if any.
+
+When no timer is attached to the current context, `timed()` returns a no-op context manager,
+so that timing costs a single context variable lookup when it is disabled.
+"""
+from __future__ import annotations
+
+import contextvars
+import time
+import types
+import typing
+
+_current_timer: contextvars.ContextVar[
+    typing.Optional[RequestTimer]
+] = contextvars.ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    """Accumulate durations of named phases.
+
+    Phases with the same name are summed. A phase nested within a phase with the same name is ignored,
+    so that nested database operations are not counted twice.
+    """
+
+    __slots__ = ("start", "phases", "_active", "_lap")
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.phases: typing.Dict[str, float] = {}
+        self._active: typing.Set[str] = set()
+        self._lap = self.start
+
+    def record(self, name: str, duration: float) -> None:
+        """Add a duration (in seconds) to a phase"""
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def phase(self, name: str) -> typing.ContextManager[typing.Any]:
+        """Measure a phase using a context manager"""
+        if name in self._active:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def lap(self, name: str) -> None:
+        """Record time elapsed since last lap (or since timer started) under given phase name"""
+        now = time.perf_counter()
+        self.record(name, now - self._lap)
+        self._lap = now
+
+    def reset_lap(self) -> None:
+        """Start a new lap without recording anything"""
+        self._lap = time.perf_counter()
+
+    def server_timing(self) -> str:
+        """Format phases as a `Server-Timing` header value, durations are expressed in milliseconds.
+
+        Total duration since timer started is always included.
+        """
+        total = time.perf_counter() - self.start
+        return ", ".join(
+            f"{name};dur={duration * 1000:.3f}"
+            for name, duration in [*self.phases.items(), ("total", total)]
+        )
+
+
+class _Phase:
+
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: RequestTimer, name: str) -> None:
+        self.timer = timer
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> _Phase:
+        self.timer._active.add(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: typing.Optional[typing.Type[BaseException]] = None,
+        exc: typing.Optional[BaseException] = None,
+        tb: typing.Optional[types.TracebackType] = None,
+    ) -> None:
+        self.timer.record(self.name, time.perf_counter() - self.start)
+        self.timer._active.discard(self.name)
+
+
+class _NullPhase:
+
+    __slots__ = ()
+
+    def __enter__(self) -> _NullPhase:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: typing.Optional[typing.Type[BaseException]] = None,
+        exc: typing.Optional[BaseException] = None,
+        tb: typing.Optional[types.TracebackType] = None,
+    ) -> None:
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def current_timer() -> typing.Optional[RequestTimer]:
+    """Get the timer attached to current context, if any"""
+    return _current_timer.get()
+
+
+def start_timer() -> typing.Tuple[
+    RequestTimer, contextvars.Token[typing.Optional[RequestTimer]]
+]:
+    """Attach a new timer to current context. Token must be used to detach timer."""
+    timer = RequestTimer()
+    return timer, _current_timer.set(timer)
+
+
+def stop_timer(token: contextvars.Token[typing.Optional[RequestTimer]]) -> None:
+    """Detach timer from current context"""
+    _current_timer.reset(token)
+
+
+def timed(name: str) -> typing.ContextManager[typing.Any]:
+    """Measure a phase within the timer of current context. Does nothing when no timer is attached."""
+    timer = _current_timer.get()
+    if timer is None:
+        return _NULL_PHASE
+    return timer.phase(name)
@@ -0,0 +1,215 @@
+"""Samplers and span processors used by `openelemetry_traces_provider`.
+
+This module requires telemetry extras, it must only be imported when traces are enabled.
+
+Two sampling strategies are available:
+
+- Head sampling: a ratio of traces is sampled when root span starts, according to its route.
+  Spans which are not sampled are not recorded at all, which is the cheapest option.
+
+- Head sampling with errors and slow requests: spans which are not sampled are still recorded (but not exported).
+  Spans are buffered per trace until local root span ends. Trace is exported if root span failed or was too slow.
+  This costs more CPU than head sampling alone, but still saves the cost of exporting most spans.
+"""
+from __future__ import annotations
+
+import collections
+import threading
+import typing
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import Link, SpanContext, SpanKind, StatusCode, TraceFlags
+from opentelemetry.trace.span import TraceState
+from opentelemetry.util.types import Attributes
+
+
+class RouteRatioSampler(Sampler):
+    """Sample a ratio of root spans, with optional ratios per route.
+
+    Server spans created by FastAPI instrumentation are named after the route path (E.G, "/employees/{_id}").
+
+    Arguments:
+        ratio: Default sample ratio.
+        route_ratios: Sample ratios overriding default ratio, keyed by route path.
+        record_unsampled: Record spans which are not sampled instead of dropping them.
+    """
+
+    def __init__(
+        self,
+        ratio: float,
+        route_ratios: typing.Optional[typing.Dict[str, float]] = None,
+        record_unsampled: bool = False,
+    ) -> None:
+        self.default = TraceIdRatioBased(ratio)
+        self.routes = {
+            route: TraceIdRatioBased(route_ratio)
+            for route, route_ratio in (route_ratios or {}).items()
+        }
+        self.record_unsampled = record_unsampled
+
+    def should_sample(
+        self,
+        parent_context: typing.Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: typing.Optional[SpanKind] = None,
+        attributes: Attributes = None,
+        links: typing.Optional[typing.Sequence[Link]] = None,
+        trace_state: typing.Optional[TraceState] = None,
+    ) -> SamplingResult:
+        sampler = self.routes.get(name, self.default)
+        result = sampler.should_sample(
+            parent_context, trace_id, name, kind, attributes, links, trace_state  # type: ignore[arg-type]
+        )
+        if self.record_unsampled and result.decision == Decision.DROP:
+            return SamplingResult(Decision.RECORD_ONLY, attributes, trace_state)  # type: ignore[arg-type]
+        return result
+
+    def get_description(self) -> str:
+        return f"RouteRatioSampler{{{self.default.rate}, routes={len(self.routes)}}}"
+
+
+class RecordOnlySampler(Sampler):
+    """Record spans without sampling them"""
+
+    def should_sample(
+        self,
+        parent_context: typing.Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: typing.Optional[SpanKind] = None,
+        attributes: Attributes = None,
+        links: typing.Optional[typing.Sequence[Link]] = None,
+        trace_state: typing.Optional[TraceState] = None,
+    ) -> SamplingResult:
+        return SamplingResult(Decision.RECORD_ONLY, attributes, trace_state)  # type: ignore[arg-type]
+
+    def get_description(self) -> str:
+        return "RecordOnlySampler"
+
+
+def create_sampler(
+    ratio: float,
+    route_ratios: typing.Optional[typing.Dict[str, float]] = None,
+    record_unsampled: bool = False,
+) -> Sampler:
+    """Create a parent based sampler using route ratios for root spans"""
+    root = RouteRatioSampler(ratio, route_ratios, record_unsampled)
+    if record_unsampled:
+        # Children of unsampled spans must be recorded too, so that whole trace can be exported
+        return ParentBased(root, local_parent_not_sampled=RecordOnlySampler())
+    return ParentBased(root)
+
+
+class ErrorAndSlowTraceProcessor(SpanProcessor):
+    """Forward sampled spans to delegate processor, as well as unsampled traces which failed or were too slow.
+
+    Unsampled spans are buffered per trace until local root span ends. Spans end on any thread
+    (E.G, within executors), so buffered traces are protected by a lock.
+
+    Arguments:
+        delegate: Processor receiving spans to export (usually a `BatchSpanProcessor`).
+        slow_threshold: Traces whose local root span lasted longer (in seconds) are exported.
+        export_errors: Export traces whose local root span has an error status.
+        max_traces: Maximum number of traces buffered. Oldest traces are discarded first.
+    """
+
+    def __init__(
+        self,
+        delegate: SpanProcessor,
+        slow_threshold: typing.Optional[float] = None,
+        export_errors: bool = True,
+        max_traces: int = 2048,
+    ) -> None:
+        self.delegate = delegate
+        self.slow_threshold_ns = (
+            int(slow_threshold * 1e9) if slow_threshold is not None else None
+        )
+        self.export_errors = export_errors
+        self.max_traces = max_traces
+        self._pending: typing.OrderedDict[
+            int, typing.List[ReadableSpan]
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(
+        self, span: Span, parent_context: typing.Optional[Context] = None
+    ) -> None:
+        self.delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        context = span.context
+        if context is None:
+            return
+        if context.trace_flags.sampled:
+            self.delegate.on_end(span)
+            return
+        trace_id = context.trace_id
+        # Decision is taken once local root span ends
+        is_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            spans = self._pending.get(trace_id)
+            if spans is None:
+                if len(self._pending) >= self.max_traces:
+                    self._pending.popitem(last=False)
+                spans = self._pending[trace_id] = []
+            spans.append(span)
+            if not is_root:
+                return
+            # Trace may have been evicted by another thread in between
+            self._pending.pop(trace_id, None)
+        if self._should_export(span):
+            for pending_span in spans:
+                self.delegate.on_end(_as_sampled(pending_span))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._pending.clear()
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
+
+    def _should_export(self, span: ReadableSpan) -> bool:
+        if self.export_errors and span.status.status_code == StatusCode.ERROR:
+            return True
+        if (
+            self.slow_threshold_ns is not None
+            and span.start_time is not None
+            and span.end_time is not None
+        ):
+            return span.end_time - span.start_time >= self.slow_threshold_ns
+        return False
+
+
+def _as_sampled(span: ReadableSpan) -> ReadableSpan:
+    """Copy a span, marking its context as sampled so that exporting processors accept it"""
+    context = span.context
+    return ReadableSpan(
+        name=span.name,
+        context=SpanContext(
+            context.trace_id,
+            context.span_id,
+            context.is_remote,
+            TraceFlags(TraceFlags.SAMPLED),
+            context.trace_state,
+        ),
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        instrumentation_info=span.instrumentation_info,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+    )
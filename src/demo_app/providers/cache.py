@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from demo_app.container import AppContainer
+from demo_app.lib.cache import ResponseCache
+
+
+def response_cache_provider(container: AppContainer) -> None:
+    """Cache responses of routes decorated using `demo_app.caching.cache_response`.
+
+    Cache is available as `container.cache`. This provider must be registered after metrics providers.
+    """
+    settings = container.settings.cache
+    if settings.enabled:
+        container.cache = ResponseCache(
+            max_bytes=settings.max_bytes,
+            default_ttl=settings.default_ttl,
+            registry=container.metrics,
+        )
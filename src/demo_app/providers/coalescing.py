@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import typing
+
+from starlette.requests import Request
+
+from demo_app.coalescing import RequestCoalescer
+from demo_app.container import AppContainer
+from demo_app.lib import EmployeeDatabase
+from demo_app.lib.tenants import DatabaseRegistry
+
+from .tenancy import scope_tenant
+
+
+def request_coalescing_provider(container: AppContainer) -> None:
+    """Let identical concurrent GET requests share a single response.
+
+    Coalescer is available as `app.state.coalescer`, and is used by routes created using `demo_app.routing.AppRoute`.
+    Responses are shared as long as database version does not change.
+    """
+    routes = container.settings.cache.coalesce_routes
+    if not routes:
+        return
+
+    def database_version(request: Request) -> typing.Optional[int]:
+        # Either database or tenant databases are attached to application state
+        registry: typing.Optional[DatabaseRegistry] = getattr(
+            container.app.state, "databases", None
+        )
+        if registry is not None:
+            tenant = scope_tenant(request.scope)
+            return None if tenant is None else registry.version(tenant)
+        # Database is not attached yet while it loads in background
+        database: typing.Optional[EmployeeDatabase] = getattr(
+            container.app.state, "database", None
+        )
+        return None if database is None else database.version
+
+    container.app.state.coalescer = RequestCoalescer(
+        routes, version=database_version, registry=container.metrics
+    )
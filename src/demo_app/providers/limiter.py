@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import time
+import typing
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from demo_app.container import AppContainer
+from demo_app.lib.limiter import (
+    AIMDLimit,
+    ConcurrencyLimiter,
+    GradientLimit,
+    LimitAlgorithm,
+    Priority,
+)
+from demo_app.lib.metrics import MetricsRegistry
+
+
+def concurrency_limiter_provider(container: AppContainer) -> None:
+    """Shed requests exceeding an adaptive concurrency limit.
+
+    Limiter is available as `app.state.limiter`. This provider must be registered after metrics providers,
+    so that shed requests are rejected before any other middleware processes them.
+    """
+    settings = container.settings.limiter
+    if not settings.enabled:
+        return
+    algorithm: LimitAlgorithm
+    if settings.algorithm == "aimd":
+        algorithm = AIMDLimit(
+            initial_limit=settings.initial_limit,
+            min_limit=settings.min_limit,
+            max_limit=settings.max_limit,
+            latency_threshold=settings.latency_threshold,
+            backoff_ratio=settings.backoff_ratio,
+        )
+    else:
+        algorithm = GradientLimit(
+            initial_limit=settings.initial_limit,
+            min_limit=settings.min_limit,
+            max_limit=settings.max_limit,
+            tolerance=settings.tolerance,
+        )
+    limiter = ConcurrencyLimiter(algorithm, settings.low_priority_ratio)
+    container.app.state.limiter = limiter
+    container.app.add_middleware(
+        ConcurrencyLimitMiddleware,
+        limiter=limiter,
+        registry=container.metrics,
+        route_priorities=settings.route_priorities,
+        retry_after=settings.retry_after,
+    )
+
+
+class ConcurrencyLimitMiddleware:
+    """Reject requests with 503 responses when limiter does not admit them.
+
+    Priority of a request is the priority of the longest path prefix matching request path.
+    Requests which do not match any prefix have a normal priority.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: ConcurrencyLimiter,
+        registry: MetricsRegistry,
+        route_priorities: typing.Dict[str, Priority],
+        retry_after: int = 1,
+    ) -> None:
+        self.app = app
+        self.limiter = limiter
+        # Longest prefixes are tested first
+        self.route_priorities = sorted(
+            route_priorities.items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.rejected = JSONResponse(
+            status_code=503,
+            content={"details": "Server is overloaded"},
+            headers={"Retry-After": str(retry_after)},
+        )
+        registry.gauge(
+            "concurrency_limit",
+            "Number of requests allowed to be processed concurrently",
+        ).labels().set_function(lambda: limiter.limit)
+        registry.gauge(
+            "concurrency_in_flight",
+            "Number of requests admitted by concurrency limiter",
+        ).labels().set_function(lambda: limiter.in_flight)
+        self.shed = registry.counter(
+            "concurrency_shed_total",
+            "Number of requests rejected by concurrency limiter",
+            ("priority",),
+        )
+
+    def priority(self, scope: Scope) -> Priority:
+        path: str = scope["path"]
+        root_path: str = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path) :]
+        for prefix, priority in self.route_priorities:
+            if path.startswith(prefix):
+                return priority
+        return "normal"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        priority = self.priority(scope)
+        if not self.limiter.try_acquire(priority):
+            self.shed.labels(priority).inc()
+            await self.rejected(scope, receive, send)
+            return
+        # Latency of failed or cancelled requests is not used to update limit
+        latency: typing.Optional[float] = None
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+            latency = time.perf_counter() - start
+        finally:
+            self.limiter.release(latency)
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import logging
+import signal
 import time
 import uuid
-from typing import Any, Awaitable, Callable
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 
 import structlog
 from starlette.requests import Request
@@ -11,29 +14,107 @@
 from uvicorn.config import LOG_LEVELS
 
 from demo_app.container import AppContainer
+from demo_app.routing import route_path
 
-from ._log_levels import make_filtering_bound_logger
+from ._control import LogLevelController
+from ._log_levels import make_adjustable_filtering_bound_logger
+from ._sampling import AccessLogSampler, RateLimiter
+from ._sink import QueueLogger, QueueLogSink, capture_exc_info, to_sink
+
+# Sink currently configured. There can be only one since structlog configuration is global.
+_sink: Optional[QueueLogSink] = None
+
+
+def current_sink() -> Optional[QueueLogSink]:
+    """Return the sink currently configured, if any"""
+    return _sink
+
+
+def queue_logger_factory(*args: Any) -> QueueLogger:
+    """A structlog logger factory. Loggers push events into the current sink, even once sink is replaced."""
+    return QueueLogger(current_sink)
+
+
+def make_renderer(renderer: str) -> structlog.types.Processor:
+    """Create the processor used to render event dicts into strings"""
+    if renderer == "json":
+        json_renderer = structlog.processors.JSONRenderer()
+
+        def render_json(
+            logger: Any, method_name: str, event_dict: structlog.types.EventDict
+        ) -> Any:
+            event_dict = structlog.processors.format_exc_info(
+                logger, method_name, event_dict
+            )
+            return json_renderer(logger, method_name, event_dict)
+
+        return render_json
+    return structlog.dev.ConsoleRenderer()
 
 
 def structured_logging_provider(container: AppContainer) -> None:
     """Add structured logger to the application."""
-    level = container.settings.logging.level or "info"
+    global _sink
+
+    settings = container.settings.logging
+    level = settings.level or "info"
     level_int = LOG_LEVELS[level.lower()]
+    renderer = make_renderer(settings.renderer)
+    processors: List[structlog.types.Processor] = []
+    if settings.rate_limit > 0:
+        # Rate limiting comes first so that dropped events cost as little as possible
+        processors.append(RateLimiter(settings.rate_limit, settings.rate_limit_burst))
+    processors += [
+        structlog.processors.add_log_level,
+        structlog.threadlocal.merge_threadlocal,
+        structlog.processors.StackInfoRenderer(),
+        structlog.dev.set_exc_info,
+        structlog.processors.TimeStamper(fmt="iso", utc=True),
+    ]
+    # Previous sink (if any) is replaced, make sure it does not leave pending events behind
+    if _sink is not None:
+        _sink.close()
+        _sink = None
+    if settings.queue_enabled:
+        # Rendering and writing happen in a background thread
+        _sink = QueueLogSink(
+            renderer,
+            max_size=settings.queue_max_size,
+            batch_size=settings.queue_batch_size,
+            drop_policy=settings.queue_drop_policy,
+        )
+        processors.extend([capture_exc_info, to_sink])
+        logger_factory: Any = queue_logger_factory
+    else:
+        # Rendering and writing happen in the thread emitting the log event
+        processors.append(renderer)
+        logger_factory = structlog.PrintLoggerFactory()
+    # Level methods of wrapper class are swapped when log level is changed at runtime
+    wrapper_class = make_adjustable_filtering_bound_logger(level_int)
     structlog.configure(
-        processors=[
-            structlog.processors.add_log_level,
-            structlog.threadlocal.merge_threadlocal,
-            structlog.processors.StackInfoRenderer(),
-            structlog.dev.set_exc_info,
-            structlog.processors.TimeStamper(fmt="iso", utc=True),
-            structlog.dev.ConsoleRenderer(),
-        ],
-        wrapper_class=make_filtering_bound_logger(level_int),
+        processors=processors,
+        wrapper_class=wrapper_class,
         context_class=dict,
-        logger_factory=structlog.PrintLoggerFactory(),
+        logger_factory=logger_factory,
         cache_logger_on_first_use=True,
     )
 
+    if _sink is not None:
+        sink = _sink
+
+        @contextlib.asynccontextmanager
+        async def flush_logs(container: AppContainer) -> AsyncIterator[QueueLogSink]:
+            """Write pending log events on application shutdown"""
+            try:
+                yield sink
+            finally:
+                await asyncio.get_running_loop().run_in_executor(None, sink.flush)
+
+        # Hooks are exited in reverse order, so the first hook is the last to exit.
+        # This way, log events emitted by other hooks on shutdown are flushed too.
+        container.hooks.insert(0, flush_logs)
+        container.app.state.log_sink = sink
+
     logger = structlog.get_logger()
 
     class StructlogHandler(logging.Handler):
@@ -46,33 +127,38 @@ def __init__(self, *args: Any, **kw: Any):
             self._log = logger
 
         def emit(self, record: logging.LogRecord) -> None:
+            # Handler level filters records before they reach this method,
+            # so message is formatted only when record is emitted.
+            message = record.getMessage()
             if isinstance(record.msg, Exception):
-                self._log.exception(record.msg, logger=record.name)
+                self._log.exception(message, logger=record.name)
             if record.levelno >= 40:
                 if container.settings.server.debug:
                     self._log.error(
-                        record.msg % record.args,
+                        message,
                         logger=record.name,
                         exc_info=record.exc_info,
                     )
                 elif record.exc_info:
                     self._log.error(
-                        record.msg % record.args,
+                        message,
                         logger=record.name,
                         error_type=record.exc_info[0],
                         error=record.exc_info[1],
                     )
                 else:
-                    self._log.error(record.msg % record.args, logger=record.name)
+                    self._log.error(message, logger=record.name)
             elif record.levelno >= 30:
-                self._log.warning(record.msg % record.args, logger=record.name)
+                self._log.warning(message, logger=record.name)
             elif record.levelno >= 20:
-                self._log.info(record.msg % record.args, logger=record.name)
+                self._log.info(message, logger=record.name)
             else:
-                self._log.debug(record.msg % record.args, logger=record.name)
+                self._log.debug(message, logger=record.name)
 
     container.app.state.logger = logger
 
+    structlog_handler = StructlogHandler(level=level_int)
+
     def configure_standard_logging() -> None:
         standard_loggers = [
             logging.getLogger(name) for name in logging.root.manager.loggerDict
@@ -87,11 +173,38 @@ def configure_standard_logging() -> None:
                     break
                 standard_logger.removeHandler(handler)
 
-        logging.root.addHandler(StructlogHandler())
+        logging.root.addHandler(structlog_handler)
 
     configure_standard_logging()
 
+    log_level = LogLevelController(wrapper_class, structlog_handler, level)
+    container.app.state.log_level = log_level
+
+    @contextlib.asynccontextmanager
+    async def log_level_signals(container: AppContainer) -> AsyncIterator[None]:
+        """Switch to debug level on SIGUSR1 and restore configured level on SIGUSR2"""
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, log_level.set_level, "debug")
+            loop.add_signal_handler(signal.SIGUSR2, log_level.reset)
+        # Signals are not supported on Windows, nor outside of main thread
+        except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+            yield
+            return
+        try:
+            yield
+        finally:
+            loop.remove_signal_handler(signal.SIGUSR1)
+            loop.remove_signal_handler(signal.SIGUSR2)
+
+    container.hooks.append(log_level_signals)
+
     if container.settings.logging.access_log:
+        sampler = AccessLogSampler(
+            sample_rate=settings.access_log_sample_rate,
+            slow_threshold=settings.access_log_slow_threshold,
+            route_sample_rates=settings.access_log_route_sample_rates,
+        )
 
         @container.app.middleware("http")
         async def logging_middleware(
@@ -105,11 +218,13 @@ async def logging_middleware(
                 request_id=str(uuid.uuid4()),
                 http_version=request.scope.get("http_version", "unknown"),
             )
-            start_time = time.time()
+            # Path is read before tenancy middleware removes tenant prefix from it
+            path = request.scope["path"]
+            start_time = time.perf_counter()
             try:
                 response = await call_next(request)
             except Exception as err:
-                process_time = time.time() - start_time
+                process_time = time.perf_counter() - start_time
                 if container.settings.server.debug:
                     request.app.state.logger.exception(err)
                 else:
@@ -126,14 +241,25 @@ async def logging_middleware(
                     status_code=500,
                 )
             else:
-                process_time = time.time() - start_time
-                request.app.state.logger.info(
-                    f"{request.method.upper()} - {request.scope['path']} - {':'.join(str(v) for v in request.scope['client'])}",
-                    status_code=response.status_code,
-                    process_time=process_time,
+                process_time = time.perf_counter() - start_time
+                # Sampling decision is taken before any formatting
+                sample_rate = sampler.sample(
+                    route_path(request.scope), response.status_code, process_time
                 )
+                if sample_rate is not None:
+                    fields: Dict[str, Any] = {}
+                    server_timing = response.headers.get("server-timing")
+                    if server_timing is not None:
+                        fields["server_timing"] = server_timing
+                    request.app.state.logger.info(
+                        f"{request.method.upper()} - {path} - {':'.join(str(v) for v in request.scope['client'])}",
+                        status_code=response.status_code,
+                        process_time=process_time,
+                        sample_rate=sample_rate,
+                        **fields,
+                    )
                 structlog.threadlocal.clear_threadlocal()
             return response
 
 
-__all__ = ["structured_logging_provider"]
+__all__ = ["structured_logging_provider", "LogLevelController"]
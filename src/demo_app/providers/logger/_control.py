@@ -0,0 +1,71 @@
+"""Change the log level of a running application."""
+from __future__ import annotations
+
+import logging
+import typing
+
+import fastapi
+from structlog import get_logger
+from structlog.types import FilteringBoundLogger
+from uvicorn.config import LOG_LEVELS
+
+from ._log_levels import set_min_level
+
+
+class LogLevelController:
+    """Change the level of both structlog loggers and the standard logging handler at runtime.
+
+    Arguments:
+        logger_class: A class created using `make_adjustable_filtering_bound_logger`.
+        handler: The standard logging handler feeding log records into structlog.
+        level: The level configured on startup.
+    """
+
+    def __init__(
+        self,
+        logger_class: typing.Type[FilteringBoundLogger],
+        handler: logging.Handler,
+        level: str,
+    ) -> None:
+        self.logger_class = logger_class
+        self.handler = handler
+        self.configured_level = level.lower()
+        self.level = self.configured_level
+        # Standard loggers inherit root level, which must be lowered as well for debug records to be created
+        self._root_level = logging.root.level
+
+    def set_level(self, level: str) -> None:
+        """Change log level.
+
+        Raises:
+            ValueError: When level is not a known log level name.
+        """
+        level = level.lower()
+        try:
+            level_int = LOG_LEVELS[level]
+        except KeyError:
+            raise ValueError(
+                f"Invalid log level: {level}. Possible choices: {list(LOG_LEVELS)}"
+            )
+        if level == self.level:
+            return
+        set_min_level(self.logger_class, level_int)
+        self.handler.setLevel(level_int)
+        logging.root.setLevel(
+            self._root_level
+            if level == self.configured_level
+            else min(level_int, self._root_level)
+        )
+        previous_level, self.level = self.level, level
+        get_logger().bind(logger="log-level").warning(
+            "Log level changed", previous_level=previous_level, new_level=level
+        )
+
+    def reset(self) -> None:
+        """Restore level configured on startup"""
+        self.set_level(self.configured_level)
+
+    @staticmethod
+    def provider(request: fastapi.Request) -> LogLevelController:
+        """Provide the log level controller from a FastAPI request."""
+        return request.app.state.log_level  # type: ignore[no-any-return]
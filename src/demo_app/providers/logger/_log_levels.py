@@ -144,3 +144,37 @@ def meth(self: Any, event: str, **kw: Any) -> Any:
     TRACE: BoundLoggerFilteringAtTrace,
     NOTSET: BoundLoggerFilteringAtNotset,
 }
+
+# Names of the methods which depend on min level
+_LEVEL_METHODS = tuple(_LEVEL_TO_NAME.values()) + ("fatal", "warn", "trace")
+
+
+def make_adjustable_filtering_bound_logger(
+    min_level: int,
+) -> Type[FilteringBoundLogger]:
+    """
+    Create a new `FilteringBoundLogger` class whose level can be changed at runtime
+    using `set_min_level`.
+
+    Changing the level rebinds the level methods on the class itself, so it applies
+    to all existing loggers (including cached ones), and log levels below
+    *min_level* still only consist of a ``return None``.
+
+    Unlike loggers created by `make_filtering_bound_logger`, the returned class is
+    not pickleable.
+    """
+    logger_class = type(
+        "BoundLoggerFilteringAtRuntime", (_LEVEL_TO_FILTERING_LOGGER[min_level],), {}
+    )
+    set_min_level(logger_class, min_level)
+    return logger_class
+
+
+def set_min_level(logger_class: Type[FilteringBoundLogger], min_level: int) -> None:
+    """
+    Change the level of a class created using `make_adjustable_filtering_bound_logger`.
+    """
+    source = _LEVEL_TO_FILTERING_LOGGER[min_level]
+    for name in _LEVEL_METHODS:
+        setattr(logger_class, name, source.__dict__[name])
+    setattr(logger_class, "min_level", min_level)
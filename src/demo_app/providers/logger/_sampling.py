@@ -0,0 +1,126 @@
+"""Access log sampling and log events rate limiting.
+
+Both mechanisms are meant to reduce the CPU cost of logging under heavy load without losing important events:
+
+- Access log sampling keeps a fraction of successful requests, but always keeps errors and slow requests.
+  The sample rate is attached to each access log event so that request counts can be reconstructed downstream (each event weighs `1 / sample_rate`).
+
+- Rate limiting drops repeated identical log events using a token bucket per event, but never drops errors
+  nor access log events, which are sampled instead.
+  The number of suppressed events is attached to the next event which is let through.
+"""
+from __future__ import annotations
+
+import collections
+import random
+import threading
+import time
+import typing
+
+import structlog
+from structlog.types import EventDict, WrappedLogger
+
+
+class AccessLogSampler:
+    """Decide whether a request should appear in access log.
+
+    Arguments:
+        sample_rate: Fraction of successful requests to log, between 0 and 1.
+        slow_threshold: Requests slower than this threshold (in seconds) are always logged.
+        route_sample_rates: Sample rates overriding default sample rate for some routes, keyed by route path.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        slow_threshold: typing.Optional[float] = None,
+        route_sample_rates: typing.Optional[typing.Dict[str, float]] = None,
+    ) -> None:
+        self.sample_rate = _clamp(sample_rate)
+        self.slow_threshold = slow_threshold
+        self.route_sample_rates = {
+            route: _clamp(rate) for route, rate in (route_sample_rates or {}).items()
+        }
+        # Skip sampling entirely when every request should be logged
+        self.disabled = self.sample_rate >= 1 and all(
+            rate >= 1 for rate in self.route_sample_rates.values()
+        )
+
+    def sample(
+        self, route: str, status_code: int, process_time: float
+    ) -> typing.Optional[float]:
+        """Return the sample rate applied to request if it should be logged, else None."""
+        if self.disabled or status_code >= 400:
+            return 1.0
+        if self.slow_threshold is not None and process_time >= self.slow_threshold:
+            return 1.0
+        rate = self.route_sample_rates.get(route, self.sample_rate)
+        if rate >= 1:
+            return 1.0
+        if rate > 0 and random.random() < rate:
+            return rate
+        return None
+
+
+# Logger methods whose events are never rate limited
+UNLIMITED_METHODS = frozenset(("error", "err", "exception", "critical", "fatal"))
+
+
+class RateLimiter:
+    """A structlog processor which drops repeated identical log events.
+
+    Events are considered identical when they share the same level and message.
+    Each event gets a token bucket refilled at `rate` tokens per second, holding at most `burst` tokens.
+    Errors and critical events are never rate limited. Access log events (holding a `sample_rate` field) are
+    never rate limited either: their messages are unique per client, so they would only fill buckets.
+
+    Events can be logged from any thread (E.G, from sync dependencies running in threadpool), so buckets are
+    protected by a lock.
+
+    Arguments:
+        rate: Number of identical events allowed per second.
+        burst: Number of identical events allowed at once.
+        max_keys: Maximum number of buckets kept in memory. Least recently used buckets are evicted first.
+    """
+
+    def __init__(self, rate: float, burst: int = 10, max_keys: int = 10000) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_keys = max_keys
+        # Buckets are stored as [tokens, last refill time, suppressed events]
+        self._buckets: collections.OrderedDict[
+            typing.Tuple[str, str], typing.List[float]
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(
+        self, logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> EventDict:
+        # Processor runs before level is added to event dict, so level is read from method name
+        if method_name in UNLIMITED_METHODS or "sample_rate" in event_dict:
+            return event_dict
+        key = (method_name, str(event_dict.get("event")))
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+                self._buckets[key] = [self.burst - 1, now, 0]
+                return event_dict
+            self._buckets.move_to_end(key)
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                raise structlog.DropEvent
+            bucket[0] = tokens - 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            event_dict["suppressed"] = int(suppressed)
+        return event_dict
+
+
+def _clamp(rate: float) -> float:
+    return min(max(rate, 0.0), 1.0)
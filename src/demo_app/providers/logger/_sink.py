@@ -0,0 +1,218 @@
+"""A log sink which renders and writes log events from a background thread.
+
+Log events are pushed into a bounded queue by the thread emitting them (usually the event loop thread).
+A single writer thread pops events by batch, renders them and writes them to the output file.
+This way, a slow log collector never blocks the request path: at worst, log events are dropped according to the configured policy.
+"""
+from __future__ import annotations
+
+import atexit
+import queue
+import sys
+import threading
+import typing
+
+from structlog.types import EventDict, Processor, WrappedLogger
+
+DropPolicy = typing.Literal["drop_new", "drop_old", "block"]
+
+
+class _Flush:
+    """A marker pushed into the queue to wait until all previous events are written"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class QueueLogSink:
+    """Render and write log events in batches from a background thread.
+
+    Arguments:
+        renderer: The structlog processor used to render an event dict into a string.
+        file: The file where rendered events are written. Defaults to `sys.stdout`.
+        max_size: Maximum number of events waiting to be written.
+        batch_size: Maximum number of events written at once.
+        drop_policy: What to do when the queue is full:
+            - "drop_new": discard the incoming event
+            - "drop_old": discard the oldest pending event (pending flushes are never discarded)
+            - "block": wait until the writer thread catches up
+    """
+
+    def __init__(
+        self,
+        renderer: Processor,
+        file: typing.Optional[typing.TextIO] = None,
+        max_size: int = 10000,
+        batch_size: int = 256,
+        drop_policy: DropPolicy = "drop_new",
+    ) -> None:
+        self.renderer = renderer
+        self.file = file or sys.stdout
+        self.batch_size = max(batch_size, 1)
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self._reported_dropped = 0
+        # Events are dropped by any thread emitting them, as well as by the writer thread
+        self._dropped_lock = threading.Lock()
+        self._queue: queue.Queue[typing.Any] = queue.Queue(max_size)
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+        # Pending events must not be lost when interpreter exits
+        atexit.register(self.close)
+
+    def put(self, event_dict: EventDict) -> None:
+        """Push an event into the queue according to drop policy. Never blocks unless policy is "block"."""
+        if self.drop_policy == "block":
+            self._queue.put(event_dict)
+            return
+        try:
+            self._queue.put_nowait(event_dict)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+            if self.drop_policy == "drop_old":
+                self._replace_oldest(event_dict)
+
+    def _replace_oldest(self, event_dict: EventDict) -> None:
+        # Flush and stop markers are never evicted, else their waiters would never be woken up
+        with self._queue.mutex:
+            pending = self._queue.queue
+            for index, item in enumerate(pending):
+                if item is not _STOP and not isinstance(item, _Flush):
+                    del pending[index]
+                    # Queue size is unchanged, so waiting threads need not be notified
+                    pending.append(event_dict)
+                    return
+
+    def flush(self, timeout: typing.Optional[float] = 5) -> bool:
+        """Wait until all events pushed before this call are written. Return False on timeout."""
+        if not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: typing.Optional[float] = 5) -> None:
+        """Write pending events and stop the writer thread"""
+        # Sink can be garbage collected once closed
+        atexit.unregister(self.close)
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        """Writer thread main loop"""
+        while True:
+            # Wait for at least one item, then drain what is available up to batch size
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines: typing.List[str] = []
+            markers: typing.List[_Flush] = []
+            stop = False
+            for item in items:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, _Flush):
+                    markers.append(item)
+                else:
+                    lines.append(self._render("msg", item))
+            if self.dropped != self._reported_dropped:
+                lines.append(self._render_dropped())
+            self._write(lines)
+            for marker in markers:
+                marker.done.set()
+            if stop:
+                return
+
+    def _render(self, method_name: str, event_dict: EventDict) -> str:
+        try:
+            return str(self.renderer(None, method_name, event_dict))
+        except Exception as err:
+            # A single broken event must never kill the writer thread
+            return f"Failed to render log event {event_dict!r}: {err!r}"
+
+    def _render_dropped(self) -> str:
+        dropped = self.dropped - self._reported_dropped
+        self._reported_dropped += dropped
+        return self._render(
+            "warning",
+            {
+                "event": "Log events dropped because log queue is full",
+                "level": "warning",
+                "logger": "log-sink",
+                "dropped": dropped,
+                "drop_policy": self.drop_policy,
+            },
+        )
+
+    def _write(self, lines: typing.List[str]) -> None:
+        if not lines:
+            return
+        try:
+            self.file.write("\n".join(lines) + "\n")
+            self.file.flush()
+        except Exception:
+            # Nothing else can be done when output is broken
+            with self._dropped_lock:
+                self.dropped += len(lines)
+            self._reported_dropped += len(lines)
+
+
+class QueueLogger:
+    """A structlog wrapped logger which pushes event dicts into the current `QueueLogSink`.
+
+    The last processor of the chain must be `to_sink` so that events are received un-rendered.
+    Sink is resolved on each call rather than bound once: structlog caches loggers on first use,
+    and cached loggers must keep working when the sink is replaced. Events are dropped when there is no sink.
+    """
+
+    def __init__(
+        self, sink: typing.Callable[[], typing.Optional[QueueLogSink]]
+    ) -> None:
+        self._sink = sink
+
+    def msg(self, event_dict: EventDict) -> None:
+        sink = self._sink()
+        if sink is not None:
+            sink.put(event_dict)
+
+    log = debug = info = warn = warning = msg
+    fatal = failure = err = error = critical = exception = msg
+
+
+def capture_exc_info(
+    logger: WrappedLogger, method_name: str, event_dict: EventDict
+) -> EventDict:
+    """Resolve `exc_info` into a tuple while still in the thread which raised the exception.
+
+    Renderers running in the writer thread would otherwise call `sys.exc_info()` in the wrong thread.
+    """
+    exc_info = event_dict.get("exc_info")
+    if not exc_info or isinstance(exc_info, tuple):
+        return event_dict
+    if isinstance(exc_info, BaseException):
+        event_dict["exc_info"] = (type(exc_info), exc_info, exc_info.__traceback__)
+    else:
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
+
+
+def to_sink(
+    logger: WrappedLogger, method_name: str, event_dict: EventDict
+) -> typing.Tuple[typing.Tuple[EventDict], typing.Dict[str, typing.Any]]:
+    """Last processor of the chain: hand the event dict over to `QueueLogger` without rendering it"""
+    return (event_dict,), {}
@@ -1,11 +1,27 @@
 from __future__ import annotations
 
+import time
+import typing
+
+import fastapi
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
 from demo_app.container import AppContainer
+from demo_app.lib.metrics import CONTENT_TYPE, MetricsRegistry
+from demo_app.routing import route_path
+
+# Methods reported as is, other methods are reported as "OTHER" so that clients cannot create new label values
+HTTP_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE")
+)
 
 
 def prometheus_metrics_provider(container: AppContainer) -> None:
     """Add prometheus metrics to your application."""
-    if container.settings.telemetry.metrics_enabled:
+    if (
+        container.settings.telemetry.metrics_enabled
+        and container.settings.telemetry.metrics_provider == "prometheus"
+    ):
         from prometheus_fastapi_instrumentator import Instrumentator
 
         Instrumentator(
@@ -19,3 +35,90 @@ def prometheus_metrics_provider(container: AppContainer) -> None:
             include_in_schema=True,
             tags=["Telemetry"],
         )
+
+
+def native_metrics_provider(container: AppContainer) -> None:
+    """Add metrics to your application without any third-party dependency.
+
+    Metrics are exposed using Prometheus text format.
+    """
+    if (
+        container.settings.telemetry.metrics_enabled
+        and container.settings.telemetry.metrics_provider == "native"
+    ):
+        registry = MetricsRegistry()
+        # Other components register their metrics into container registry
+        container.metrics = registry
+        container.app.add_middleware(
+            MetricsMiddleware,
+            registry=registry,
+            excluded_routes=[
+                "/" + path.strip().lstrip("/")
+                for path in container.settings.telemetry.ignore_path.split(",")
+            ],
+        )
+
+        @container.app.get(
+            container.settings.telemetry.metrics_path,
+            include_in_schema=True,
+            tags=["Telemetry"],
+            response_class=fastapi.responses.PlainTextResponse,
+        )
+        async def metrics() -> fastapi.responses.PlainTextResponse:
+            """Expose metrics using Prometheus text format"""
+            return fastapi.responses.PlainTextResponse(
+                registry.render(), media_type=CONTENT_TYPE
+            )
+
+
+class MetricsMiddleware:
+    """Record HTTP requests latency per route, method and status code, as well as requests in flight.
+
+    A pure ASGI middleware is used to keep per-request overhead as low as possible.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        registry: MetricsRegistry,
+        excluded_routes: typing.Sequence[str] = (),
+    ) -> None:
+        self.app = app
+        self.excluded_routes = frozenset(excluded_routes)
+        self.latency = registry.histogram(
+            "http_request_duration_seconds",
+            "HTTP requests latency in seconds",
+            ("method", "route", "status"),
+        )
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight",
+            "Number of HTTP requests being processed",
+            ("method",),
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        if method not in HTTP_METHODS:
+            method = "OTHER"
+        in_flight = self.in_flight.labels(method)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            in_flight.dec()
+            route = route_path(scope)
+            if route not in self.excluded_routes:
+                self.latency.labels(method, route, str(status_code)).observe(duration)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import typing
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from demo_app.container import AppContainer
+
+# Key of request state holding request tenant
+TENANT_STATE_KEY = "tenant"
+
+
+def tenancy_provider(container: AppContainer) -> None:
+    """Resolve the tenant of each request when a tenants directory is configured.
+
+    Tenant is available in request state (see `scope_tenant`),
+    and is used by the `demo_app.hooks.database` dependency to select the tenant database.
+
+    This provider must be registered after other middleware providers (except logging), so that tenant path
+    prefix is removed before other middlewares match request path (E.G, concurrency limiter priorities).
+    """
+    settings = container.settings.database
+    if settings.tenants_dir is None:
+        return
+    if settings.tenant_resolver == "path":
+        container.app.add_middleware(
+            TenantPathMiddleware, prefix=settings.tenant_path_prefix
+        )
+    else:
+        container.app.add_middleware(
+            TenantHeaderMiddleware, header=settings.tenant_header
+        )
+
+
+def scope_tenant(scope: Scope) -> typing.Optional[str]:
+    """Return the tenant of a request, or None when request has no tenant or tenants are disabled"""
+    return scope.get("state", {}).get(TENANT_STATE_KEY)  # type: ignore[no-any-return]
+
+
+class TenantHeaderMiddleware:
+    """Read request tenant from a header"""
+
+    def __init__(self, app: ASGIApp, header: str) -> None:
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            tenant = _find_header(scope, self.header)
+            if tenant is not None:
+                scope.setdefault("state", {})[TENANT_STATE_KEY] = tenant
+        await self.app(scope, receive, send)
+
+
+class TenantPathMiddleware:
+    """Read request tenant from path prefix, and route request as if prefix was not present.
+
+    For example, "/tenants/acme/employees/" is routed to "/employees/" with tenant "acme".
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str = "/tenants") -> None:
+        self.app = app
+        self.prefix = "/" + prefix.strip("/") + "/"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.prefix):
+            tenant, _, path = scope["path"][len(self.prefix) :].partition("/")
+            if tenant:
+                # Scope is modified in place, so that outer middlewares see the routed endpoint once response is started
+                scope["path"] = "/" + path
+                scope["root_path"] = scope.get("root_path", "") + self.prefix + tenant
+                scope.setdefault("state", {})[TENANT_STATE_KEY] = tenant
+        await self.app(scope, receive, send)
+
+
+def _find_header(scope: Scope, name: bytes) -> typing.Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")  # type: ignore[no-any-return]
+    return None
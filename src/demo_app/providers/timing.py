@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from demo_app.container import AppContainer
+from demo_app.lib.timing import start_timer, stop_timer
+
+
+def request_timing_provider(container: AppContainer) -> None:
+    """Add a Server-Timing header holding a breakdown of request processing time.
+
+    Phases are reported by application routes (see `demo_app.routing.AppRoute`) and by the database.
+    """
+    if container.settings.telemetry.server_timing_enabled:
+        container.app.add_middleware(ServerTimingMiddleware)
+
+
+class ServerTimingMiddleware:
+    """Attach a request timer to the context of each HTTP request, and add a Server-Timing header to responses"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timer, token = start_timer()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timer.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stop_timer(token)
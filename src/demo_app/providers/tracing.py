@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Union
+import asyncio
+import contextlib
+from typing import Any, AsyncIterator, Dict, Union
 
 from demo_app.container import AppContainer
 
@@ -23,13 +25,28 @@ def openelemetry_traces_provider(container: AppContainer) -> None:
             ConsoleSpanExporter,
         )
 
+        from ._trace_sampling import ErrorAndSlowTraceProcessor, create_sampler
+
+        settings = container.settings.telemetry
+        # Unsampled requests must be recorded to export errors or slow requests
+        record_unsampled = settings.traces_always_sample_errors or (
+            settings.traces_slow_threshold is not None
+        )
+
         # Service name is required for most backends,
         # and although it's not necessary for console export,
         # it's good to set service name anyways.
         resource = Resource(attributes={SERVICE_NAME: container.meta.name})
 
         # Create a new tracer provider
-        provider = TracerProvider(resource=resource)
+        provider = TracerProvider(
+            resource=resource,
+            sampler=create_sampler(
+                settings.traces_sample_ratio,
+                settings.traces_route_sample_ratios,
+                record_unsampled=record_unsampled,
+            ),
+        )
 
         exporter: Union[OTLPSpanExporter, ConsoleSpanExporter]
         if container.settings.telemetry.traces_exporter.lower() == "otlp":
@@ -43,11 +60,46 @@ def openelemetry_traces_provider(container: AppContainer) -> None:
         else:
             exporter = ConsoleSpanExporter()
 
-        processor = BatchSpanProcessor(exporter)
-        provider.add_span_processor(processor)
+        # Parameters which are not set are read from environment (OTEL_BSP_*) or use SDK defaults
+        processor_options: Dict[str, Any] = {
+            key: value
+            for key, value in (
+                ("max_queue_size", settings.traces_max_queue_size),
+                ("schedule_delay_millis", settings.traces_schedule_delay_millis),
+                ("max_export_batch_size", settings.traces_max_export_batch_size),
+                ("export_timeout_millis", settings.traces_export_timeout_millis),
+            )
+            if value is not None
+        }
+        processor = BatchSpanProcessor(exporter, **processor_options)
+        if record_unsampled:
+            provider.add_span_processor(
+                ErrorAndSlowTraceProcessor(
+                    processor,
+                    slow_threshold=settings.traces_slow_threshold,
+                    export_errors=settings.traces_always_sample_errors,
+                )
+            )
+        else:
+            provider.add_span_processor(processor)
 
         # Set global tracer provider
         trace.set_tracer_provider(provider)
+        # Global tracer provider can only be set once, so keep a reference to this one
+        container.app.state.tracer_provider = provider
+
+        @contextlib.asynccontextmanager
+        async def flush_spans(container: AppContainer) -> AsyncIterator[None]:
+            """Export pending spans on application shutdown"""
+            try:
+                yield
+            finally:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, provider.force_flush
+                )
+
+        # Spans created by other hooks on shutdown must be exported as well
+        container.hooks.insert(0, flush_spans)
 
         # Instrument app
         FastAPIInstrumentor().instrument_app(
@@ -1,4 +1,6 @@
 from .debug import router as debug_router
 from .employees import router as employees_router
+from .health import router as health_router
+from .profiling import router as profiling_router
 
-__all__ = ["employees_router", "debug_router"]
+__all__ = ["employees_router", "debug_router", "health_router", "profiling_router"]
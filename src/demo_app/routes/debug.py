@@ -8,11 +8,14 @@
 import fastapi
 
 from ..container import AppContainer, AppSettings
+from ..providers.logger import LogLevelController
+from ..routing import AppRoute
 
 router = fastapi.APIRouter(
     prefix="/debug",
     tags=["Debug"],
     default_response_class=fastapi.responses.JSONResponse,
+    route_class=AppRoute,
 )
 
 
@@ -40,14 +43,61 @@ async def get_environment() -> Dict[str, Any]:
 async def get_tasks_status(
     container: AppContainer = fastapi.Depends(AppContainer.provider),
 ) -> List[Dict[str, Any]]:
-    """Return application tasks status"""
-    return [
-        {
-            "name": task.name,
-            "started": task.started,
-            "done": task.done,
-            "cancelled": task.cancelled,
-            "exception": str(task.exception) if task.exception else None,
-        }
-        for task in container.submitted_tasks.values()
-    ]
+    """Return application tasks status and runtime statistics"""
+    return [task.summary() for task in container.submitted_tasks.values()]
+
+
+@router.get("/executors", summary="Get executors status")
+async def get_executors(
+    container: AppContainer = fastapi.Depends(AppContainer.provider),
+) -> List[Dict[str, Any]]:
+    """Return number of workers, queue depth and utilization of each executor"""
+    return container.executors.summary()
+
+
+@router.get("/tenants", summary="Get open tenant databases")
+async def get_tenants(
+    container: AppContainer = fastapi.Depends(AppContainer.provider),
+) -> List[Dict[str, Any]]:
+    """Return open tenant databases, from least to most recently used. Empty when tenants are disabled."""
+    registry = getattr(container.app.state, "databases", None)
+    return [] if registry is None else registry.summary()  # type: ignore[no-any-return]
+
+
+@router.get("/database/load", summary="Get database load progress")
+async def get_database_load(
+    container: AppContainer = fastapi.Depends(AppContainer.provider),
+) -> Dict[str, Any]:
+    """Return progress of database load. Empty when tenants are enabled."""
+    progress = getattr(container.app.state, "database_load", None)
+    return {} if progress is None else progress.summary()  # type: ignore[no-any-return]
+
+
+@router.get("/logging", summary="Get current log level")
+async def get_log_level(
+    log_level: LogLevelController = fastapi.Depends(LogLevelController.provider),
+) -> Dict[str, Any]:
+    """Return both current log level and log level configured on startup"""
+    return {"level": log_level.level, "configured_level": log_level.configured_level}
+
+
+@router.put("/logging", summary="Change log level")
+async def set_log_level(
+    level: str = fastapi.Query(..., description="New log level (E.G, debug)"),
+    log_level: LogLevelController = fastapi.Depends(LogLevelController.provider),
+) -> Dict[str, Any]:
+    """Change log level without restarting the application"""
+    try:
+        log_level.set_level(level)
+    except ValueError as err:
+        raise fastapi.HTTPException(status_code=422, detail=str(err))
+    return {"level": log_level.level, "configured_level": log_level.configured_level}
+
+
+@router.delete("/logging", summary="Restore log level configured on startup")
+async def reset_log_level(
+    log_level: LogLevelController = fastapi.Depends(LogLevelController.provider),
+) -> Dict[str, Any]:
+    """Restore log level configured on startup"""
+    log_level.reset()
+    return {"level": log_level.level, "configured_level": log_level.configured_level}
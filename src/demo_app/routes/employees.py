@@ -5,6 +5,8 @@
 import fastapi
 from structlog import get_logger
 
+from demo_app.caching import cache_response
+from demo_app.conditional import etag, expected_versions
 from demo_app.hooks import database
 from demo_app.lib import (
     EmployeeDatabase,
@@ -12,12 +14,21 @@
     EmployeeFormUpdate,
     EmployeeInDB,
 )
+from demo_app.lib.columnar import (
+    BATCH_SIZE,
+    MEDIA_TYPES,
+    ColumnarFormat,
+    import_pyarrow,
+    iter_columnar,
+)
+from demo_app.routing import AppRoute
 
 logger = get_logger()
 router = fastapi.APIRouter(
     prefix="/employees",
     tags=["Employees"],
     default_response_class=fastapi.responses.JSONResponse,
+    route_class=AppRoute,
 )
 
 
@@ -27,6 +38,7 @@
     status_code=200,
     response_model=typing.List[EmployeeInDB],
 )
+@cache_response(tags=["employees:all"])
 async def get_all_employee(
     db: EmployeeDatabase = fastapi.Depends(database),
     # logger: BoundLogger = fastapi.Depends(logger),
@@ -44,6 +56,7 @@ async def get_all_employee(
     status_code=200,
     response_model=typing.List[str],
 )
+@cache_response(tags=["employees:lastnames"])
 async def get_all_last_names(
     db: EmployeeDatabase = fastapi.Depends(database),
 ) -> typing.List[str]:
@@ -57,11 +70,42 @@ async def get_all_last_names(
     status_code=200,
     response_model=EmployeeInDB,
 )
+@cache_response(tags=["employees:lastname:{lastname}"])
 async def get_employee_by_lastname(
-    lastname: str, db: EmployeeDatabase = fastapi.Depends(database)
+    lastname: str,
+    response: fastapi.Response,
+    db: EmployeeDatabase = fastapi.Depends(database),
 ) -> EmployeeInDB:
     """Get all the available employees lastnames."""
-    return db.find_one(lastname=lastname)
+    employee = db.find_one(lastname=lastname)
+    response.headers["ETag"] = etag(employee.version)
+    return employee
+
+
+@router.get(
+    "/export.{format}",
+    summary="Export all employees as an Arrow IPC stream or as a Parquet file.",
+    status_code=200,
+    response_class=fastapi.responses.StreamingResponse,
+    responses={
+        200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}},
+        501: {"description": "pyarrow is not installed"},
+    },
+)
+async def export_employees(
+    format: ColumnarFormat,
+    batch_size: int = fastapi.Query(BATCH_SIZE, gt=0, le=1024 * 1024),
+    db: EmployeeDatabase = fastapi.Depends(database),
+) -> fastapi.responses.StreamingResponse:
+    """Export employees in a columnar format, one record batch at a time."""
+    # Fail before response starts when pyarrow is missing
+    import_pyarrow()
+    # Batches are encoded within the threadpool used to iterate synchronous streams
+    return fastapi.responses.StreamingResponse(
+        iter_columnar(db.columns(batch_size), format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="employees.{format}"'},
+    )
 
 
 # Put and post endpoints to manipulate employee data
@@ -73,10 +117,13 @@ async def get_employee_by_lastname(
 )
 async def add_employee(
     employee: EmployeeFormCreate,
+    response: fastapi.Response,
     db: EmployeeDatabase = fastapi.Depends(database),
 ) -> EmployeeInDB:
     """Add a new employee"""
-    return db.create_one(employee=employee, save=True)
+    created = db.create_one(employee=employee, save=True)
+    response.headers["ETag"] = etag(created.version)
+    return created
 
 
 @router.put(
@@ -84,26 +131,47 @@ async def add_employee(
     summary="Edits the data of an employee, given its lastname.",
     status_code=202,
     response_model=EmployeeInDB,
+    responses={412: {"description": "Employee does not match If-Match header"}},
 )
 async def update_employee(
     _id: str,
     update_data: EmployeeFormUpdate,
+    response: fastapi.Response,
     create: bool = fastapi.Query(False),
+    if_match: typing.Optional[str] = fastapi.Header(None),
     db: EmployeeDatabase = fastapi.Depends(database),
 ) -> EmployeeInDB:
-    """Edits the data of an employee, given its lastname."""
-    return db.update_one({"id": _id}, update_data, create=create, save=True)
+    """Edits the data of an employee, given its lastname.
+
+    When If-Match header is provided, employee is only updated if its ETag matches, and it is never created.
+    """
+    employee = db.update_one(
+        {"id": _id},
+        update_data,
+        create=create,
+        save=True,
+        expected_versions=expected_versions(if_match),
+    )
+    response.headers["ETag"] = etag(employee.version)
+    return employee
 
 
 @router.delete(
     "/{_id}",
     summary="Delete the data of an employee.",
     status_code=204,
-    response_model=None,
+    response_class=fastapi.Response,
+    responses={412: {"description": "Employee does not match If-Match header"}},
 )
 async def delete_employee(
-    _id: str, db: EmployeeDatabase = fastapi.Depends(database)
-) -> None:
-    """Edits the data of an employee, given its lastname."""
-    db.delete_one({"id": _id}, save=True)
-    return None
+    _id: str,
+    if_match: typing.Optional[str] = fastapi.Header(None),
+    db: EmployeeDatabase = fastapi.Depends(database),
+) -> fastapi.Response:
+    """Edits the data of an employee, given its lastname.
+
+    When If-Match header is provided, employee is only deleted if its ETag matches.
+    """
+    db.delete_one({"id": _id}, save=True, expected_versions=expected_versions(if_match))
+    # A 204 response must not have a body
+    return fastapi.Response(status_code=204)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import fastapi
+
+from ..container import AppContainer
+from ..lib.loading import LoadProgress
+from ..routing import AppRoute
+
+# Probes must answer cheaply: they never access the database
+router = fastapi.APIRouter(
+    prefix="/health",
+    tags=["Health"],
+    default_response_class=fastapi.responses.JSONResponse,
+    route_class=AppRoute,
+)
+
+
+@router.get("/live", summary="Liveness probe")
+async def get_liveness() -> Dict[str, Any]:
+    """Always succeed as long as the event loop answers requests"""
+    return {"status": "alive"}
+
+
+@router.get("/ready", summary="Readiness probe")
+async def get_readiness(
+    container: AppContainer = fastapi.Depends(AppContainer.provider),
+) -> fastapi.responses.Response:
+    """Succeed once database is loaded and cache is warm, until application starts exiting"""
+    progress: Optional[LoadProgress] = getattr(
+        container.app.state, "database_load", None
+    )
+    if container.server.should_exit:
+        status = "exiting"
+    elif progress is not None and not progress.ready:
+        status = progress.state
+    else:
+        return fastapi.responses.JSONResponse({"status": "ready"})
+    return fastapi.responses.JSONResponse(
+        {"status": status},
+        status_code=503,
+        headers={"Retry-After": str(container.settings.database.load_retry_after)},
+    )
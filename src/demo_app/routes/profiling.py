@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import typing
+
+import fastapi
+
+from ..hooks import database
+from ..lib import EmployeeDatabase
+from ..lib.memory import (
+    MemoryProfiler,
+    SnapshotNotFoundError,
+    TracingNotStartedError,
+    count_instances,
+    database_summary,
+)
+from ..lib.profiler import ProfilerBusyError, StackSampler
+from ..routing import AppRoute
+from ..settings import AppSettings
+
+# Profiling endpoints are exposed under debug prefix, but can be enabled without enabling debug mode
+router = fastapi.APIRouter(
+    prefix="/debug",
+    tags=["Debug"],
+    default_response_class=fastapi.responses.JSONResponse,
+    route_class=AppRoute,
+)
+
+
+@router.get("/profile", summary="Profile CPU usage of all threads")
+async def get_profile(
+    seconds: float = fastapi.Query(
+        5, gt=0, description="Duration of the profile in seconds"
+    ),
+    format: typing.Literal["collapsed", "speedscope"] = fastapi.Query(
+        "collapsed", description="Collapsed stacks or speedscope JSON"
+    ),
+    settings: AppSettings = fastapi.Depends(AppSettings.provider),
+) -> fastapi.responses.Response:
+    """Sample stacks of all threads during given duration.
+
+    Collapsed stacks can be rendered using flamegraph.pl or inferno. Both formats can be opened using https://www.speedscope.app.
+    Only one profile can run at a time.
+    """
+    if seconds > settings.profiling.max_seconds:
+        raise fastapi.HTTPException(
+            status_code=422,
+            detail=f"Profile duration cannot exceed {settings.profiling.max_seconds} seconds",
+        )
+    sampler = StackSampler(
+        interval=settings.profiling.sample_interval,
+        max_overhead=settings.profiling.max_overhead,
+    )
+    # Sampler must not run on the event loop, else it would only ever sample itself
+    try:
+        profile = await asyncio.get_running_loop().run_in_executor(
+            None, sampler.run, seconds
+        )
+    except ProfilerBusyError as err:
+        raise fastapi.HTTPException(status_code=409, detail=str(err))
+    headers = {
+        "X-Profile-Samples": str(profile.sample_count),
+        "X-Profile-Overhead": f"{profile.overhead:.4f}",
+    }
+    if format == "speedscope":
+        return fastapi.responses.JSONResponse(
+            profile.speedscope(name=f"demo_app ({seconds}s)"), headers=headers
+        )
+    return fastapi.responses.PlainTextResponse(profile.collapsed(), headers=headers)
+
+
+def memory_profiler(request: fastapi.Request) -> MemoryProfiler:
+    """Access the memory profiler of the application. Profiler is created on first access."""
+    state = request.app.state
+    try:
+        return state.memory_profiler  # type: ignore[no-any-return]
+    except AttributeError:
+        settings: AppSettings = state.container.settings
+        profiler = state.memory_profiler = MemoryProfiler(
+            settings.profiling.max_snapshots
+        )
+        return profiler
+
+
+@router.get("/memory", summary="Get memory profiling status")
+async def get_memory_summary(
+    count_objects: bool = fastapi.Query(
+        False,
+        description="Count live EmployeeInDB instances (traverses the whole heap)",
+    ),
+    profiler: MemoryProfiler = fastapi.Depends(memory_profiler),
+    db: EmployeeDatabase = fastapi.Depends(database),
+) -> typing.Dict[str, typing.Any]:
+    """Return tracemalloc status, stored snapshots and a summary of objects held by the database"""
+    summary = profiler.summary()
+    summary["database"] = database_summary(db)
+    if count_objects:
+        summary["objects"] = count_instances()
+    return summary
+
+
+@router.post("/memory/tracemalloc", summary="Start tracing memory allocations")
+async def start_tracemalloc(
+    frames: typing.Optional[int] = fastapi.Query(
+        None, gt=0, description="Number of frames stored per allocation"
+    ),
+    profiler: MemoryProfiler = fastapi.Depends(memory_profiler),
+    settings: AppSettings = fastapi.Depends(AppSettings.provider),
+) -> typing.Dict[str, typing.Any]:
+    """Start tracemalloc. Nothing is done if tracemalloc is already tracing."""
+    profiler.start(frames or settings.profiling.tracemalloc_frames)
+    return profiler.summary()
+
+
+@router.delete("/memory/tracemalloc", summary="Stop tracing memory allocations")
+async def stop_tracemalloc(
+    profiler: MemoryProfiler = fastapi.Depends(memory_profiler),
+) -> typing.Dict[str, typing.Any]:
+    """Stop tracemalloc. Snapshots already taken are kept."""
+    profiler.stop()
+    return profiler.summary()
+
+
+@router.put("/memory/snapshots/{name}", summary="Take a named memory snapshot")
+async def take_memory_snapshot(
+    name: str,
+    profiler: MemoryProfiler = fastapi.Depends(memory_profiler),
+) -> typing.Dict[str, typing.Any]:
+    """Take a snapshot of traced memory allocations, replacing any snapshot with the same name"""
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            None, profiler.take_snapshot, name
+        )
+    except TracingNotStartedError as err:
+        raise fastapi.HTTPException(status_code=409, detail=str(err))
+    return profiler.summary()
+
+
+@router.delete("/memory/snapshots/{name}", summary="Delete a named memory snapshot")
+async def delete_memory_snapshot(
+    name: str,
+    profiler: MemoryProfiler = fastapi.Depends(memory_profiler),
+) -> typing.Dict[str, typing.Any]:
+    """Delete a snapshot"""
+    try:
+        profiler.delete_snapshot(name)
+    except SnapshotNotFoundError as err:
+        raise fastapi.HTTPException(status_code=404, detail=str(err.args[0]))
+    return profiler.summary()
+
+
+@router.get("/memory/diff", summary="Compare two memory snapshots")
+async def get_memory_diff(
+    base: str = fastapi.Query(..., description="Name of the snapshot to compare to"),
+    target: typing.Optional[str] = fastapi.Query(
+        None, description="Name of the compared snapshot. Current memory when omitted."
+    ),
+    group_by: typing.Literal["filename", "lineno", "traceback"] = fastapi.Query(
+        "lineno", description="Group allocations by file, line or traceback"
+    ),
+    limit: int = fastapi.Query(20, gt=0, description="Number of entries returned"),
+    profiler: MemoryProfiler = fastapi.Depends(memory_profiler),
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Return top allocation differences between two snapshots, largest growth first"""
+    try:
+        # Comparing snapshots is expensive, it must not block the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            None, profiler.diff, base, target, group_by, limit
+        )
+    except SnapshotNotFoundError as err:
+        raise fastapi.HTTPException(status_code=404, detail=str(err.args[0]))
+    except TracingNotStartedError as err:
+        raise fastapi.HTTPException(status_code=409, detail=str(err))
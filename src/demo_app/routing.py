@@ -0,0 +1,232 @@
+"""This module provides helpers related to request routing, as well as the route class used by application routers."""
+from __future__ import annotations
+
+import asyncio
+import copy
+import functools
+import types
+import typing
+
+import fastapi
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import get_request_handler
+from starlette.applications import Starlette
+from starlette.exceptions import ExceptionMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .caching import cache_policy, cached_response
+from .lib.timing import current_timer
+
+if typing.TYPE_CHECKING:
+    from .coalescing import RequestCoalescer
+    from .idempotency import IdempotentRequests
+
+# Label used for requests which did not match any route.
+# Raw paths must never be used as labels or keys, else their cardinality is unbounded.
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_path(scope: Scope) -> str:
+    """Return the path template of the route which handled the request (e.g. "/employees/{_id}").
+
+    Routing must be complete before calling this function, I.E, it should be called once response is started.
+    """
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    state = scope["app"].state
+    try:
+        paths: typing.Dict[typing.Any, str] = state.route_paths
+    except AttributeError:
+        # Routes do not change once application is started, so mapping is computed once
+        paths = state.route_paths = _collect_route_paths(scope["app"].routes)
+    return paths.get(endpoint, UNMATCHED_ROUTE)
+
+
+def without_middlewares(app: Starlette) -> ASGIApp:
+    """Return an ASGI application routing requests to application routes without going through user middlewares.
+
+    Requests are neither logged, measured nor limited. Exception handlers and dependencies still apply.
+    It is used to send requests from within the process (E.G, to warm up cache).
+    """
+    # Exception middleware is the innermost middleware wrapping router, it must be kept
+    inner: typing.Any = app.middleware_stack  # type: ignore[has-type]
+    while not isinstance(inner, ExceptionMiddleware):
+        inner = getattr(inner, "app", None)
+        # Middlewares which do not expose wrapped application cannot be skipped
+        if inner is None:
+            return app
+
+    async def handle(scope: Scope, receive: Receive, send: Send) -> None:
+        # Same as Starlette application
+        scope["app"] = app
+        await inner(scope, receive, send)
+
+    return handle
+
+
+def endpoint_code_paths(
+    routes: typing.Iterable[BaseRoute],
+) -> typing.Dict[types.CodeType, str]:
+    """Map code objects of endpoint functions to route path templates.
+
+    It can be used to find which route is running out of a stack frame.
+    """
+    return {
+        code: path
+        for endpoint, path in _collect_route_paths(routes).items()
+        for code in [getattr(endpoint, "__code__", None)]
+        if code is not None
+    }
+
+
+def _collect_route_paths(
+    routes: typing.Iterable[BaseRoute],
+) -> typing.Dict[typing.Any, str]:
+    paths: typing.Dict[typing.Any, str] = {}
+    for route in routes:
+        endpoint = getattr(route, "endpoint", None) or getattr(route, "app", None)
+        path = getattr(route, "path", None)
+        if endpoint is not None and path is not None:
+            paths.setdefault(endpoint, path)
+    return paths
+
+
+class AppRoute(fastapi.routing.APIRoute):
+    """Route class used by application routers.
+
+    When a request timer is attached to current context (see `demo_app.providers.timing`), the route reports:
+
+    - "deps": time spent parsing request and resolving dependencies,
+    - "handler": time spent within endpoint function,
+    - "validation": time spent validating and serializing endpoint return value using response model,
+    - "encode": time spent encoding response body.
+
+    When no timer is attached, the overhead is a context variable lookup for each of those steps.
+
+    When a request coalescer is attached to application state (see `demo_app.providers.coalescing`),
+    identical concurrent requests to coalesced routes share a single response.
+
+    When response cache is enabled (see `demo_app.providers.cache`), responses of endpoints decorated
+    using `demo_app.caching.cache_response` are cached.
+
+    When idempotent requests are attached to application state (see `demo_app.hooks.idempotency`),
+    responses of mutating requests sent with an idempotency key are stored and replayed on retry.
+    """
+
+    def get_route_handler(
+        self,
+    ) -> typing.Callable[[Request], typing.Coroutine[typing.Any, typing.Any, Response]]:
+        dependant = copy.copy(self.dependant)
+        dependant.call = _timed_endpoint(self.dependant.call)  # type: ignore[arg-type]
+        response_class: typing.Type[Response] = (
+            self.response_class.value
+            if isinstance(self.response_class, DefaultPlaceholder)
+            else self.response_class
+        )
+        handler = get_request_handler(
+            dependant=dependant,
+            body_field=self.body_field,
+            status_code=self.status_code,
+            response_class=_timed_response_class(response_class),
+            response_field=self.secure_cloned_response_field,
+            response_model_include=self.response_model_include,
+            response_model_exclude=self.response_model_exclude,
+            response_model_by_alias=self.response_model_by_alias,
+            response_model_exclude_unset=self.response_model_exclude_unset,
+            response_model_exclude_defaults=self.response_model_exclude_defaults,
+            response_model_exclude_none=self.response_model_exclude_none,
+            dependency_overrides_provider=self.dependency_overrides_provider,
+        )
+
+        route = self.path
+        policy = cache_policy(self.endpoint)
+
+        async def coalesced_handler(request: Request) -> Response:
+            coalescer: typing.Optional[RequestCoalescer] = getattr(
+                request.app.state, "coalescer", None
+            )
+            if coalescer is not None and coalescer.accepts(route, request.method):
+                return await coalescer.handle(route, request, handler)
+            return await handler(request)
+
+        async def timed_handler(request: Request) -> Response:
+            timer = current_timer()
+            if timer is not None:
+                timer.reset_lap()
+            idempotency: typing.Optional[IdempotentRequests] = getattr(
+                request.app.state, "idempotency", None
+            )
+            if idempotency is not None and idempotency.accepts(request):
+                return await idempotency.handle(route, request, handler)
+            if policy is not None and request.method == "GET":
+                cache = request.app.state.container.cache
+                if cache.enabled:
+                    return await cached_response(
+                        cache, policy, route, request, coalesced_handler
+                    )
+            return await coalesced_handler(request)
+
+        return timed_handler
+
+
+def _timed_endpoint(
+    call: typing.Callable[..., typing.Any]
+) -> typing.Callable[..., typing.Any]:
+    """Wrap an endpoint function to report time spent before and within endpoint"""
+    if asyncio.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def async_endpoint(**values: typing.Any) -> typing.Any:
+            timer = current_timer()
+            if timer is None:
+                return await call(**values)
+            timer.lap("deps")
+            try:
+                return await call(**values)
+            finally:
+                timer.lap("handler")
+
+        return async_endpoint
+
+    @functools.wraps(call)
+    def endpoint(**values: typing.Any) -> typing.Any:
+        timer = current_timer()
+        if timer is None:
+            return call(**values)
+        timer.lap("deps")
+        try:
+            return call(**values)
+        finally:
+            timer.lap("handler")
+
+    return endpoint
+
+
+# Timed response classes are created once per response class
+_TIMED_RESPONSE_CLASSES: typing.Dict[typing.Type[Response], typing.Type[Response]] = {}
+
+
+def _timed_response_class(
+    response_class: typing.Type[Response],
+) -> typing.Type[Response]:
+    """Create a subclass of a response class reporting time spent encoding response body"""
+    if response_class in _TIMED_RESPONSE_CLASSES:
+        return _TIMED_RESPONSE_CLASSES[response_class]
+
+    def render(self: Response, content: typing.Any) -> bytes:
+        timer = current_timer()
+        if timer is None:
+            return response_class.render(self, content)
+        # Response is created right after response model validation
+        timer.lap("validation")
+        with timer.phase("encode"):
+            return response_class.render(self, content)
+
+    timed_class = _TIMED_RESPONSE_CLASSES[response_class] = type(
+        response_class.__name__, (response_class,), {"render": render}
+    )
+    return timed_class
@@ -43,6 +43,27 @@ class DatabaseSettings(
 
     # Database settings
     path: typing.Union[str, pathlib.Path] = DEMO_DUMP
+    # Flush database dump to disk each time it is saved
+    fsync: bool = False
+    # Directory holding one dump per tenant (E.G, "<tenants_dir>/<tenant>.json").
+    # When None, a single database is opened from path.
+    tenants_dir: typing.Optional[str] = None
+    # Resolve tenant from a request header, or from a path prefix (E.G, "/tenants/<tenant>/employees/")
+    tenant_resolver: typing.Literal["header", "path"] = "header"
+    tenant_header: str = "X-Tenant-ID"
+    tenant_path_prefix: str = "/tenants"
+    # Maximum number of open tenant databases, and maximum estimated memory (in bytes) they hold
+    tenants_max_open: int = 100
+    tenants_max_bytes: int = 1024 * 1024 * 1024
+    # Tenant databases not used for this duration (in seconds) are saved and closed
+    tenants_idle_timeout: float = 600
+    # Interval (in seconds) between two checks of database health
+    monitor_interval: float = 30
+    # Load database in background once server accepts connections, instead of during startup.
+    # Readiness probe and data routes answer 503 until database is loaded and cache is warm.
+    background_load: bool = False
+    # Delay (in seconds) clients should wait before retrying requests received while database is loading
+    load_retry_after: int = 5
 
 
 class ServerSettings(pydantic.BaseSettings, case_sensitive=False, env_prefix="server_"):
@@ -54,12 +75,54 @@ class ServerSettings(pydantic.BaseSettings, case_sensitive=False, env_prefix="se
     root_path: str = ""
     limit_concurrency: typing.Optional[int] = None
     limit_max_requests: typing.Optional[int] = None
+    # Event loop and HTTP parser. "auto" selects uvloop and httptools when they are installed.
+    # Standard implementations (asyncio and h11) are used when requested implementation is not installed.
+    loop: typing.Literal["auto", "asyncio", "uvloop"] = "auto"
+    http: typing.Literal["auto", "h11", "httptools"] = "auto"
+    # Maximum number of connections waiting to be accepted
+    backlog: int = 2048
+    # Close idle keep-alive connections after this duration (in seconds)
+    timeout_keep_alive: int = 5
+    # Maximum size (in bytes) of request line and headers parsed by h11. Ignored by older uvicorn versions.
+    h11_max_incomplete_event_size: int = 16 * 1024
+    # Resident memory (in bytes) above which worker drains in-flight requests and exits. None disables recycling.
+    memory_soft_limit: typing.Optional[int] = None
+    # Resident memory (in bytes) above which worker exits right away, without waiting for in-flight requests
+    memory_hard_limit: typing.Optional[int] = None
+    # Interval (in seconds) between two memory measurements
+    memory_check_interval: float = 10
+    # Maximum random delay (in seconds) before recycling once soft limit is crossed, so workers do not recycle at once
+    memory_recycle_jitter: float = 30
+    # Lock file shared by workers of a host (or pod), so that a single worker recycles at a time
+    memory_recycle_lock_file: typing.Optional[str] = None
 
 
 class LogSettings(pydantic.BaseSettings, case_sensitive=False, env_prefix="log_"):
     # Log settings
     access_log: bool = True
     level: typing.Optional[str] = None
+    # "console" is meant to be read by humans, "json" by log collectors
+    renderer: typing.Literal["console", "json"] = "console"
+    # Render and write log events in a background thread
+    queue_enabled: bool = True
+    # Maximum number of log events waiting to be written
+    queue_max_size: int = 10000
+    # Maximum number of log events written at once
+    queue_batch_size: int = 256
+    # What to do with log events when queue is full
+    queue_drop_policy: typing.Literal["drop_new", "drop_old", "block"] = "drop_new"
+    # Fraction of successful requests written to access log.
+    # Errors and slow requests are always logged.
+    access_log_sample_rate: float = 1.0
+    # Requests slower than this threshold (in seconds) are always logged
+    access_log_slow_threshold: typing.Optional[float] = None
+    # Sample rates overriding default sample rate, keyed by route path (E.G, "/employees/")
+    access_log_route_sample_rates: typing.Dict[str, float] = {}
+    # Maximum number of identical log events per second (0 to disable rate limiting).
+    # Errors and access log events are never rate limited.
+    rate_limit: float = 0
+    # Maximum number of identical log events allowed in a burst
+    rate_limit_burst: int = 10
 
 
 class TelemetrySettings(
@@ -69,8 +132,127 @@ class TelemetrySettings(
     traces_enabled: bool = False
     metrics_enabled: bool = False
     metrics_path: str = "/metrics"
+    # "native" does not require any extra dependency, "prometheus" requires telemetry extras
+    metrics_provider: typing.Literal["native", "prometheus"] = "native"
     ignore_path: str = "metrics,docs,openapi.json"
     traces_exporter: typing.Literal["otlp", "console"] = "console"
+    # Ratio of traces sampled. Child spans follow the decision of their parent.
+    traces_sample_ratio: float = 1.0
+    # Sample ratios overriding default ratio, keyed by route path (E.G, "/employees/")
+    traces_route_sample_ratios: typing.Dict[str, float] = {}
+    # Export traces of failed requests even when they are not sampled.
+    # Unsampled requests are then recorded (but not exported), which costs more CPU.
+    traces_always_sample_errors: bool = False
+    # Export traces of requests slower than this threshold (in seconds) even when they are not sampled.
+    # Unsampled requests are then recorded (but not exported), which costs more CPU.
+    traces_slow_threshold: typing.Optional[float] = None
+    # Batch span processor parameters. When None, OTEL_BSP_* environment variables or SDK defaults are used.
+    traces_max_queue_size: typing.Optional[int] = None
+    traces_max_export_batch_size: typing.Optional[int] = None
+    traces_schedule_delay_millis: typing.Optional[float] = None
+    traces_export_timeout_millis: typing.Optional[float] = None
+    # Add a Server-Timing header (and an access log field) holding a breakdown of request processing time
+    server_timing_enabled: bool = False
+    # Measure event loop lag and report what blocks the event loop
+    loop_monitor_enabled: bool = False
+    # Interval (in seconds) between two event loop lag measurements
+    loop_monitor_interval: float = 0.25
+    # Event loop lag (in seconds) above which offending callback and route are logged
+    loop_lag_threshold: float = 0.1
+    # Enable asyncio debug mode to log callbacks running longer than this duration (in seconds).
+    # Asyncio debug mode has a significant CPU cost, it should not be enabled in production.
+    loop_slow_callback_duration: typing.Optional[float] = None
+
+
+class ProfilingSettings(
+    pydantic.BaseSettings, case_sensitive=False, env_prefix="profiling_"
+):
+    # Expose profiling endpoints even when debug mode is disabled
+    enabled: bool = False
+    # Interval (in seconds) between two stack samples
+    sample_interval: float = 0.01
+    # Maximum fraction of time spent taking stack samples
+    max_overhead: float = 0.1
+    # Maximum duration (in seconds) of a single profile
+    max_seconds: float = 60
+    # Number of frames stored per memory allocation when tracemalloc is started
+    tracemalloc_frames: int = 1
+    # Maximum number of tracemalloc snapshots kept in memory
+    max_snapshots: int = 10
+
+
+class LimiterSettings(
+    pydantic.BaseSettings, case_sensitive=False, env_prefix="limiter_"
+):
+    # Shed requests exceeding an adaptive concurrency limit with 503 responses
+    enabled: bool = False
+    # "aimd" lowers limit when latency exceeds a threshold, "gradient" when latency grows compared to its long-term average
+    algorithm: typing.Literal["aimd", "gradient"] = "gradient"
+    # Limit used until enough requests are observed, and its bounds
+    initial_limit: int = 20
+    min_limit: int = 1
+    max_limit: int = 1000
+    # Latency (in seconds) above which limit is lowered ("aimd" only)
+    latency_threshold: float = 0.1
+    # Ratio applied to limit when it is lowered ("aimd" only)
+    backoff_ratio: float = 0.9
+    # Ratio of short-term over long-term latency tolerated before limit is lowered ("gradient" only)
+    tolerance: float = 1.5
+    # Fraction of the limit available to low priority requests
+    low_priority_ratio: float = 0.5
+    # Priorities keyed by path prefix. Critical requests are always admitted, low priority requests are shed first.
+    route_priorities: typing.Dict[str, typing.Literal["critical", "normal", "low"]] = {
+        "/health": "critical",
+        "/metrics": "critical",
+        "/debug": "low",
+    }
+    # Value of the Retry-After header (in seconds) of shed requests
+    retry_after: int = 1
+
+
+class CacheSettings(pydantic.BaseSettings, case_sensitive=False, env_prefix="cache_"):
+    # Cache responses of routes decorated using `demo_app.caching.cache_response`
+    enabled: bool = False
+    # Maximum total size (in bytes) of cached responses. Least recently used responses are evicted first.
+    max_bytes: int = 64 * 1024 * 1024
+    # Time to live (in seconds) of cached responses, unless route specifies its own. None means forever.
+    default_ttl: typing.Optional[float] = 60
+    # Path templates of GET routes whose identical concurrent requests share a single response.
+    # Requests are identical when path, query string and database version are equal.
+    coalesce_routes: typing.List[str] = [
+        "/employees/",
+        "/employees/lastnames",
+        "/employees/lastnames/{lastname}",
+    ]
+    # Paths requested once database is loaded, before application reports ready
+    warmup_paths: typing.List[str] = ["/employees/", "/employees/lastnames"]
+
+
+class IdempotencySettings(
+    pydantic.BaseSettings, case_sensitive=False, env_prefix="idempotency_"
+):
+    # Store responses of mutating requests sent with an idempotency key, and replay them on retry.
+    # Disabled by default, since stored responses are written to a file.
+    enabled: bool = False
+    header: str = "Idempotency-Key"
+    # Maximum number of stored responses. Oldest responses are evicted first.
+    max_entries: int = 10000
+    # Time to live (in seconds) of stored responses
+    ttl: float = 24 * 60 * 60
+    # Append-only file holding stored responses, written each time a response is stored.
+    # Defaults to "<database path>.idempotency", or "<tenants_dir>/.idempotency" when tenants are enabled.
+    path: typing.Optional[str] = None
+
+
+class ExecutorSettings(
+    pydantic.BaseSettings, case_sensitive=False, env_prefix="executors_"
+):
+    # Named thread pools and their number of workers, used to run blocking work (E.G, reading files)
+    threads: typing.Dict[str, int] = {"default": 8}
+    # Named process pools and their number of workers, used to run CPU bound work. No process is started when empty.
+    processes: typing.Dict[str, int] = {}
+    # Start method of process workers. Platform default is used when None.
+    start_method: typing.Optional[typing.Literal["fork", "forkserver", "spawn"]] = None
 
 
 class OTLPSettings(pydantic.BaseSettings, env_prefix="otlp_"):
@@ -100,6 +282,13 @@ class AppSettings(
     server: ServerSettings = pydantic.Field(default_factory=ServerSettings)
     telemetry: TelemetrySettings = pydantic.Field(default_factory=TelemetrySettings)
     otlp: OTLPSettings = pydantic.Field(default_factory=OTLPSettings)
+    profiling: ProfilingSettings = pydantic.Field(default_factory=ProfilingSettings)
+    limiter: LimiterSettings = pydantic.Field(default_factory=LimiterSettings)
+    cache: CacheSettings = pydantic.Field(default_factory=CacheSettings)
+    idempotency: IdempotencySettings = pydantic.Field(
+        default_factory=IdempotencySettings
+    )
+    executors: ExecutorSettings = pydantic.Field(default_factory=ExecutorSettings)
 
     @classmethod
     def from_config_file(
@@ -113,7 +302,7 @@ def from_config_file(
         Those settings will take precedence over both environment and file settings.
         """
         files_settings = (
-            ConfigFilesSettings(path=config_file)
+            ConfigFilesSettings(path=str(config_file))
             if config_file
             else ConfigFilesSettings()
         )
@@ -0,0 +1,141 @@
+import asyncio
+import pathlib
+import shutil
+import typing
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from demo_app.bench import ASGIClient
+from demo_app.caching import CachePolicy, StoredResponse, cached_response, tenant_tags
+from demo_app.entrypoint import create_container
+from demo_app.lib.cache import ResponseCache
+from demo_app.settings import AppSettings
+
+DATA = pathlib.Path(__file__).parent.parent / "src/demo_app/data/data_management.json"
+
+
+def test_least_recently_used_entries_are_evicted_by_size() -> None:
+    cache: ResponseCache[str] = ResponseCache(max_bytes=10)
+    assert cache.set("a", "a", 4)
+    assert cache.set("b", "b", 4)
+    # "a" becomes most recently used, so "b" is evicted first
+    assert cache.get("a") == "a"
+    assert cache.set("c", "c", 4)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("a", None, "c")
+    assert cache.size == 8
+    # Values larger than the budget are never stored
+    assert not cache.set("d", "d", 11)
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_time_to_live() -> None:
+    now = 0.0
+    cache: ResponseCache[str] = ResponseCache(
+        max_bytes=100, default_ttl=10, clock=lambda: now
+    )
+    cache.set("default", "default", 1)
+    cache.set("short", "short", 1, ttl=1)
+    now = 1
+    assert cache.get("short") is None
+    assert cache.get("default") == "default"
+    now = 10
+    assert cache.get("default") is None
+    assert (len(cache), cache.size) == (0, 0)
+
+
+def test_prefix_tags_invalidate_all_matching_tags() -> None:
+    cache: ResponseCache[str] = ResponseCache(max_bytes=100)
+    cache.set("all", "all", 1, tags=["employees:all"])
+    cache.set("lastnames", "lastnames", 1, tags=["employees:lastnames"])
+    cache.set("other", "other", 1, tags=["teams:all"])
+    generation = cache.generation
+    assert cache.invalidate(["employees:*"]) == 2
+    assert cache.generation == generation + 1
+    assert (cache.get("all"), cache.get("lastnames")) == (None, None)
+    assert cache.get("other") == "other"
+    assert cache.invalidate(["employees:all"]) == 0
+
+
+def make_request(path: str, tenant: typing.Optional[str] = None) -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [],
+        "path_params": {},
+        "state": {} if tenant is None else {"tenant": tenant},
+    }
+    return Request(scope)
+
+
+def test_response_computed_during_invalidation_is_not_stored() -> None:
+    cache: ResponseCache[StoredResponse] = ResponseCache(max_bytes=10_000)
+    policy = CachePolicy(tags=("employees:all",))
+
+    async def handler(request: Request) -> Response:
+        # Employees are modified while response is computed
+        cache.invalidate(["employees:all"])
+        return JSONResponse(["stale"])
+
+    async def scenario() -> Response:
+        return await cached_response(
+            cache, policy, "/employees/", make_request("/employees/"), handler
+        )
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert len(cache) == 0
+
+
+def test_tags_are_scoped_to_tenants() -> None:
+    cache: ResponseCache[StoredResponse] = ResponseCache(max_bytes=10_000)
+    policy = CachePolicy(tags=("employees:all",))
+
+    async def handler(request: Request) -> Response:
+        return JSONResponse([])
+
+    async def scenario() -> None:
+        for tenant in ["acme", "globex"]:
+            request = make_request("/employees/", tenant)
+            await cached_response(cache, policy, "/employees/", request, handler)
+
+    asyncio.run(scenario())
+    assert len(cache) == 2
+    assert tenant_tags("acme", ["employees:*"]) == ["tenant:acme:employees:*"]
+    assert cache.invalidate(tenant_tags("acme", ["employees:*"])) == 1
+    assert cache.get(("globex", "/employees/", b"")) is not None
+
+
+def test_modified_tenant_does_not_invalidate_other_tenants(
+    tmp_path: pathlib.Path,
+) -> None:
+    for tenant in ["acme", "globex"]:
+        shutil.copy(DATA, tmp_path / f"{tenant}.json")
+    container = create_container(
+        AppSettings.parse_obj(
+            {
+                "database": {"tenants_dir": str(tmp_path), "tenant_resolver": "path"},
+                "cache": {"enabled": True, "warmup_paths": []},
+                "logging": {"access_log": False},
+            }
+        )
+    )
+
+    async def scenario() -> None:
+        async with ASGIClient(container.app) as client:
+            for tenant in ["acme", "globex"]:
+                await client.get(f"/tenants/{tenant}/employees/")
+            assert len(container.cache) == 2
+            created = await client.post(
+                "/tenants/acme/employees/",
+                json_body={"lastname": "Doe", "firstname": "Jane", "team": "ops"},
+            )
+            assert created.status_code == 202
+            assert container.cache.get(("acme", "/employees/", b"")) is None
+            assert container.cache.get(("globex", "/employees/", b"")) is not None
+            employees = await client.get("/tenants/acme/employees/")
+            assert len(employees.json()) == 5
+
+    asyncio.run(scenario())
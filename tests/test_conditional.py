@@ -0,0 +1,124 @@
+import asyncio
+import pathlib
+import shutil
+import typing
+
+import pytest
+
+from demo_app.bench import ASGIClient
+from demo_app.conditional import etag, expected_versions
+from demo_app.entrypoint import create_container
+from demo_app.lib.database import ANY_VERSION
+from demo_app.settings import AppSettings
+
+DATA = pathlib.Path(__file__).parent.parent / "src/demo_app/data/data_management.json"
+EMPLOYEE_ID = "6252192d21e66410c23faf36"
+
+
+def test_if_match_header_is_parsed_into_versions() -> None:
+    assert expected_versions(None) is None
+    assert expected_versions("*") is ANY_VERSION
+    assert expected_versions('"1", "3"') == {1, 3}
+    # Weak and unparsable tags never match
+    assert expected_versions('W/"1", "x", ""') == set()
+    assert etag(3) == '"3"'
+
+
+@pytest.fixture
+def client_app(tmp_path: pathlib.Path) -> typing.Any:
+    shutil.copy(DATA, tmp_path / "db.json")
+    container = create_container(
+        AppSettings.parse_obj(
+            {
+                "database": {"path": str(tmp_path / "db.json")},
+                "logging": {"access_log": False},
+            }
+        )
+    )
+    return container.app
+
+
+def run(app: typing.Any, scenario: typing.Callable[[ASGIClient], typing.Any]) -> None:
+    async def main() -> None:
+        async with ASGIClient(app) as client:
+            await scenario(client)
+
+    asyncio.run(main())
+
+
+def test_update_bumps_version(client_app: typing.Any) -> None:
+    async def scenario(client: ASGIClient) -> None:
+        updated = await client.put(
+            f"/employees/{EMPLOYEE_ID}",
+            json_body={"team": "ops"},
+            headers={"If-Match": '"1"'},
+        )
+        assert updated.status_code == 202
+        assert updated.header("ETag") == '"2"'
+        assert updated.json()["version"] == 2
+        assert updated.json()["team"] == "ops"
+
+    run(client_app, scenario)
+
+
+def test_stale_if_match_is_rejected_with_current_etag(client_app: typing.Any) -> None:
+    async def scenario(client: ASGIClient) -> None:
+        path = f"/employees/{EMPLOYEE_ID}"
+        first = await client.put(
+            path, json_body={"team": "ops"}, headers={"If-Match": '"1"'}
+        )
+        assert first.status_code == 202
+        # Second client still holds the version read before first update
+        stale = await client.put(
+            path, json_body={"team": "dev"}, headers={"If-Match": '"1"'}
+        )
+        assert stale.status_code == 412
+        assert stale.header("ETag") == '"2"'
+        deleted = await client.delete(path, headers={"If-Match": '"1"'})
+        assert deleted.status_code == 412
+        employee = await client.get("/employees/lastnames/Robert")
+        assert employee.json()["team"] == "ops"
+
+    run(client_app, scenario)
+
+
+def test_if_match_any_matches_existing_employee(client_app: typing.Any) -> None:
+    async def scenario(client: ASGIClient) -> None:
+        updated = await client.put(
+            f"/employees/{EMPLOYEE_ID}",
+            json_body={"team": "ops"},
+            headers={"If-Match": "*"},
+        )
+        assert updated.status_code == 202
+        assert updated.header("ETag") == '"2"'
+
+    run(client_app, scenario)
+
+
+def test_conditional_update_never_creates_employee(client_app: typing.Any) -> None:
+    async def scenario(client: ASGIClient) -> None:
+        for if_match in ["*", '"1"']:
+            response = await client.put(
+                "/employees/missing",
+                query_string="create=true",
+                json_body={"lastname": "Doe", "firstname": "Jane", "team": "ops"},
+                headers={"If-Match": if_match},
+            )
+            assert response.status_code == 412
+            assert response.header("ETag") is None
+        employees = await client.get("/employees/")
+        assert len(employees.json()) == 4
+
+    run(client_app, scenario)
+
+
+def test_delete_returns_empty_response(client_app: typing.Any) -> None:
+    async def scenario(client: ASGIClient) -> None:
+        path = f"/employees/{EMPLOYEE_ID}"
+        deleted = await client.delete(path, headers={"If-Match": '"1"'})
+        assert deleted.status_code == 204
+        assert deleted.body == b""
+        missing = await client.delete(path)
+        assert missing.status_code == 404
+
+    run(client_app, scenario)
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import pathlib
+import shutil
+import typing
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from demo_app.bench import ASGIClient
+from demo_app.entrypoint import create_container
+from demo_app.idempotency import IdempotentRequests
+from demo_app.lib.errors import IdempotencyKeyError
+from demo_app.lib.idempotency import IdempotencyStore
+from demo_app.settings import AppSettings
+
+DATA = pathlib.Path(__file__).parent.parent / "src/demo_app/data/data_management.json"
+EMPLOYEE = {"lastname": "Doe", "firstname": "Jane", "team": "ops"}
+
+
+def make_request(body: bytes = b"{}", key: str = "key") -> Request:
+    sent = False
+
+    async def receive() -> typing.Dict[str, typing.Any]:
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/employees/",
+        "query_string": b"",
+        "headers": [(b"idempotency-key", key.encode())],
+    }
+    return Request(scope, receive)
+
+
+def test_stored_responses_are_replayed(tmp_path: pathlib.Path) -> None:
+    shutil.copy(DATA, tmp_path / "db.json")
+    container = create_container(
+        AppSettings.parse_obj(
+            {
+                "database": {"path": str(tmp_path / "db.json")},
+                "idempotency": {"enabled": True},
+                "logging": {"access_log": False},
+            }
+        )
+    )
+
+    async def scenario() -> None:
+        async with ASGIClient(container.app) as client:
+            headers = {"Idempotency-Key": "create-jane"}
+            first = await client.post(
+                "/employees/", json_body=EMPLOYEE, headers=headers
+            )
+            retry = await client.post(
+                "/employees/", json_body=EMPLOYEE, headers=headers
+            )
+            assert first.header("Idempotent-Replayed") is None
+            assert retry.header("Idempotent-Replayed") == "true"
+            assert (retry.status_code, retry.body) == (first.status_code, first.body)
+            reused = await client.post(
+                "/employees/", json_body={**EMPLOYEE, "team": "dev"}, headers=headers
+            )
+            assert reused.status_code == 422
+            employees = await client.get("/employees/")
+            assert len(employees.json()) == 5
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_requests_with_same_key_execute_handler_once(
+    tmp_path: pathlib.Path,
+) -> None:
+    requests = IdempotentRequests(IdempotencyStore(tmp_path / "store"))
+    calls = 0
+
+    async def handler(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return JSONResponse({"calls": calls}, status_code=201)
+
+    async def scenario() -> typing.List[Response]:
+        return list(
+            await asyncio.gather(
+                *(
+                    requests.handle("/employees/", make_request(), handler)
+                    for _ in range(5)
+                )
+            )
+        )
+
+    responses = asyncio.run(scenario())
+    assert calls == 1
+    assert {response.body for response in responses} == {b'{"calls":1}'}
+    assert len(requests.store) == 1
+
+
+def test_key_reused_for_another_request_is_rejected(tmp_path: pathlib.Path) -> None:
+    requests = IdempotentRequests(IdempotencyStore(tmp_path / "store"))
+
+    async def handler(request: Request) -> Response:
+        return Response(status_code=204)
+
+    async def scenario() -> None:
+        await requests.handle("/employees/", make_request(b"{}"), handler)
+        with pytest.raises(IdempotencyKeyError):
+            await requests.handle("/employees/", make_request(b'{"a":1}'), handler)
+
+    asyncio.run(scenario())
+
+
+def test_server_errors_and_raised_errors_are_not_stored(
+    tmp_path: pathlib.Path,
+) -> None:
+    requests = IdempotentRequests(IdempotencyStore(tmp_path / "store"))
+    calls = 0
+
+    async def failing(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        return Response(status_code=503)
+
+    async def raising(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        raise ValueError("boom")
+
+    async def scenario() -> None:
+        for _ in range(2):
+            response = await requests.handle("/employees/", make_request(), failing)
+            assert response.status_code == 503
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await requests.handle("/employees/", make_request(key="other"), raising)
+
+    asyncio.run(scenario())
+    assert calls == 4
+    assert len(requests.store) == 0
+    assert not (tmp_path / "store").exists()
+
+
+def put(store: IdempotencyStore, key: str) -> None:
+    store.put((None, key), 200, [("content-type", "text/plain")], key.encode(), key)
+
+
+def test_results_expire_and_oldest_results_are_evicted(
+    tmp_path: pathlib.Path,
+) -> None:
+    now = 0.0
+    store = IdempotencyStore(
+        tmp_path / "store", max_entries=2, ttl=10, clock=lambda: now
+    )
+    put(store, "a")
+    now = 5
+    put(store, "b")
+    put(store, "c")
+    # Oldest result is evicted once store holds too many results
+    assert store.get((None, "a")) is None
+    assert store.get((None, "b")) is not None
+    now = 15
+    # Results expire once their time to live elapsed
+    assert store.get((None, "b")) is None
+    now = 14.9
+    assert store.get((None, "c")) is not None
+
+
+def test_load_skips_truncated_last_line(tmp_path: pathlib.Path) -> None:
+    store = IdempotencyStore(tmp_path / "store")
+    put(store, "a")
+    put(store, "b")
+    store.append(store.unwritten)
+    with open(tmp_path / "store", "ab") as store_file:
+        store_file.write(b'{"tenant": null, "key": "c", "status_')
+
+    loaded = IdempotencyStore(tmp_path / "store")
+    assert loaded.load() == 2
+    stored = loaded.get((None, "b"))
+    assert stored is not None and stored.body == b"b"
+    # File is compacted on load, so truncated line is gone
+    lines = (tmp_path / "store").read_bytes().splitlines()
+    assert [json.loads(line)["key"] for line in lines] == ["a", "b"]
+
+
+def test_file_is_compacted_once_it_holds_too_many_lines(
+    tmp_path: pathlib.Path,
+) -> None:
+    store = IdempotencyStore(tmp_path / "store", max_entries=2)
+    requests = IdempotentRequests(store)
+
+    def lines() -> int:
+        return len((tmp_path / "store").read_bytes().splitlines())
+
+    async def scenario() -> typing.List[int]:
+        counts = []
+        for key in "abcdef":
+            put(store, key)
+            await requests.persist()
+            counts.append(lines())
+        return counts
+
+    # Results are appended until file would hold more than twice the maximum number of results
+    assert asyncio.run(scenario()) == [1, 2, 3, 4, 2, 3]
+    assert store.logged == 3
+    loaded = IdempotencyStore(tmp_path / "store", max_entries=2)
+    assert loaded.load() == 2
+    assert loaded.get((None, "f")) is not None
+
+
+def test_request_retried_after_cancelled_request_is_executed(
+    tmp_path: pathlib.Path,
+) -> None:
+    requests = IdempotentRequests(IdempotencyStore(tmp_path / "store"))
+    calls = 0
+
+    async def handler(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return Response(status_code=204)
+
+    async def scenario() -> Response:
+        first = asyncio.create_task(
+            requests.handle("/employees/", make_request(), handler)
+        )
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        # Client retries before cancelled handler is done
+        return await requests.handle("/employees/", make_request(), handler)
+
+    assert asyncio.run(scenario()).status_code == 204
+    assert calls == 2
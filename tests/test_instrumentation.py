@@ -0,0 +1,63 @@
+import pathlib
+import shutil
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry import trace  # noqa: E402
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (  # noqa: E402
+    InMemorySpanExporter,
+)
+
+from demo_app.lib import EmployeeDatabase  # noqa: E402
+from demo_app.lib.instrumentation import TelemetryDatabaseInstrument  # noqa: E402
+from demo_app.lib.metrics import MetricsRegistry  # noqa: E402
+
+DATA = pathlib.Path(__file__).parent.parent / "src/demo_app/data/data_management.json"
+
+
+def test_nested_operation_spans_are_children_of_calling_operation(
+    tmp_path: pathlib.Path,
+) -> None:
+    shutil.copy(DATA, tmp_path / "db.json")
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer(__name__)
+    database = EmployeeDatabase(
+        tmp_path / "db.json",
+        instrument=TelemetryDatabaseInstrument(MetricsRegistry(), tracer),
+    )
+    exporter.clear()
+
+    with tracer.start_as_current_span("/employees/") as request:
+        database.find_one(lastname="Robert")
+        # Operation span is no longer current once operation is done
+        assert trace.get_current_span() is request
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    find_one = spans["EmployeeDatabase.find_one"]
+    assert find_one.parent is not None
+    assert find_one.parent.span_id == request.get_span_context().span_id
+    filter_span = spans["EmployeeDatabase.filter"]
+    assert filter_span.parent is not None
+    assert filter_span.parent.span_id == find_one.context.span_id
+
+
+def test_generator_operations_do_not_leak_their_span(tmp_path: pathlib.Path) -> None:
+    shutil.copy(DATA, tmp_path / "db.json")
+    provider = TracerProvider()
+    database = EmployeeDatabase(
+        tmp_path / "db.json",
+        instrument=TelemetryDatabaseInstrument(
+            MetricsRegistry(), provider.get_tracer(__name__)
+        ),
+    )
+    employees = database.filter()
+    next(employees)
+    # Consumer of a suspended generator does not run within the generator span
+    assert not trace.get_current_span().get_span_context().is_valid
+    employees.close()
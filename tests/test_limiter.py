@@ -0,0 +1,123 @@
+import asyncio
+import pathlib
+import shutil
+import typing
+
+from demo_app.bench import ASGIClient
+from demo_app.entrypoint import create_container
+from demo_app.lib.limiter import AIMDLimit, ConcurrencyLimiter, GradientLimit
+from demo_app.lib.metrics import MetricsRegistry
+from demo_app.providers.limiter import ConcurrencyLimitMiddleware
+from demo_app.settings import AppSettings
+
+DATA = pathlib.Path(__file__).parent.parent / "src/demo_app/data/data_management.json"
+
+
+def test_aimd_limit_is_raised_below_threshold_and_lowered_above() -> None:
+    algorithm = AIMDLimit(
+        initial_limit=10, max_limit=12, latency_threshold=0.1, backoff_ratio=0.5
+    )
+    for _ in range(5):
+        algorithm.update(0.01, in_flight=10)
+    assert algorithm.limit == 12
+    algorithm.update(0.2, in_flight=10)
+    assert algorithm.limit == 6
+    for _ in range(5):
+        algorithm.update(0.2, in_flight=10)
+    assert algorithm.limit == 1
+
+
+def test_aimd_limit_is_not_raised_while_unused() -> None:
+    algorithm = AIMDLimit(initial_limit=10)
+    for _ in range(5):
+        algorithm.update(0.01, in_flight=1)
+    assert algorithm.limit == 10
+
+
+def test_gradient_limit_is_raised_while_latency_is_stable() -> None:
+    algorithm = GradientLimit(initial_limit=10, max_limit=100)
+    for _ in range(20):
+        algorithm.update(0.01, in_flight=int(algorithm.limit))
+    assert 10 < algorithm.limit <= 100
+
+
+def test_gradient_limit_is_lowered_when_latency_grows() -> None:
+    algorithm = GradientLimit(initial_limit=50, tolerance=1.5)
+    for _ in range(100):
+        algorithm.update(0.01, in_flight=int(algorithm.limit))
+    limit = algorithm.limit
+    for _ in range(20):
+        algorithm.update(0.1, in_flight=int(algorithm.limit))
+    assert algorithm.limit < limit
+
+
+def test_critical_requests_are_always_admitted() -> None:
+    limiter = ConcurrencyLimiter(AIMDLimit(initial_limit=2))
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire("normal")
+    assert limiter.try_acquire("critical")
+    assert limiter.in_flight == 3
+
+
+def test_low_priority_requests_are_shed_first() -> None:
+    limiter = ConcurrencyLimiter(AIMDLimit(initial_limit=4), low_priority_ratio=0.5)
+    assert limiter.try_acquire("low") and limiter.try_acquire("low")
+    # Low priority requests may only use half of the limit
+    assert not limiter.try_acquire("low")
+    assert limiter.try_acquire("normal") and limiter.try_acquire("normal")
+    assert not limiter.try_acquire("normal")
+    limiter.release(None)
+    assert limiter.in_flight == 3
+    assert not limiter.try_acquire("low")
+    assert limiter.try_acquire("normal")
+
+
+def test_priority_of_longest_matching_prefix_is_used() -> None:
+    async def app(scope: typing.Any, receive: typing.Any, send: typing.Any) -> None:
+        pass
+
+    middleware = ConcurrencyLimitMiddleware(
+        app,
+        ConcurrencyLimiter(AIMDLimit()),
+        MetricsRegistry(),
+        route_priorities={"/employees": "low", "/employees/lastnames": "critical"},
+    )
+    # Scope of a request whose tenant prefix was stripped by tenant middleware
+    scope = {"path": "/employees/lastnames", "root_path": "/tenants/acme"}
+    assert middleware.priority(scope) == "critical"
+    assert middleware.priority({**scope, "path": "/employees/"}) == "low"
+    assert middleware.priority({**scope, "path": "/health/live"}) == "normal"
+    # Path still containing root path is matched without it
+    scope = {"path": "/api/employees/", "root_path": "/api"}
+    assert middleware.priority(scope) == "low"
+
+
+def test_shed_requests_are_rejected_with_retry_after(tmp_path: pathlib.Path) -> None:
+    shutil.copy(DATA, tmp_path / "acme.json")
+    container = create_container(
+        AppSettings.parse_obj(
+            {
+                "database": {"tenants_dir": str(tmp_path), "tenant_resolver": "path"},
+                "limiter": {"enabled": True, "initial_limit": 2, "retry_after": 5},
+                "logging": {"access_log": False},
+            }
+        )
+    )
+    limiter: ConcurrencyLimiter = container.app.state.limiter
+
+    async def scenario() -> None:
+        async with ASGIClient(container.app) as client:
+            # Limiter is saturated by requests in flight
+            limiter.in_flight = limiter.limit
+            shed = await client.get("/tenants/acme/employees/")
+            assert shed.status_code == 503
+            assert shed.header("Retry-After") == "5"
+            # Health probes are critical once tenant prefix is stripped
+            live = await client.get("/tenants/acme/health/live")
+            assert live.status_code == 200
+            limiter.in_flight = 0
+            admitted = await client.get("/tenants/acme/employees/")
+            assert admitted.status_code == 200
+            assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import pathlib
+import shutil
+import typing
+
+import pytest
+import structlog
+
+from demo_app.bench import ASGIClient
+from demo_app.entrypoint import create_container
+from demo_app.providers.logger._sampling import AccessLogSampler, RateLimiter
+from demo_app.settings import AppSettings
+
+DATA = pathlib.Path(__file__).parent.parent / "src/demo_app/data/data_management.json"
+
+
+def test_cached_loggers_write_to_sink_of_latest_container(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    shutil.copy(DATA, tmp_path / "db.json")
+    settings = AppSettings.parse_obj(
+        {
+            "database": {"path": str(tmp_path / "db.json")},
+            "logging": {"renderer": "json", "queue_enabled": True},
+        }
+    )
+    first = create_container(settings)
+    # Logger is cached on first use, while first container sink is configured
+    logger = structlog.get_logger()
+    logger.info("first event")
+    first.app.state.log_sink.flush()
+
+    second = create_container(settings)
+    logger.info("second event")
+    structlog.get_logger().info("third event")
+    second.app.state.log_sink.flush()
+
+    output = capsys.readouterr().out
+    assert "first event" in output
+    assert "second event" in output
+    assert "third event" in output
+
+
+def test_successful_requests_are_sampled() -> None:
+    sampler = AccessLogSampler(sample_rate=0.1, route_sample_rates={"/health/live": 0})
+    rates = [sampler.sample("/employees/", 200, 0.001) for _ in range(10000)]
+    kept = [rate for rate in rates if rate is not None]
+    assert set(kept) == {0.1}
+    # Kept events weigh 1 / sample rate, allow 5 standard deviations
+    assert abs(len(kept) - 1000) <= 5 * (10000 * 0.1 * 0.9) ** 0.5
+    assert sampler.sample("/health/live", 200, 0.001) is None
+    assert AccessLogSampler().sample("/employees/", 200, 0.001) == 1.0
+
+
+def test_errors_and_slow_requests_are_always_logged() -> None:
+    sampler = AccessLogSampler(sample_rate=0, slow_threshold=0.5)
+    assert sampler.sample("/employees/", 200, 0.001) is None
+    assert sampler.sample("/employees/", 404, 0.001) == 1.0
+    assert sampler.sample("/employees/", 500, 0.001) == 1.0
+    assert sampler.sample("/employees/", 200, 0.5) == 1.0
+
+
+def test_access_log_events_hold_sample_rate(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    shutil.copy(DATA, tmp_path / "db.json")
+    container = create_container(
+        AppSettings.parse_obj(
+            {
+                "database": {"path": str(tmp_path / "db.json")},
+                "logging": {"renderer": "json", "access_log_sample_rate": 0},
+            }
+        )
+    )
+
+    async def scenario() -> None:
+        async with ASGIClient(container.app) as client:
+            capsys.readouterr()
+            await client.get("/employees/")
+            await client.get("/employees/lastnames/Unknown")
+
+    asyncio.run(scenario())
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    access = [event for event in events if "status_code" in event]
+    assert [event["status_code"] for event in access] == [404]
+    assert access[0]["sample_rate"] == 1.0
+
+
+def log(
+    limiter: RateLimiter, event: str, method: str = "info", **fields: typing.Any
+) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    try:
+        return dict(limiter(None, method, {"event": event, **fields}))
+    except structlog.DropEvent:
+        return None
+
+
+def test_repeated_events_are_rate_limited() -> None:
+    limiter = RateLimiter(rate=0.001, burst=2)
+    assert [log(limiter, "event") is not None for _ in range(4)] == [
+        True,
+        True,
+        False,
+        False,
+    ]
+    # Errors and access log events are never dropped
+    assert log(limiter, "event", "error") is not None
+    assert log(limiter, "GET - /", sample_rate=1.0) is not None
+    assert len(limiter._buckets) == 1
+    # Suppressed events are counted on next event let through
+    limiter._buckets[("info", "event")][0] = 1
+    assert log(limiter, "event") == {"event": "event", "suppressed": 2}
+
+
+def test_least_recently_used_buckets_are_evicted() -> None:
+    limiter = RateLimiter(rate=0.001, burst=1, max_keys=2)
+    assert log(limiter, "hot") is not None
+    log(limiter, "cold")
+    # "hot" becomes most recently used, so "cold" is evicted first
+    assert log(limiter, "hot") is None
+    log(limiter, "new")
+    assert list(limiter._buckets) == [("info", "hot"), ("info", "new")]
+    # Limited event stays limited
+    assert log(limiter, "hot") is None
@@ -0,0 +1,90 @@
+import asyncio
+import pathlib
+import shutil
+import threading
+
+from demo_app.bench import ASGIClient
+from demo_app.entrypoint import create_container
+from demo_app.lib.metrics import MetricsRegistry, NullRegistry
+from demo_app.settings import AppSettings
+
+DATA = pathlib.Path(__file__).parent.parent / "src/demo_app/data/data_management.json"
+
+
+def test_metrics_are_rendered_using_prometheus_text_format() -> None:
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Number of\nrequests", ("path",)).labels(
+        'a"b\\c'
+    ).inc(2)
+    registry.gauge("in_flight", "Requests in flight").labels().set_function(lambda: 3)
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    for value in (0.1, 0.5, 2):
+        latency.labels().observe(value)
+    assert registry.render() == (
+        "# HELP requests_total Number of\\nrequests\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{path="a\\"b\\\\c"} 2\n'
+        "# HELP in_flight Requests in flight\n"
+        "# TYPE in_flight gauge\n"
+        "in_flight 3\n"
+        "# HELP latency_seconds Latency\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{le="0.1"} 1\n'
+        'latency_seconds_bucket{le="1"} 2\n'
+        'latency_seconds_bucket{le="+Inf"} 3\n'
+        "latency_seconds_sum 2.6\n"
+        "latency_seconds_count 3\n"
+    )
+    assert NullRegistry().render() == ""
+
+
+def test_shards_of_all_threads_are_merged_on_scrape() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "Events").labels()
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(1,)).labels()
+    # Threads are kept alive together, so that each thread writes into its own shard
+    barrier = threading.Barrier(4)
+
+    def record() -> None:
+        for _ in range(1000):
+            counter.inc()
+            histogram.observe(0.5)
+        barrier.wait()
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(counter._shards) == 4
+    assert counter.value == 4000
+    assert histogram.snapshot() == ([4000, 0], 2000)
+    rendered = registry.render()
+    assert "events_total 4000\n" in rendered
+    assert 'latency_seconds_bucket{le="+Inf"} 4000\n' in rendered
+
+
+def test_non_standard_methods_are_reported_as_other(tmp_path: pathlib.Path) -> None:
+    shutil.copy(DATA, tmp_path / "db.json")
+    container = create_container(
+        AppSettings.parse_obj(
+            {
+                "database": {"path": str(tmp_path / "db.json")},
+                "telemetry": {"metrics_enabled": True},
+                "logging": {"access_log": False},
+            }
+        )
+    )
+
+    async def scenario() -> str:
+        async with ASGIClient(container.app) as client:
+            await client.request("GET", "/employees/")
+            await client.request("PURGE", "/employees/")
+            await client.request("X-RANDOM-1", "/employees/")
+            return (await client.get("/metrics")).body.decode()
+
+    metrics = asyncio.run(scenario())
+    assert 'method="GET",route="/employees/",status="200"' in metrics
+    assert 'method="OTHER",route="/employees/",status="405"' in metrics
+    assert "PURGE" not in metrics
+    assert "X-RANDOM-1" not in metrics
@@ -0,0 +1,84 @@
+import asyncio
+import typing
+
+import pytest
+
+from demo_app.lib.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_result() -> None:
+    calls = 0
+
+    async def compute() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def scenario() -> typing.List[typing.Tuple[int, bool]]:
+        flights: SingleFlight[int] = SingleFlight()
+        results = await asyncio.gather(*(flights.do("key", compute) for _ in range(5)))
+        assert len(flights) == 0
+        return list(results)
+
+    results = asyncio.run(scenario())
+    assert calls == 1
+    assert [result for result, _ in results] == [42] * 5
+    assert [shared for _, shared in results] == [False] + [True] * 4
+
+
+def test_errors_are_raised_to_all_callers() -> None:
+    async def compute() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario() -> typing.List[typing.Any]:
+        flights: SingleFlight[int] = SingleFlight()
+        return list(
+            await asyncio.gather(
+                *(flights.do("key", compute) for _ in range(3)), return_exceptions=True
+            )
+        )
+
+    errors = asyncio.run(scenario())
+    assert all(isinstance(error, ValueError) for error in errors)
+
+
+def test_cancelled_caller_does_not_cancel_other_callers() -> None:
+    async def compute() -> int:
+        await asyncio.sleep(0.02)
+        return 1
+
+    async def scenario() -> typing.Tuple[int, bool]:
+        flights: SingleFlight[int] = SingleFlight()
+        first = asyncio.create_task(flights.do("key", compute))
+        second = asyncio.create_task(flights.do("key", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == (1, True)
+
+
+def test_new_caller_after_all_callers_are_cancelled_starts_new_computation() -> None:
+    calls = 0
+
+    async def compute() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def scenario() -> typing.Tuple[int, bool]:
+        flights: SingleFlight[int] = SingleFlight()
+        first = asyncio.create_task(flights.do("key", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        # Computation task is not done yet when the next caller arrives
+        await asyncio.sleep(0)
+        return await flights.do("key", compute)
+
+    assert asyncio.run(scenario()) == (2, False)
+    assert calls == 2
@@ -0,0 +1,232 @@
+import asyncio
+import pathlib
+import shutil
+import typing
+
+import pytest
+
+from demo_app.container import AppContainer, AppTask, PeriodicTask
+from demo_app.entrypoint import create_container
+from demo_app.lib.scheduler import Job, Scheduler, TaskStats
+from demo_app.settings import AppSettings
+
+DATA = pathlib.Path(__file__).parent.parent / "src/demo_app/data/data_management.json"
+
+
+@pytest.fixture
+def container(tmp_path: pathlib.Path) -> AppContainer:
+    shutil.copy(DATA, tmp_path / "db.json")
+    return create_container(
+        AppSettings.parse_obj({"database": {"path": str(tmp_path / "db.json")}})
+    )
+
+
+def failing_times(
+    failures: int,
+) -> typing.Callable[[AppContainer], typing.Coroutine[typing.Any, typing.Any, int]]:
+    """Return a task function failing on its first calls, then returning its number of calls"""
+    calls = 0
+
+    async def function(container: AppContainer) -> int:
+        nonlocal calls
+        calls += 1
+        if calls <= failures:
+            raise ValueError(f"failure {calls}")
+        return calls
+
+    return function
+
+
+def test_task_is_not_restarted_with_never_policy(container: AppContainer) -> None:
+    task = AppTask(failing_times(1), restart_policy="never", backoff=0.001)
+
+    async def scenario() -> None:
+        await task.bind(container).start()
+        await task.wait()
+
+    asyncio.run(scenario())
+    assert task.failed
+    assert isinstance(task.exception, ValueError)
+    assert task.summary() == {
+        "name": "function",
+        "started": False,
+        "done": True,
+        "cancelled": False,
+        "exception": "failure 1",
+        "restart_policy": "never",
+        "runs": 1,
+        "failures": 1,
+        "restarts": 0,
+        "last_duration": task.stats.last_duration,
+        "last_error": "ValueError: failure 1",
+    }
+
+
+def test_task_is_restarted_until_success_with_on_failure_policy(
+    container: AppContainer,
+) -> None:
+    task = AppTask(failing_times(2), restart_policy="on-failure", backoff=0.001)
+
+    async def scenario() -> None:
+        await task.bind(container).start()
+        await task.wait()
+
+    asyncio.run(scenario())
+    assert task.succeeded
+    assert task.result == 3
+    assert (task.stats.runs, task.stats.failures, task.stats.restarts) == (3, 2, 2)
+    # Consecutive failures are reset once a run succeeds
+    assert task.stats.consecutive_failures == 0
+    assert task.stats.last_error == "ValueError: failure 2"
+
+
+def test_task_is_restarted_after_success_with_always_policy(
+    container: AppContainer,
+) -> None:
+    runs = 0
+
+    async def function(container: AppContainer) -> None:
+        nonlocal runs
+        runs += 1
+
+    task = AppTask(function, restart_policy="always", backoff=0.001)
+
+    async def scenario() -> None:
+        async with task.bind(container):
+            while runs < 3:
+                await asyncio.sleep(0.001)
+
+    asyncio.run(scenario())
+    assert task.cancelled
+    assert task.stats.runs >= 3
+    assert task.stats.failures == 0
+
+
+def test_restart_delay_grows_exponentially_up_to_max_backoff() -> None:
+    task: AppTask[None] = AppTask(
+        failing_times(0), restart_policy="on-failure", backoff=1, max_backoff=8
+    )
+    for failures, delay in [(0, 1), (1, 1), (2, 2), (3, 4), (4, 8), (10, 8)]:
+        task.stats.consecutive_failures = failures
+        for _ in range(20):
+            # Delay is randomly shortened by up to half
+            assert delay / 2 <= task.restart_delay() <= delay
+
+
+def test_cancelled_task_is_not_counted_as_failure(container: AppContainer) -> None:
+    async def function(container: AppContainer) -> None:
+        await asyncio.sleep(10)
+
+    task = AppTask(function, restart_policy="on-failure", backoff=0.001)
+
+    async def scenario() -> None:
+        await task.bind(container).start()
+        await asyncio.sleep(0.01)
+        await task.stop()
+
+    asyncio.run(scenario())
+    assert task.cancelled
+    assert (task.stats.runs, task.stats.failures, task.stats.restarts) == (0, 0, 0)
+
+
+def test_task_stats_record_runs() -> None:
+    stats = TaskStats()
+    stats.record(0.5, ValueError("boom"))
+    stats.record(0.25, KeyError("key"))
+    assert stats.consecutive_failures == 2
+    stats.record(0.1, None)
+    assert stats.consecutive_failures == 0
+    assert stats.summary() == {
+        "runs": 3,
+        "failures": 2,
+        "restarts": 0,
+        "last_duration": 0.1,
+        "last_error": "KeyError: 'key'",
+    }
+
+
+def test_periodic_task_keeps_running_after_failed_run(container: AppContainer) -> None:
+    task = PeriodicTask(failing_times(1), interval=0.001, jitter=0)
+
+    async def scenario() -> typing.Dict[str, typing.Any]:
+        await task.bind(container).start()
+        assert task.started
+        while task.stats.runs < 3:
+            await asyncio.sleep(0.001)
+        await task.stop()
+        return task.summary()
+
+    summary = asyncio.run(scenario())
+    assert not task.started
+    assert summary["failures"] == 1
+    assert summary["last_error"] == "ValueError: failure 1"
+    assert summary["restart_policy"] is None
+    assert summary["next_run_in"] is None
+    assert len(container.scheduler) == 0
+
+
+def make_job(name: str, calls: typing.List[str], interval: float = 10) -> Job:
+    async def function() -> None:
+        calls.append(name)
+
+    return Job(function, interval, name, jitter=0)
+
+
+def test_scheduler_runs_jobs_in_due_order() -> None:
+    calls: typing.List[str] = []
+
+    async def scenario() -> None:
+        scheduler = Scheduler()
+        jobs = [make_job(name, calls) for name in "abc"]
+        for job, delay in zip(jobs, [0.06, 0.02, 0.04]):
+            scheduler.add(job, delay)
+        await asyncio.sleep(0.1)
+        for job in jobs:
+            await scheduler.remove(job)
+
+    asyncio.run(scenario())
+    assert calls == ["b", "c", "a"]
+
+
+def test_scheduler_discards_removed_jobs() -> None:
+    calls: typing.List[str] = []
+
+    async def scenario() -> None:
+        scheduler = Scheduler()
+        removed = make_job("removed", calls)
+        kept = make_job("kept", calls, interval=0.01)
+        scheduler.add(removed, 0.01)
+        scheduler.add(kept, 0.02)
+        await scheduler.remove(removed)
+        # Heap entry of removed job is discarded when it becomes due
+        await asyncio.sleep(0.08)
+        assert len(scheduler) == 1
+        await scheduler.remove(kept)
+        # Scheduler coroutine is stopped once last job is removed
+        assert scheduler._task is None
+
+    asyncio.run(scenario())
+    assert "removed" not in calls
+    assert calls.count("kept") >= 2
+
+
+def test_removing_running_job_cancels_its_run() -> None:
+    async def scenario() -> Job:
+        running = asyncio.Event()
+
+        async def function() -> None:
+            running.set()
+            await asyncio.sleep(10)
+
+        scheduler = Scheduler()
+        job = Job(function, 10, "slow", jitter=0)
+        scheduler.add(job)
+        await running.wait()
+        await scheduler.remove(job)
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.running is None
+    assert job.next_run is None
+    # Cancelled run is not recorded
+    assert job.stats.runs == 0
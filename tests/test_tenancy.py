@@ -0,0 +1,149 @@
+import asyncio
+import pathlib
+import shutil
+import time
+import typing
+
+from demo_app.bench import ASGIClient
+from demo_app.entrypoint import create_container
+from demo_app.lib import EmployeeDatabase, EmployeeFormCreate
+from demo_app.lib.tenants import DatabaseRegistry
+from demo_app.settings import AppSettings
+
+DATA = pathlib.Path(__file__).parent.parent / "src/demo_app/data/data_management.json"
+
+
+def test_path_tenant_requests_are_labelled_with_route(tmp_path: pathlib.Path) -> None:
+    shutil.copy(DATA, tmp_path / "acme.json")
+    container = create_container(
+        AppSettings.parse_obj(
+            {
+                "database": {"tenants_dir": str(tmp_path), "tenant_resolver": "path"},
+                "telemetry": {"metrics_enabled": True},
+                "limiter": {"enabled": True},
+                "logging": {"access_log": False},
+            }
+        )
+    )
+
+    async def scenario() -> str:
+        async with ASGIClient(container.app) as client:
+            response = await client.get("/tenants/acme/employees/lastnames")
+            assert response.status_code == 200
+            return (await client.get("/metrics")).body.decode()
+
+    metrics = asyncio.run(scenario())
+    assert 'route="/employees/lastnames"' in metrics
+    assert 'route="<unmatched>"' not in metrics
+
+
+def make_registry(
+    directory: pathlib.Path, tenants: typing.Sequence[str], **kwargs: typing.Any
+) -> typing.Tuple[DatabaseRegistry, typing.List[str]]:
+    opened: typing.List[str] = []
+    for tenant in tenants:
+        shutil.copy(DATA, directory / f"{tenant}.json")
+
+    def opener(tenant: str, path: pathlib.Path) -> EmployeeDatabase:
+        opened.append(tenant)
+        return EmployeeDatabase(path)
+
+    return DatabaseRegistry(directory, opener, **kwargs), opened
+
+
+def test_least_recently_used_databases_are_closed_by_count(
+    tmp_path: pathlib.Path,
+) -> None:
+    registry, opened = make_registry(tmp_path, ["a", "b", "c"], max_open=2)
+
+    async def scenario() -> None:
+        await registry.get("a")
+        await registry.get("b")
+        # "a" becomes most recently used, so "b" is closed first
+        await registry.get("a")
+        await registry.get("c")
+        assert [entry["tenant"] for entry in registry.summary()] == ["a", "c"]
+        await registry.get("b")
+
+    asyncio.run(scenario())
+    assert opened == ["a", "b", "c", "b"]
+    assert len(registry) == 2
+
+
+def test_least_recently_used_databases_are_closed_by_size(
+    tmp_path: pathlib.Path,
+) -> None:
+    registry, _ = make_registry(tmp_path, ["a", "b"], max_bytes=1)
+
+    async def scenario() -> None:
+        await registry.get("a")
+        await registry.get("b")
+
+    asyncio.run(scenario())
+    # Newly opened database is kept even when it exceeds limit on its own
+    assert [entry["tenant"] for entry in registry.summary()] == ["b"]
+    assert registry.size == registry.summary()[0]["size_estimate"]
+
+
+def test_idle_databases_are_saved_and_closed(tmp_path: pathlib.Path) -> None:
+    now = 0.0
+    registry, _ = make_registry(
+        tmp_path, ["a", "b"], idle_timeout=10, clock=lambda: now
+    )
+
+    async def scenario() -> typing.List[str]:
+        nonlocal now
+        database = await registry.get("a")
+        database.create_one(
+            EmployeeFormCreate(lastname="Doe", firstname="Jane", team="ops"),
+            save=False,
+        )
+        now = 5
+        await registry.get("b")
+        now = 12
+        return await registry.close_idle()
+
+    assert asyncio.run(scenario()) == ["a"]
+    assert len(registry) == 1
+    # Pending modification was written before database was closed
+    assert len(EmployeeDatabase(tmp_path / "a.json").employees) == 5
+
+
+def test_concurrent_first_accesses_open_database_once(tmp_path: pathlib.Path) -> None:
+    registry, opened = make_registry(tmp_path, ["a"])
+
+    async def scenario() -> typing.List[EmployeeDatabase]:
+        return list(await asyncio.gather(*(registry.get("a") for _ in range(10))))
+
+    databases = asyncio.run(scenario())
+    assert opened == ["a"]
+    assert all(database is databases[0] for database in databases)
+
+
+def test_closed_database_is_saved_before_it_is_opened_again(
+    tmp_path: pathlib.Path,
+) -> None:
+    registry, opened = make_registry(tmp_path, ["a"])
+
+    async def scenario() -> int:
+        database = await registry.get("a")
+        database.create_one(
+            EmployeeFormCreate(lastname="Doe", firstname="Jane", team="ops"),
+            save=False,
+        )
+        save = database.save
+
+        def slow_save() -> None:
+            time.sleep(0.1)
+            save()
+
+        database.save = slow_save  # type: ignore[assignment]
+        closing = asyncio.create_task(registry.close("a"))
+        await asyncio.sleep(0.01)
+        # Database is opened again while its modifications are still being written
+        reopened = await registry.get("a")
+        await closing
+        return len(reopened.employees)
+
+    assert asyncio.run(scenario()) == 5
+    assert opened == ["a", "a"]
@@ -0,0 +1,110 @@
+import time
+import typing
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry import trace  # noqa: E402
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (  # noqa: E402
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import Status, StatusCode  # noqa: E402
+
+from demo_app.providers._trace_sampling import (  # noqa: E402
+    ErrorAndSlowTraceProcessor,
+    create_sampler,
+)
+
+TRACES = 2000
+
+
+def make_tracer(
+    ratio: float,
+    route_ratios: typing.Optional[typing.Dict[str, float]] = None,
+    record_unsampled: bool = False,
+    slow_threshold: typing.Optional[float] = None,
+) -> typing.Tuple[typing.Any, InMemorySpanExporter]:
+    # Exporter stands in for an OTLP collector
+    exporter = InMemorySpanExporter()
+    processor: typing.Any = SimpleSpanProcessor(exporter)
+    if record_unsampled:
+        processor = ErrorAndSlowTraceProcessor(processor, slow_threshold=slow_threshold)
+    provider = TracerProvider(
+        sampler=create_sampler(ratio, route_ratios, record_unsampled)
+    )
+    provider.add_span_processor(processor)
+    return provider.get_tracer(__name__), exporter
+
+
+def send_traces(tracer: typing.Any, route: str, count: int = TRACES) -> None:
+    for _ in range(count):
+        with tracer.start_as_current_span(route):
+            with tracer.start_as_current_span("find"):
+                pass
+
+
+@pytest.mark.parametrize("ratio", [0, 0.1, 0.5, 1])
+def test_sampled_traces_follow_ratio(ratio: float) -> None:
+    tracer, exporter = make_tracer(ratio)
+    send_traces(tracer, "/employees/")
+    roots = [span for span in exporter.get_finished_spans() if span.parent is None]
+    expected = TRACES * ratio
+    # Trace ids are random, allow 5 standard deviations
+    tolerance = 5 * (TRACES * ratio * (1 - ratio)) ** 0.5
+    assert abs(len(roots) - expected) <= tolerance
+    # Children follow the decision taken for their root span
+    assert len(exporter.get_finished_spans()) == 2 * len(roots)
+
+
+def test_route_ratios_override_default_ratio() -> None:
+    tracer, exporter = make_tracer(1, route_ratios={"/health/live": 0})
+    send_traces(tracer, "/health/live", 100)
+    send_traces(tracer, "/employees/", 100)
+    names = {span.name for span in exporter.get_finished_spans()}
+    assert "/health/live" not in names
+    assert len(exporter.get_finished_spans()) == 200
+
+
+def test_failed_traces_are_always_exported() -> None:
+    tracer, exporter = make_tracer(0, record_unsampled=True)
+    send_traces(tracer, "/employees/", 10)
+    with tracer.start_as_current_span("/employees/{_id}") as span:
+        with tracer.start_as_current_span("find"):
+            pass
+        span.set_status(Status(StatusCode.ERROR))
+    spans = exporter.get_finished_spans()
+    assert sorted(span.name for span in spans) == ["/employees/{_id}", "find"]
+    assert all(span.context.trace_flags.sampled for span in spans)
+
+
+def test_slow_traces_are_always_exported() -> None:
+    tracer, exporter = make_tracer(0, record_unsampled=True, slow_threshold=0.01)
+    send_traces(tracer, "/employees/", 10)
+    with tracer.start_as_current_span("/employees/lastnames"):
+        time.sleep(0.02)
+    assert [span.name for span in exporter.get_finished_spans()] == [
+        "/employees/lastnames"
+    ]
+
+
+def test_buffered_traces_are_bounded() -> None:
+    exporter = InMemorySpanExporter()
+    processor = ErrorAndSlowTraceProcessor(SimpleSpanProcessor(exporter), max_traces=2)
+    provider = TracerProvider(sampler=create_sampler(0, record_unsampled=True))
+    provider.add_span_processor(processor)
+    tracer = provider.get_tracer(__name__)
+    roots = [tracer.start_span("/employees/") for _ in range(3)]
+    for root in roots:
+        with tracer.start_as_current_span(
+            "find", context=trace.set_span_in_context(root)
+        ):
+            pass
+    assert len(processor._pending) == 2
+    # Ending a root span whose trace was evicted does not fail
+    for root in roots:
+        root.set_status(Status(StatusCode.ERROR))
+        root.end()
+    assert len(processor._pending) == 0